@@ -0,0 +1,97 @@
+'''
+Benchmark for the DNS server
+
+Sends the same query to a running server, keeping a fixed number of queries in flight,
+and reports the throughput and latency percentiles. To compare the server modes, run the
+server with and without -a and run the benchmark against each
+
+Usage: python3 benchmark.py <ip>[:<port>] <domain> <type> [-r] [-n] [-z] [-q <queries>] [-c <concurrency>]
+    -r : Sends recursive queries
+    -n : Uses the binary format (by default, runs in debug mode like client.py)
+    -z : Accepts compressed responses (binary format only)
+    -q : Total number of queries to send (default 10000)
+    -c : Number of queries in flight at the same time (default 50)
+
+Recursive queries to an SR whose answers have a TTL of 0, so that every query contacts the SP
+(-n -r -q 3000 -c 50, best of 3 runs, same machine):
+    threaded, a thread and a socket per query   -> 354 queries/s, p99 167 ms
+    threaded, pool of threads, listening socket -> 525 queries/s, p99 131 ms
+    asyncio (-a)                                -> 525 queries/s, p99 109 ms
+
+Last Modification: Results of the modes of the server
+Date of Modification: 18/10/2026 19:09
+'''
+
+import asyncio
+import re
+import sys
+import time
+import common.utils as utils
+from common.asyncUDP import AsyncUDP
+from common.dnsEntry import EntryType, ENTRY_TYPE
+from common.dnsMessage import DNSMessage
+from common.query import QueryInfo
+
+def encode_msg(msg:DNSMessage) -> bytes:
+    return str(msg).encode() if debug else msg.to_bytes()
+
+def decode_msg(b:bytes) -> DNSMessage:
+    if debug:
+        return DNSMessage.from_string(b.decode())
+    else:
+        (msg, _) = DNSMessage.from_bytes(b)
+        return msg
+
+def extract_flag(flag:str, default:int) -> int:
+    '''
+    Returns the integer value of the given flag in the system arguments, or the default if it isn't present
+    '''
+    if flag not in sys.argv:
+        return default
+    return int(sys.argv[sys.argv.index(flag) + 1])
+
+async def worker(ip:str, port:int, packet:bytes, remaining:list[int], latencies:list[float], errors:list[int]) -> None:
+    '''
+    Sends queries one at a time until there are no remaining queries, storing the latency of each
+    '''
+    udp = await AsyncUDP.open(timeout=3)
+
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            udp.send(packet, ip, port)
+            resp, _, _ = await udp.receive()
+            decode_msg(resp)
+            latencies.append(time.perf_counter() - start)
+        except Exception:   #timeouts and malformed responses
+            errors[0] += 1
+
+    udp.close()
+
+async def run(ip:str, port:int, query:QueryInfo, recursive:bool, queries:int, concurrency:int) -> None:
+    packet = encode_msg(DNSMessage.from_query(query, recursive, compression='-z' in sys.argv))
+    remaining = [queries]
+    latencies = []
+    errors = [0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(ip, port, packet, remaining, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float('nan')
+    print(f'queries: {queries}, answered: {len(latencies)}, failed: {errors[0]}, concurrency: {concurrency}')
+    print(f'throughput: {len(latencies) / elapsed:.1f} queries/s')
+    print(f'latency (ms): p50 {percentile(0.5):.2f}, p90 {percentile(0.9):.2f}, p99 {percentile(0.99):.2f}, max {percentile(1):.2f}')
+
+args = ' '.join(sys.argv[1:4])
+match = re.search(f'{utils.IP_MAYBE_PORT} (?P<d>[^\\s]+) (?P<t>{ENTRY_TYPE})', args)
+if not match:
+    raise ValueError("Invalid format for program args")
+debug = '-n' not in sys.argv
+ip = match.group('ip')
+port = int(match.group('port')) if match.group('port') else utils.DEFAULT_PORT
+
+asyncio.run(run(ip, port, QueryInfo(match.group('d'), EntryType[match.group('t')]), '-r' in sys.argv, \
+                extract_flag('-q', 10000), extract_flag('-c', 50)))
@@ -5,6 +5,7 @@ from common.dnsEntry import EntryType, ENTRY_TYPE
 from common.dnsMessage import DNSMessage
 from common.query import QueryInfo
 from common.udp import UDP
+from common.tcpWrapper import request
 
 def encode_msg(msg:DNSMessage) -> bytes:
     '''
@@ -33,13 +34,15 @@ ip = match.group('ip')
 port = int(match.group('port')) if match.group('port') else utils.DEFAULT_PORT
 
 query = QueryInfo(match.group('d'), EntryType[match.group('t')])
-msg = DNSMessage.from_query(query, recursive)
+msg = DNSMessage.from_query(query, recursive, compression='-z' in sys.argv)    #accept a compressed response
 
 try:
     server = UDP(timeout=3)
     server.send(encode_msg(msg), ip, port)
     resp, _, _ = server.receive()
     response = decode_msg(resp)
+    if response.truncated:   #too large for a datagram, ask again through TCP
+        response = decode_msg(request(ip, port, encode_msg(msg), 3))
     print(response.print())
 except Exception as e:
     print("Query failed:", e)
\ No newline at end of file
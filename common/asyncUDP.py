@@ -0,0 +1,89 @@
+"""
+File implementing a wrapper class for a UDP socket running on an asyncio event loop
+
+Last Modification: Added SO_REUSEPORT
+Date of Modification: 18/10/2026 15:20
+"""
+
+import asyncio
+import socket
+from typing import Optional
+
+
+class AsyncUDP(asyncio.DatagramProtocol):
+    """
+    Wrapper class for a UDP socket on the running asyncio event loop
+    Has the same interface as UDP (see udp.py), but receive() must be awaited
+
+    Instances should be created with AsyncUDP.open()
+    """
+
+    def __init__(self, timeout:Optional[float] = None):
+        self.timeout = timeout
+        self.transport = None
+        self.received:asyncio.Queue = asyncio.Queue()
+
+    @staticmethod
+    async def open(localIP:str = '0.0.0.0', localPort:int = 0, timeout:Optional[float] = None, binding:bool = False, \
+                   reusePort:bool = False) -> 'AsyncUDP':
+        """
+        Creates a socket on the running event loop
+
+        Arguments:
+
+        localIP : String -> The IP to run the socket on
+        localPort : int  -> The port to listen on. If not indicated, the OS picks a random available port
+        timeout : float  -> The number of seconds to wait on receive(). If None, waits forever
+        binding : bool   -> Whether or not to bind to the port
+        reusePort : bool -> Whether other sockets can bind to the same port (SO_REUSEPORT)
+        """
+        loop = asyncio.get_running_loop()
+        if binding:
+            _, protocol = await loop.create_datagram_endpoint(lambda: AsyncUDP(timeout), \
+                local_addr=(localIP, localPort), reuse_port=reusePort)
+        else:
+            _, protocol = await loop.create_datagram_endpoint(lambda: AsyncUDP(timeout), family=socket.AF_INET)
+        return protocol
+
+    def connection_made(self, transport:asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data:bytes, addr:tuple[str,int]) -> None:
+        self.received.put_nowait((data, addr[0], addr[1]))
+
+    def error_received(self, exc:Exception) -> None:
+        pass    #ICMP errors (e.g. port unreachable) end up as a timeout on receive()
+
+    async def receive(self) -> tuple[bytes,str,int]:
+        """
+        Receive data
+        If timeout is set, raises socket.timeout
+
+        Returns:
+
+        message : bytes                     -> The message received
+        ip      : String                    -> The ip address of the sender
+        port    : int                       -> The port the massage was sent in
+        """
+        try:
+            return await asyncio.wait_for(self.received.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise socket.timeout()
+
+    def send(self, message:bytes, ip:str, port:int) -> None:
+        """
+        Send data
+
+        Arguments:
+
+        message : bytes                     -> The message to send through the socket
+        ip      : String                    -> The ip address to send the message to
+        port    : int                       -> The port the massage is to be sent through
+        """
+        self.transport.sendto(message, (ip, port))
+
+    def close(self) -> None:
+        """
+        Closes the socket
+        """
+        self.transport.close()
@@ -1,17 +1,28 @@
 """
 File containing classes DNSEntry and EntryType
 
-Last Modification: Fix __str__ when priority is None
-Date of Modification: 19/11/2022 18:11
+Last Modification: Compressed binary representation
+Date of Modification: 18/10/2026 18:17
 """
 
 from enum import Enum
 import re
+import struct
+import sys
 from .exceptions import InvalidDNSEntryException
 import common.utils as utils
 from typing import Optional
 
 
+"""
+Compiled regexes used to validate the attributes of a DNSEntry (see EntryType.validate_parameter() and EntryType.validate_value())
+"""
+DOMAIN_REGEX = re.compile(f'^{utils.DOMAIN}$')
+FULL_DOMAIN_REGEX = re.compile(f'^{utils.FULL_DOMAIN}$')
+IP_ADDRESS_REGEX = re.compile(f'^{utils.IP_ADDRESS}$')
+EMAIL_ADDRESS_REGEX = re.compile(f'^{utils.EMAIL_ADDRESS}$')
+
+
 class EntryType(Enum):
     """
     Enum class, representing all possible types of dns entry
@@ -45,14 +56,14 @@ class EntryType(Enum):
         domain name is expected; in that case, the domain name is normalized - see utils.normalize_domain())
         """
         #if self == EntryType.PTR:
-        #    if not re.search(f'^{utils.IP_ADDRESS}$', parameter):
+        #    if not IP_ADDRESS_REGEX.search(parameter):
         #        raise InvalidDNSEntryException(f'{parameter} is not a valid IPv4 address')
         if self == EntryType.CNAME:
-            if not re.search(f'^{utils.DOMAIN}$', parameter):
+            if not DOMAIN_REGEX.search(parameter):
                 raise InvalidDNSEntryException(f'{parameter} is not a valid domain name')
             parameter = parameter.lower()
         else:
-            if not re.search(f'^{utils.FULL_DOMAIN}$', parameter):
+            if not FULL_DOMAIN_REGEX.search(parameter):
                 raise InvalidDNSEntryException(f'{parameter} is not a valid full domain name')
             parameter = parameter.lower()
         return parameter
@@ -64,20 +75,20 @@ class EntryType(Enum):
         Returns the validated value (this may be different from the received value if a
         domain name is expected; in that case, the domain name is normalized - see utils.normalize_domain())
         """
-        if self in [EntryType.SOASP, EntryType.NS, EntryType.PTR]:
-            if not re.search(f'^{utils.FULL_DOMAIN}$', value):
+        if self in FULL_DOMAIN_VALUES:
+            if not FULL_DOMAIN_REGEX.search(value):
                 raise InvalidDNSEntryException(f'{value} is not a valid full domain name')
             value = value.lower()
-        elif self in [EntryType.MX, EntryType.CNAME]:
-            if not re.search(f'^{utils.DOMAIN}$', value):
+        elif self in DOMAIN_VALUES:
+            if not DOMAIN_REGEX.search(value):
                 raise InvalidDNSEntryException(f'{value} is not a valid domain name')
             value = value.lower()
         elif self == EntryType.A:
-            if not re.search(f'^{utils.IP_ADDRESS}$', value):
+            if not IP_ADDRESS_REGEX.search(value):
 
                 raise InvalidDNSEntryException(f'{value} is not a valid IPv4 address')
         elif self == EntryType.SOAADMIN:
-            if not re.search(f'^{utils.EMAIL_ADDRESS}$', value):
+            if not EMAIL_ADDRESS_REGEX.search(value):
                 raise InvalidDNSEntryException(f'{value} is not a valid email address')
         return value
     
@@ -89,6 +100,12 @@ class EntryType(Enum):
         return [e.name for e in EntryType]
     
 
+"""
+The EntryTypes whose values are full domain names and domain names, respectively
+"""
+FULL_DOMAIN_VALUES = frozenset([EntryType.SOASP, EntryType.NS, EntryType.PTR])
+DOMAIN_VALUES = frozenset([EntryType.MX, EntryType.CNAME])
+
 """
 A regex pattern that matches all names of EntryTypes
 """
@@ -99,12 +116,29 @@ Regex pattern that matchs valid characters for the parameter attribute of a DNSE
 """
 PARAMETER_CHAR = r'[a-zA-Z0-9.-@]'
 
+"""
+Binary layout of the fields of a DNSEntry after its value: the TTL and, if the type supports it, the priority
+"""
+TTL_STRUCT = struct.Struct('<I')
+TTL_PRIORITY_STRUCT = struct.Struct('<IB')
+
+"""
+Compiled regex matching the string representation of a DNSEntry (see DNSEntry.from_str())
+"""
+ENTRY_LINE_REGEX = re.compile(
+    f'^\s*(?P<p>{PARAMETER_CHAR}+)\s+(?P<t>{ENTRY_TYPE})\s+(?P<v>[^\s]+)\s+(?P<ttl>\d+)(\s+(?P<pr>\d+))?\s*$')
+
 class DNSEntry:
     """
     Class representing a dns entry in SP databases, caches, etc
     Is composed of 5 attributes: a parameter (usually a domain name), a type (EntryType),
     a value, a TTL (unsigned integer) and a priority (integer between 0 and 255)
+
+    DNSEntry's are compared by their attributes, and the parameter and value strings are interned,
+    so that the many entries of a zone or cache about the same names share them
     """
+
+    __slots__ = ('parameter', 'type', 'value', 'ttl', 'priority')
     
     def __init__(self, parameter:str, type:EntryType, value:str, ttl:int, priority:Optional[int] = None):
         """
@@ -131,11 +165,26 @@ class DNSEntry:
         if priority != None and (priority < 0 or priority > 255):
             raise InvalidDNSEntryException(f"Priority {priority} must be between 0 and 255")
 
-        self.parameter = type.validate_parameter(parameter)
+        self.parameter = sys.intern(type.validate_parameter(parameter))
         self.type = type
-        self.value = type.validate_value(value)
+        self.value = sys.intern(type.validate_value(value))
         self.ttl = ttl
         self.priority = priority
+
+    @staticmethod
+    def from_validated(parameter:str, type:EntryType, value:str, ttl:int, priority:Optional[int] = None) -> 'DNSEntry':
+        """
+        Constructs a DNSEntry from attributes that were already validated and normalized (e.g. copied
+        from another DNSEntry or sent by the SP of a zone), without validating them again
+        The priority must be given for the types that support it, and be None for the others
+        """
+        ans = DNSEntry.__new__(DNSEntry)
+        ans.parameter = sys.intern(parameter)
+        ans.type = type
+        ans.value = sys.intern(value)
+        ans.ttl = ttl
+        ans.priority = priority
+        return ans
       
     @staticmethod
     def from_str(line: str) -> 'DNSEntry':
@@ -150,9 +199,7 @@ class DNSEntry:
         Returns:
             _type_: a new DNS entry with the data inside
         """
-        match = re.search(
-            f'^\s*(?P<p>{PARAMETER_CHAR}+)\s+(?P<t>{ENTRY_TYPE})\s+(?P<v>[^\s]+)\s+(?P<ttl>\d+)(\s+(?P<pr>\d+))?\s*$',
-            line)
+        match = ENTRY_LINE_REGEX.search(line)
         
         if match == None:
             raise ValueError(f"{line} doesn't match the pattern {{parameter}} {{type}} {{value}} {{ttl}} {{priority}}?")
@@ -195,48 +242,79 @@ class DNSEntry:
         return DNSEntry(parameter, _type, value, _ttl, _priority)
             
     @staticmethod
-    def from_bytes(data, pos = 0) -> tuple['DNSEntry',int]:
+    def from_bytes(data, pos = 0, trusted:bool = False, compressed:bool = False) -> tuple['DNSEntry',int]:
         """
         Constructs a DNSEntry from an array of bytes
         If the parsing fails, an InvalidDNSEntryException is thrown
+        If trusted is set, the attributes aren't validated (see from_validated())
+        If compressed is set, the strings may be compressed (see utils.write_string())
         Returns a pair containing the dnsEntry and the number of consumed bytes
         """
+        read_string = utils.bytes_to_compressed_string if compressed else utils.bytes_to_string
 
-        parameter, pos = utils.bytes_to_string(data, pos)
-
-        type = utils.bytes_to_int(data, 1, pos)
+        parameter, pos = read_string(data, pos)
 
         try:
-            _type = EntryType(type)
+            _type = EntryType(data[pos])
         except ValueError:
             raise InvalidDNSEntryException("Unknown entry type")
         pos += 1
 
-        value, pos = utils.bytes_to_string(data, pos)
-
-        ttl = utils.bytes_to_int(data, 4, pos)
-
-        pos += 4
+        value, pos = read_string(data, pos)
 
-        
         if _type.supports_priority():
-            priority = utils.bytes_to_int(data, 1, pos)
-            pos += 1
+            ttl, priority = TTL_PRIORITY_STRUCT.unpack_from(data, pos)
+            pos += TTL_PRIORITY_STRUCT.size
         else:
+            (ttl,) = TTL_STRUCT.unpack_from(data, pos)
             priority = None
+            pos += TTL_STRUCT.size
         
+        if trusted:
+            return (DNSEntry.from_validated(parameter, _type, value, ttl, priority), pos)
         return (DNSEntry(parameter, _type, value, ttl, priority), pos)
 
     def to_bytes(self) -> bytes:
         """
         Converts the current instance of DNSEntry to an array of bytes
-        """        
-        ans = utils.string_to_bytes(self.parameter) + utils.int_to_bytes(self.type.value, 1) + utils.string_to_bytes(self.value) + utils.int_to_bytes(self.ttl, 4)
-        
+        """
+        ans = bytearray()
+        self.write_bytes(ans)
+        return bytes(ans)
+
+    def write_bytes(self, buffer:bytearray, names:Optional[dict[str,int]] = None) -> None:
+        """
+        Appends the binary representation of the current instance (see to_bytes()) to the given buffer
+        If a dictionary of the names already in the buffer is given, the strings are compressed (see utils.write_string())
+        """
+        utils.write_string(buffer, self.parameter, names)
+        buffer.append(self.type.value)
+        utils.write_string(buffer, self.value, names)
+
         if self.type.supports_priority():
-            ans += utils.int_to_bytes(self.priority, 1)
-        
-        return ans
+            buffer += TTL_PRIORITY_STRUCT.pack(self.ttl, self.priority)
+        else:
+            buffer += TTL_STRUCT.pack(self.ttl)
+
+    def __eq__(self, another) -> bool:
+        if not isinstance(another, DNSEntry):
+            return False
+        return self.parameter == another.parameter and self.type == another.type and self.value == another.value \
+            and self.ttl == another.ttl and self.priority == another.priority
+
+    def __hash__(self):
+        return hash((self.parameter, self.type, self.value, self.ttl, self.priority))
+
+    def __getstate__(self) -> tuple:
+        return (self.parameter, self.type, self.value, self.ttl, self.priority)
+
+    def __setstate__(self, state:tuple) -> None:
+        """
+        Restores a pickled DNSEntry (e.g. received from the shared cache), interning its strings again
+        """
+        parameter, self.type, value, self.ttl, self.priority = state
+        self.parameter = sys.intern(parameter)
+        self.value = sys.intern(value)
 
     def __str__(self) -> str:
         """
@@ -1,13 +1,14 @@
 """
 File defining the class DNSMessage
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 11:31
+Last Modification: Truncated responses and counts above 255
+Date of Modification: 18/10/2026 18:22
 """
 
 import itertools
 import random
 import re
+import struct
 
 from common.dnsEntry import DNSEntry, EntryType
 from common.exceptions import InvalidDNSMessageException
@@ -15,6 +16,34 @@ from common.query import QueryInfo, QueryResponse
 import common.utils as utils
 from common.dnsEntry import ENTRY_TYPE
 
+"""
+Binary layout of the header of a DNSMessage: messageID - 1, flags and response code,
+and the number of values, authorities and extra values
+"""
+HEADER_STRUCT = struct.Struct('<HBBBB')
+
+"""
+Same as HEADER_STRUCT, but with two bytes for each number of entries
+Used when a section has more than 255 entries (see FLAG_WIDE_COUNTS)
+"""
+HEADER_WIDE_STRUCT = struct.Struct('<HBHHH')
+
+"""
+Flag of the header set in queries whose sender accepts compressed responses, and in compressed responses
+"""
+FLAG_COMPRESSION = 0b100000
+
+"""
+Flag of the header set in truncated responses: the response didn't fit in a datagram and must
+be asked again through TCP (see DNSMessage.truncate())
+"""
+FLAG_TRUNCATED = 0b1000000
+
+"""
+Flag of the header set when the numbers of entries take two bytes each (see HEADER_WIDE_STRUCT)
+"""
+FLAG_WIDE_COUNTS = 0b10000000
+
 class DNSMessage:
     """
     Class representing a dns message sent between servers asking and answering dns queries
@@ -29,12 +58,20 @@ class DNSMessage:
         response            -> QueryResponse
         responseCode        -> int (between 0 and 3)
         supports_recursive  -> bool
+        truncated           -> bool (whether the entries were left out, see truncate())
+
+    compression -> bool (if a query, whether the sender accepts a compressed response;
+                         if a response, whether its binary representation is compressed, see utils.write_string())
     """
+
+    compression = False
+    truncated = False
     
     @staticmethod
-    def from_query(query:QueryInfo, recursive:bool, messageID:int = random.randrange(1,65357)) -> 'DNSMessage':
+    def from_query(query:QueryInfo, recursive:bool, messageID:int = random.randrange(1,65357), compression:bool = False) -> 'DNSMessage':
         """
         Constructs a DNSMessage query from the given QueryInfo, recursive flag and messageID
+        If compression is set, the response may be compressed
         """
         
         if messageID < 1 or messageID > 65356:
@@ -44,6 +81,7 @@ class DNSMessage:
         ans.messageID = messageID
         ans.query = query
         ans.recursive = recursive
+        ans.compression = compression
         
         return ans
     
@@ -52,6 +90,7 @@ class DNSMessage:
         """
         Generates a response DNSMessage to the current instance using the
         given QueryResponse and supports_recursive flag
+        The response is compressed if the query accepts it
         """
         ans = DNSMessage()
         ans.messageID = self.messageID
@@ -59,6 +98,7 @@ class DNSMessage:
         ans.response = response
         ans.responseCode = (2 if len(response.values) == 0 else 0) if response.isFinal() else 1
         ans.supports_recursive = supports_recursive
+        ans.compression = self.compression
         return ans
     
     def generate_error_response(self, supports_recursive:bool) -> 'DNSMessage':
@@ -73,6 +113,21 @@ class DNSMessage:
         ans.responseCode = 3
         ans.supports_recursive = supports_recursive
         return ans
+
+    def truncate(self) -> 'DNSMessage':
+        """
+        Generates a copy of the current instance, a response, without its entries and with the truncated flag set
+        Sent instead of a response too large for a datagram, so that the query is repeated through TCP
+        """
+        ans = DNSMessage()
+        ans.messageID = self.messageID
+        ans.query = self.query
+        ans.response = QueryResponse([], [], [], self.responseCode == 2, self.response.authoritative)
+        ans.responseCode = self.responseCode
+        ans.supports_recursive = self.supports_recursive
+        ans.compression = self.compression
+        ans.truncated = True
+        return ans
     
     @staticmethod
     def error_response(supports_recursive:bool) -> 'DNSMessage':
@@ -127,7 +182,7 @@ class DNSMessage:
         Returns:
             String: the string representation of the message flags
         """
-        return '+'.join(f"{'Q' if self.is_query() else ''}{'R' if self.__flag_recursive__() else ''}{'A' if self.__flag_authoritative__() else ''}")
+        return '+'.join(f"{'Q' if self.is_query() else ''}{'R' if self.__flag_recursive__() else ''}{'A' if self.__flag_authoritative__() else ''}{'T' if self.truncated else ''}")
 
 
     def __str__(self) -> str:
@@ -180,7 +235,7 @@ class DNSMessage:
         (as of examples 5 and 6 of the statement)
         If the parsing fails, an InvalidDNSMessageException is raised
         """
-        match = re.search(f'^(?P<id>\d+),(?P<flags>[QRA](\+[QRA]){{0,2}})?,(?P<code>[0-3]),(?P<vals>\d+),(?P<auths>\d+),(?P<extras>\d+);(?P<name>{utils.FULL_DOMAIN}),(?P<type>{ENTRY_TYPE});', str)
+        match = re.search(f'^(?P<id>\d+),(?P<flags>[QRAT](\+[QRAT]){{0,3}})?,(?P<code>[0-3]),(?P<vals>\d+),(?P<auths>\d+),(?P<extras>\d+);(?P<name>{utils.FULL_DOMAIN}),(?P<type>{ENTRY_TYPE});', str)
         if not match:
             raise InvalidDNSMessageException(f"{str} doesn't match the expected format")
 
@@ -190,7 +245,7 @@ class DNSMessage:
             raise InvalidDNSMessageException(f"messageID ({ans.messageID}) must be between 0 and 65356.")
         
         flag_str = match.group('flags')
-        flag_q, flag_r, flag_a = __read_flags__(flag_str if flag_str else "")
+        flag_q, flag_r, flag_a, flag_t = __read_flags__(flag_str if flag_str else "")
         ans.query = QueryInfo(match.group('name'), EntryType[match.group('type')])
         body = str[match.end():]
         
@@ -198,6 +253,7 @@ class DNSMessage:
             ans.recursive = flag_r
         else:
             ans.supports_recursive = flag_r
+            ans.truncated = flag_t
             ans.responseCode = int(match.group('code'))
             vals, body = __read_entries__(body, int(match.group('vals')))
             auths, body = __read_entries__(body, int(match.group('auths')))
@@ -215,20 +271,32 @@ class DNSMessage:
         """
         flags = (1 if self.is_query() else 0) << 2 | (1 if self.__flag_recursive__() else 0) << 1 | (1 if self.__flag_authoritative__() else 0)
         flags_plus_response_code = flags << 2 | (self.responseCode if not self.is_query() else 0)
-        
-        ans = utils.int_to_bytes(self.messageID - 1, 2) \
-            + utils.int_to_bytes(flags_plus_response_code, 1) \
-            + utils.int_to_bytes(len(self.response.values) if not self.is_query() else 0, 1) \
-            + utils.int_to_bytes(len(self.response.authorities) if not self.is_query() else 0, 1) \
-            + utils.int_to_bytes(len(self.response.extra_values) if not self.is_query() else 0, 1) \
-            + utils.string_to_bytes(self.query.name) \
-            + utils.int_to_bytes(self.query.type.value, 1)
-        
-        if not self.is_query():
-            for e in itertools.chain(self.response.values, self.response.authorities, self.response.extra_values):
-                ans += e.to_bytes()
-        
-        return ans
+        if self.compression:
+            flags_plus_response_code |= FLAG_COMPRESSION
+        if self.truncated:
+            flags_plus_response_code |= FLAG_TRUNCATED
+
+        if self.is_query():
+            counts = (0, 0, 0)
+            entries = []
+        else:
+            counts = (len(self.response.values), len(self.response.authorities), len(self.response.extra_values))
+            entries = self.response.all_entries()
+
+        header = HEADER_STRUCT
+        if max(counts) > 255:
+            header = HEADER_WIDE_STRUCT
+            flags_plus_response_code |= FLAG_WIDE_COUNTS
+
+        names = {} if self.compression and not self.is_query() else None
+        ans = bytearray(header.pack(self.messageID - 1, flags_plus_response_code, *counts))  #grown in place
+        utils.write_string(ans, self.query.name, names)
+        ans.append(self.query.type.value)
+
+        for e in entries:
+            e.write_bytes(ans, names)
+
+        return bytes(ans)
 
     @staticmethod
     def from_bytes(data:bytes) -> tuple['DNSMessage',int]:
@@ -237,48 +305,42 @@ class DNSMessage:
         If the parsing fails, an InvalidDNSMessageException is raised
         """
         ans = DNSMessage()
-        pos = 0
-        
-        ans.messageID = utils.bytes_to_int(data, 2, pos) + 1
-        pos += 2
-        
-        aux = utils.bytes_to_int(data, 1, pos)
+        if isinstance(data, memoryview):
+            data = data.tobytes()   #a single copy, as memoryviews can't be searched for the null terminators
+
+        header = HEADER_WIDE_STRUCT if data[2] & FLAG_WIDE_COUNTS else HEADER_STRUCT
+        messageID, aux, vals, auths, extra_vals = header.unpack_from(data, 0)
+        ans.messageID = messageID + 1
         flag_q = aux & 0b10000
         flag_r = aux & 0b1000
         flag_a = aux & 0b100
         responseCode = aux & 0b11
-        pos += 1
-        
-        vals = utils.bytes_to_int(data, 1, pos)
-        pos += 1
-        
-        auths = utils.bytes_to_int(data, 1, pos)
-        pos += 1
-        
-        extra_vals = utils.bytes_to_int(data, 1, pos)
-        pos += 1
+        ans.compression = bool(aux & FLAG_COMPRESSION)
+        compressed = ans.compression and not flag_q
+        pos = header.size
         
-        name, pos = utils.bytes_to_string(data, pos)
+        name, pos = (utils.bytes_to_compressed_string if compressed else utils.bytes_to_string)(data, pos)
         
-        type = EntryType(utils.bytes_to_int(data, 1, pos))
+        type = EntryType(data[pos])
         pos += 1
         
         if flag_q:
             ans.recursive = flag_r
         else:
             ans.supports_recursive = flag_r
+            ans.truncated = bool(aux & FLAG_TRUNCATED)
             ans.responseCode = responseCode
-            values, pos = __parse_entries__(data, vals, pos)
-            authorities, pos = __parse_entries__(data, auths, pos)
-            extra_values, pos = __parse_entries__(data, extra_vals, pos)
+            values, pos = __parse_entries__(data, vals, pos, compressed)
+            authorities, pos = __parse_entries__(data, auths, pos, compressed)
+            extra_values, pos = __parse_entries__(data, extra_vals, pos, compressed)
             ans.response = QueryResponse(values, authorities, extra_values, ans.responseCode == 2, flag_a)
         
         ans.query = QueryInfo(name, type)
         return (ans, pos)
 
 
-def __read_flags__(str:str) -> tuple[bool,bool,bool]:
-    """returns a tuple of the state of each flags in the order: Query,Recursive,Authoritative
+def __read_flags__(str:str) -> tuple[bool,bool,bool,bool]:
+    """returns a tuple of the state of each flags in the order: Query,Recursive,Authoritative,Truncated
 
     Args:
         str (String): the flags to read 
@@ -287,13 +349,13 @@ def __read_flags__(str:str) -> tuple[bool,bool,bool]:
         InvalidDNSMessageException: in case there are repeted flags in the input
 
     Returns:
-        Tuple: the state of each flags in the order: Query,Recursive,Authoritative
+        Tuple: the state of each flags in the order: Query,Recursive,Authoritative,Truncated
     """
-    for f in "QRA":
+    for f in "QRAT":
         if str.count(f) > 1:
             raise InvalidDNSMessageException(f"Multiple occurences of flag {f} in flags: {str}")
     
-    return ('Q' in str, 'R' in str, 'A' in str)
+    return ('Q' in str, 'R' in str, 'A' in str, 'T' in str)
 
 def __read_entries__(str:str, expected:int) -> tuple[list[DNSEntry],str]:
     """parse a given number of entries from a string
@@ -326,7 +388,7 @@ def __read_entries__(str:str, expected:int) -> tuple[list[DNSEntry],str]:
 
     return (ans, str)
 
-def __parse_entries__(data:bytes, expected:int, pos:int = 0) -> tuple[list[DNSEntry],int]:
+def __parse_entries__(data:bytes, expected:int, pos:int = 0, compressed:bool = False) -> tuple[list[DNSEntry],int]:
     """_summary_
 
     Args:
@@ -340,7 +402,7 @@ def __parse_entries__(data:bytes, expected:int, pos:int = 0) -> tuple[list[DNSEn
     ans = []
     
     for i in range(0, expected):
-        entry, pos = DNSEntry.from_bytes(data, pos)
+        entry, pos = DNSEntry.from_bytes(data, pos, compressed=compressed)
         ans.append(entry)
         
     return (ans, pos)
@@ -1,11 +1,12 @@
 """
 Contains definitions for the classes QueryInfo and QueryResponse
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 11:45
+Last Modification: Slots and interned names
+Date of Modification: 18/10/2026 18:11
 """
 
 from pprint import pprint
+import sys
 from common.dnsEntry import DNSEntry, EntryType
 import common.utils as utils
 import itertools
@@ -15,9 +16,11 @@ class QueryInfo:
     Represents a query
     Contains a hostname and an EntryType
     """
+
+    __slots__ = ('name', 'type')
     
     def __init__(self, name:str, type:EntryType):
-        self.name = name.lower()
+        self.name = sys.intern(name.lower())
         self.type = type
         
     def __str__(self) -> str:
@@ -65,6 +68,8 @@ class QueryResponse:
         extra_values    -> list of DNSEntry's that match the values and authorities parameter and are of type NS
         authoritative   -> whether the response came directly from an authoritative server on the queried domain
     """
+
+    __slots__ = ('values', 'authorities', 'extra_values', 'final', 'authoritative')
     
     def __init__(self,values:list[DNSEntry]=[],authorities:list[DNSEntry]=[],extra_values:list[DNSEntry]=[],final:bool=False,authoritative:bool=False):
         self.values = values
@@ -6,9 +6,82 @@ reading from the socket, only a single message will be returned, and
 not partial messages. For example, in the buffer with "<Message 1><Message 2>",
 a call to the API of the wrapper class would return "<Message 1>" instead of
 "<Message1><Mess" or "Mess<"
+
+Dns messages are sent through TCP in frames, each one prefixed by its length (see frame())
+
+The messages are found with a probe function, which only looks at the bytes needed to know where the
+first message ends (see probe_frame()), and are received directly into a reusable buffer
+
+Last Modification: Messages received into a reusable buffer and found by a probe function
+Date of Modification: 18/10/2026 18:48
 """
+import asyncio
 import socket
-from typing import Callable
+import struct
+from typing import Callable, Iterator, Optional
+
+
+"""
+Binary layout of the prefix of a frame: the length of the message, with the highest bit set
+The first byte of a frame therefore never matches the first byte of a zone transfer packet (see ZoneTransferPacket),
+so that both protocols share the TCP port of the server (see is_frame())
+"""
+FRAME_HEADER = struct.Struct('>I')
+FRAME_MARKER = 0x80000000
+
+def frame(message:bytes) -> bytes:
+    """
+    Returns the given message prefixed by its length, to be sent through a TCP socket
+    """
+    return FRAME_HEADER.pack(FRAME_MARKER | len(message)) + message
+
+def probe_frame(buffer:bytes, start:int, end:int) -> Optional[tuple[int,int,int]]:
+    """
+    Probe function of a TCPWrapper receiving frames (see frame()), given the received bytes buffer[start:end]
+    Returns the start and the end of the message in the first frame, and the end of the frame (the same),
+    or None if the frame isn't complete
+    """
+    if end - start < FRAME_HEADER.size:
+        return None
+
+    stop = start + FRAME_HEADER.size + (FRAME_HEADER.unpack_from(buffer, start)[0] & ~FRAME_MARKER)
+    if stop > end:
+        return None
+    return (start + FRAME_HEADER.size, stop, stop)
+
+def is_frame(first:bytes) -> bool:
+    """
+    Returns whether the given first byte received in a TCP connection starts a frame, rather than a zone transfer packet
+    """
+    return bool(first[0] & 0x80)
+
+async def read_frame(reader:asyncio.StreamReader, prefix:bytes = b'') -> bytes:
+    """
+    Returns the message in the next frame received by the given stream, or b'' if the connection is closed
+    before a new frame. prefix holds the bytes of the frame already read from the stream
+    """
+    try:
+        header = prefix + await reader.readexactly(FRAME_HEADER.size - len(prefix))
+    except asyncio.IncompleteReadError as e:
+        if e.partial or prefix:
+            raise
+        return b''
+    return await reader.readexactly(FRAME_HEADER.unpack(header)[0] & ~FRAME_MARKER)
+
+def request(ip:str, port:int, message:bytes, timeout:Optional[float], bufferSize:int = 4096) -> bytes:
+    """
+    Sends the given message in a frame through a new TCP connection to the given address, and returns the message
+    in the first frame received back. Raises socket.timeout if it doesn't arrive before the timeout, and
+    ConnectionError if the connection is closed before
+    """
+    with socket.create_connection((ip, port), timeout) as conn:
+        tcp = TCPWrapper(conn, probe_frame, bufferSize, (ip, port))
+        tcp.write(frame(message))
+        ans = tcp.read()
+
+    if ans == b'':
+        raise ConnectionError(f'{ip}:{port} closed the connection before answering')
+    return ans
 
 
 class TCPWrapper:
@@ -21,22 +94,80 @@ class TCPWrapper:
     not partial messages. For example, in the buffer with "<Message 1><Message 2>",
     a call to the API of the wrapper class would return "<Message 1>" instead of
     "<Message1><Mess" or "Mess<"
+
+    The bytes are received directly into the free end of the buffer. When it is full, the partial message
+    left is moved to its beginning, and the buffer only grows (doubling) for messages larger than it
+    Contains the following attributes:
+        buffer   -> bytearray (start is the first byte not returned yet, end the first byte not received yet)
+        received -> int (number of bytes received since the wrapper was created)
     """
-    def __init__(self, conn:socket, splitFunction:Callable, bufferSize:int, address:tuple[str,int] = None):
+    def __init__(self, conn:socket, probeFunction:Callable, bufferSize:int, address:tuple[str,int] = None):
         """Default constructor
 
         Args:
             conn (socket): a TCP conn socket
-            splitFunction (function): function used to split the messages.
-            Must receive one argument - bytes - and return a tuple of bytes
-            bufferSize (int): the number of bytes to read from the socket at once
+            probeFunction (function): function used to find the messages.
+            Must receive three arguments - the buffer, and the start and end of the received bytes in it - and
+            return the start and end of the first message and the end of the bytes it takes, or None if
+            it isn't complete (see probe_frame())
+            bufferSize (int): the initial size of the buffer, and so the number of bytes to read from the socket at once
         """
         self.conn = conn
         self.address = address
-        self.splitFunction = splitFunction
-        self.bufferSize = bufferSize
-        self.buffer = b''
-        
+        self.probeFunction = probeFunction
+        self.buffer = bytearray(bufferSize)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.received = 0
+
+    def __receive__(self) -> int:
+        """
+        Receives more bytes after the ones in the buffer, making room for them first if needed
+        Returns the number of bytes received (0 if the connection was closed)
+        """
+        if self.end == len(self.buffer):
+            pending = self.end - self.start
+            if pending == len(self.buffer):     #a single message larger than the buffer
+                self.buffer = bytearray(2 * len(self.buffer))
+                self.buffer[:pending] = self.view[self.start:self.end]
+                self.view = memoryview(self.buffer)
+            else:
+                self.view[:pending] = self.view[self.start:self.end]   #memoryviews handle the overlap
+            self.start = 0
+            self.end = pending
+
+        n = self.conn.recv_into(self.view[self.end:])
+        self.end += n
+        self.received += n
+        return n
+
+    def read_view(self) -> Optional[memoryview]:
+        """Returns a view of the oldest message in the socket, or None if the connection was closed.
+
+        The view shares the memory of the buffer, so it is only valid until the next
+        read from the wrapper: it must be copied if it is kept (bytes(view))
+        """
+        while True:
+            found = self.probeFunction(self.buffer, self.start, self.end)
+            if found != None:
+                (start, stop, self.start) = found
+                if self.start == self.end:
+                    self.start = self.end = 0   #nothing left, receive the next message at the beginning of the buffer
+                return self.view[start:stop]
+
+            if self.__receive__() == 0:
+                return None
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """
+        Yields views of the messages in the socket until the connection is closed (see read_view())
+        """
+        view = self.read_view()
+        while view != None:
+            yield view
+            view = self.read_view()
+
     def read(self) -> bytes:
         """Returns the oldest message in the socket.
         
@@ -46,26 +177,10 @@ class TCPWrapper:
         big read all at once)
 
         Returns:
-            bytes: the oldest message in the socket
+            bytes: the oldest message in the socket (b'' if the connection was closed)
         """
-        result = self.splitFunction(self.buffer)
-        message = result[0]
-        buffer = result[1]
-   
-        if message is None:
-
-            addedBuffer = self.conn.recv(self.bufferSize)
-
-            
-            # There is nothing more to read
-            if addedBuffer == b'':
-                return b''
-            
-            self.buffer = self.buffer + addedBuffer
-            return self.read()
-        
-        self.buffer = buffer
-        return message
+        view = self.read_view()
+        return bytes(view) if view != None else b''
     
     def write(self, message:bytes) -> None:
         """
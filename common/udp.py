@@ -1,14 +1,20 @@
 """
 File implementing a wrapper class for a UDP socket
 
-Last Modification: Added automatic port assignment
-Date of Modification: 16/11/2022 13:56
+Last Modification: Size of the largest datagram
+Date of Modification: 18/10/2026 18:22
 """
 
 import socket
 from typing import Optional
 from . import utils
 
+"""
+Default size, in bytes, of the buffer for messages: larger datagrams are cut when received,
+so larger responses are truncated by the server instead (see DNSMessage.truncate())
+"""
+BUFFER_SIZE = 1024
+
 class UDP:
     """
     Wrapper class for a UDP socket
@@ -19,19 +25,25 @@ class UDP:
     localPort : int  -> The port to listen on. If not indicated, the OS picks a random available port
     bufferSize : int -> The size of the buffer for messages
     binding : bool   -> Whether or not to bind to the port
+    reusePort : bool -> Whether other sockets can bind to the same port (SO_REUSEPORT), to
+                        spread the received datagrams between several processes
     """
-    def __init__(self, localIP:str = utils.get_local_ip(), localPort:int = 0, timeout:Optional[float] = None, bufferSize:int = 1024, binding:bool = False):
+    def __init__(self, localIP:str = utils.get_local_ip(), localPort:int = 0, timeout:Optional[float] = None, bufferSize:int = BUFFER_SIZE, binding:bool = False, reusePort:bool = False):
         self.localIP = localIP
         self.localPort = localPort
         self.bufferSize = bufferSize
         self.serverSocket = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
         self.serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reusePort:
+            self.serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         if timeout != None:
             self.serverSocket.settimeout(timeout)
 
         if binding:
             self.serverSocket.bind((self.localIP, self.localPort))
 
+        self.buffers:list[bytearray] = []   #preallocated buffers for receive_batch()
+
 
     def receive(self) -> tuple[bytes,str,int]:
         """
@@ -51,6 +63,46 @@ class UDP:
 
         return message, ip, port
 
+    def receive_batch(self, maxMessages:int) -> list[tuple[memoryview,str,int]]:
+        """
+        Receive up to maxMessages datagrams at once
+        Waits for the first datagram like receive() (if timeout is set, raises socket.timeout),
+        then takes the ones already waiting in the socket without blocking
+
+        The datagrams are read into buffers reused between calls, so the returned messages
+        are only valid until the next call to receive_batch()
+
+        Returns:
+
+        A list of (message, ip, port), as of receive()
+        """
+        while len(self.buffers) < maxMessages:
+            self.buffers.append(bytearray(self.bufferSize))
+
+        ans = []
+        flags = 0   #only the first read blocks
+        for buffer in self.buffers[:maxMessages]:
+            try:
+                size, (ip, port) = self.serverSocket.recvfrom_into(buffer, 0, flags)
+            except BlockingIOError:
+                break
+
+            ans.append((memoryview(buffer)[:size], ip, port))
+            flags = socket.MSG_DONTWAIT
+
+        return ans
+
+    def send_batch(self, messages:list[tuple[bytes,str,int]]) -> None:
+        """
+        Send several datagrams at once
+
+        Arguments:
+
+        messages : list of (message, ip, port), as of send()
+        """
+        for message, ip, port in messages:
+            self.serverSocket.sendto(message, (ip, port))
+
     def send(self, message:str, ip:str, port:int) -> None:
         """
         Send data
@@ -3,8 +3,8 @@ File implementing a number of utilities useful throughout the project
 Some examples: regex patterns, functions for domain name manipulation and functions
 for serialization/deserialization
 
-Last Modification: Adding documentation
-Date of Modification: 14/11/2022 10:20
+Last Modification: Linear scan of best_match restored
+Date of Modification: 18/10/2026 19:05
 """
 
 from collections import OrderedDict
@@ -160,6 +160,69 @@ def is_subdomain(subdomain:str, domain:str) -> bool:
 
     return True
 
+class DomainTrie:
+    """
+    Stores valid domain names (that match DOMAIN or FULL_DOMAIN regexes) in a trie of
+    their labels, from highest to lowest hierarchically (see split_domain())
+    Finding the stored domains above a domain name costs O(number of labels),
+    regardless of how many domains are stored
+    """
+
+    def __init__(self, domains:Iterable[str] = []):
+        """
+        Constructs a trie containing the given domain names
+        """
+        self.root = {}
+
+        for domain in domains:
+            self.insert(domain)
+
+    def insert(self, domain:str) -> None:
+        """
+        Adds the given domain name to the trie
+        If an equivalent domain name was already added, the first one is kept
+        """
+        node = self.root
+        for label in split_domain(domain):
+            node = node.setdefault(label, {})
+
+        node.setdefault(None, domain)   #labels are never empty, so None marks a stored domain
+
+    def matches(self, subdomain:str) -> list[str]:
+        """
+        Returns the stored domains the subdomain is hierarchically below (see is_subdomain()),
+        from highest to lowest hierarchically
+
+        Example:
+            www.example.com. ['com.', 'example.com.', '.org' ]  -> ['com.', 'example.com.']
+        """
+        node = self.root
+        ans = [node[None]] if None in node else []
+
+        for label in split_domain(subdomain):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                ans.append(node[None])
+
+        return ans
+
+    def first(self, subdomain:str) -> Optional[str]:
+        """
+        Returns the stored domain hierarchically highest above the subdomain, or None if there is none
+        """
+        matches = self.matches(subdomain)
+        return matches[0] if matches else None
+
+    def closest(self, subdomain:str) -> Optional[str]:
+        """
+        Returns the stored domain hierarchically closest to the subdomain, or None if there is none
+        """
+        matches = self.matches(subdomain)
+        return matches[-1] if matches else None
+
+
 #returns the domain in domains that best matches the subdomain
 def best_match(subdomain:str, domains:list[str]) -> Optional[str]:
     """
@@ -220,8 +283,74 @@ def bytes_to_string(bytes:bytes, start:int = 0) -> tuple[str,int]:
     Returns a pair containing the parsed string and the number of
     consumed bytes (including the null terminator) plus the start position
     """
-    aux = bytes[start:].split(b'\x00', 1)
-    return (aux[0].decode(), start + len(aux[0]) + 1)
+    end = bytes.find(b'\x00', start)
+    if end == -1:
+        end = len(bytes)
+    return (bytes[start:end].decode(), end + 1)
+
+"""
+Byte marking a pointer in a compressed string (see write_string()). Never present in UTF-8 text
+"""
+STRING_POINTER = 0xC0
+
+def write_string(buffer:bytearray, string:str, names:Optional[dict[str,int]] = None) -> None:
+    """
+    Appends the given string to the buffer as a null-terminated array of bytes (see string_to_bytes())
+
+    If a dictionary of names is given, the string is compressed: if a suffix of the string starting
+    at a label (the whole string or the text after one of its dots) was already written in the buffer,
+    only the text before it is written, followed by STRING_POINTER and the position of the suffix
+    (2 bytes), without the null terminator. The positions of the suffixes written are added to names
+    """
+    if names == None:
+        buffer += string.encode()
+        buffer.append(0)
+        return
+
+    start = 0
+    while start < len(string):
+        suffix = string[start:]
+        offset = names.get(suffix)
+        if offset != None:
+            buffer += string[:start].encode()
+            buffer.append(STRING_POINTER)
+            buffer += offset.to_bytes(2, 'little')
+            return
+
+        pos = len(buffer) + len(string[:start].encode())
+        if pos <= 0xFFFF:
+            names[suffix] = pos
+
+        dot = string.find('.', start)
+        if dot == -1:
+            break
+        start = dot + 1
+
+    buffer += string.encode()
+    buffer.append(0)
+
+def bytes_to_compressed_string(bytes:bytes, start:int = 0) -> tuple[str,int]:
+    """
+    Extracts a string written by write_string() with a dictionary of names, starting at the specified position
+    Returns a pair containing the parsed string and the position after it
+    If a pointer doesn't point to an earlier position, a ValueError is raised
+    """
+    end = bytes.find(b'\x00', start)
+    if end == -1:
+        end = len(bytes)
+
+    pointer = bytes.find(STRING_POINTER, start, end)
+    if pointer == -1:
+        return (bytes[start:end].decode(), end + 1)
+
+    if pointer + 3 > len(bytes):
+        raise ValueError("Truncated string pointer")
+    offset = int.from_bytes(bytes[pointer + 1:pointer + 3], 'little')
+    if offset >= start:
+        raise ValueError(f"String pointer to position {offset} doesn't point backwards")
+
+    suffix, _ = bytes_to_compressed_string(bytes, offset)
+    return (bytes[start:pointer].decode() + suffix, pointer + 3)
 
 def get_local_ip() -> str:
     #return '127.0.0.1'
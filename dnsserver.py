@@ -6,11 +6,13 @@ the server state accordingly. It also has the main function
 responsible for receiving and sending DNS messages. Processing is
 done in another file.
 
-Last modification: Multiprocessing
-Date of Modification: 19/11/2022 18:11
+Last modification: Encoded responses discarded per zone and logged without storing their log lines
+Date of Modification: 18/10/2026 19:10
 '''
 #TODO: Terminate on SIGINT/SIGTERM
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import itertools
 from multiprocessing import Process
 import multiprocessing
@@ -18,21 +20,31 @@ from multiprocessing.managers import BaseManager
 from pprint import pprint
 import random
 import socket
+import time
 import traceback
 from typing import Iterable, Optional
 
 from common.logger import logger_process, LoggingEntryType,LogCreate,LogMessage
 from multiprocessing import Queue,Process
+import queue
 from common.query import QueryResponse
-from server.cache import Cache
-from server.zoneTransfer import zoneTransferSP, zoneTransferSS
+from server.cache import LockedCache
+from server.sharedCache import SharedCache
+from server.zoneTransfer import ZoneTransferServer, zoneTransferSS
 from common.dnsEntry import EntryType
-from common.udp import UDP
+from common.udp import UDP, BUFFER_SIZE
+from common.tcpWrapper import frame, is_frame, read_frame, request
+from common.asyncUDP import AsyncUDP
 from common.dnsMessage import DNSMessage, QueryInfo
 from server.serverData import ServerData
+from server.configSnapshot import ConfigSnapshot
+from server.upstreamPool import AsyncUpstreamPool, UpstreamPool
+from server.rttTracker import RTTTracker
+from server.singleFlight import AsyncSingleFlight, SingleFlight
+from server.responseCache import EncodedMessage, ResponseCache
 import common.utils as utils
 import sys
-from threading import Thread
+from threading import Event, Thread
 
 def processMessage(id:int, sendQueue : Queue, receiveQueue : Queue, msg: bytes, ip:str, p:int):
     try:
@@ -41,7 +53,7 @@ def processMessage(id:int, sendQueue : Queue, receiveQueue : Queue, msg: bytes,
         tag = id
         ans = server.process_message(msg, ip, p, sendQueue, receiveQueue)
         if ans:
-            sendQueue.put((server.encode_msg(ans),ip,p, False), block=False)
+            sendQueue.put((server.encode_datagram(ans),ip,p, False), block=False)
     except Exception as e:
         print(e)
         print(traceback.format_exc())
@@ -49,6 +61,32 @@ def processMessage(id:int, sendQueue : Queue, receiveQueue : Queue, msg: bytes,
 class MyManager(BaseManager):
     pass
 
+"""
+Number of seconds to wait for an answer from a dns server before also querying the next one (see Server.query_any())
+"""
+STAGGER_DELAY = 0.1
+
+"""
+Number of seconds a TCP connection may wait for the next query before the server closes it (see answer_connection())
+"""
+TCP_IDLE_TIMEOUT = 10
+
+"""
+Maximum number of queries that need other servers answered at the same time by each worker in the threaded mode
+(see Server.answer_batch()). The others wait for a free thread
+"""
+RECURSIVE_THREADS = 64
+
+"""
+Number of seconds between the reports of the counters of each worker to the log (see Server.report_stats())
+"""
+STATS_INTERVAL = 60
+
+"""
+Number of seconds between checks for modified database files of primary domains (see Server.reload_databases())
+"""
+RELOAD_INTERVAL = 5
+
 '''
 Represents a DNS Server, with its own cache and configuration data
 '''
@@ -61,9 +99,18 @@ class Server:
         self.manager = MyManager()
         self.manager.start()
         self.config = self.manager.ServerData(config_file, logger)
+        self.snapshot = ConfigSnapshot(self.config)
         self.resolver = resolver
         self.supports_recursive = resolver
-        self.cache = Cache()
+        cache_config = self.config.get_cache_config()
+        self.cache = SharedCache(self.manager.Cache(*cache_config), *cache_config)
+        self.upstream = None    #created by the process answering queries (see serve())
+        self.rtt = RTTTracker(timeout)
+        self.inflight = SingleFlight()     #replaced by an AsyncSingleFlight in the asyncio mode (see serve_async())
+        self.responses = ResponseCache(self.config.get_response_cache_size())
+        self.loop = None        #the event loop answering queries in the asyncio mode (see serve_async())
+        self.transfers = None   #answers the zone transfers from this server (see serve_tcp())
+        self.executor = None    #answers the queries that need other servers in the threaded mode (see serve())
         
     def encode_msg(self, msg:DNSMessage) -> bytes:
         '''
@@ -82,6 +129,36 @@ class Server:
             (msg, _) = DNSMessage.from_bytes(bytes)
             return msg
 
+    def encode_datagram(self, msg:DNSMessage) -> bytes:
+        '''
+        Same as encode_msg(), but a response that doesn't fit in a datagram is truncated (see DNSMessage.truncate()),
+        so that the query is repeated through TCP (see answer_connection())
+        '''
+        data = self.encode_msg(msg)
+        if len(data) > BUFFER_SIZE and not msg.is_query():
+            data = self.encode_msg(msg.truncate())
+        return data
+
+    def stats(self) -> dict[str,dict]:
+        '''
+        Returns the counters of the cache and of the coalesced lookups, and the round trip time estimates
+        of the servers queried by this process
+        '''
+        return {'cache': self.cache.stats(), 'upstream': self.rtt.stats(), 'inflight': self.inflight.stats()}
+
+    def report_stats(self) -> None:
+        '''
+        Logs the counters of this process (see stats()) every STATS_INTERVAL seconds, forever
+        '''
+        while True:
+            time.sleep(STATS_INTERVAL)
+            try:
+                logger.put(LogMessage(LoggingEntryType.EV, utils.get_local_ip(), \
+                    list(utils.flat_map(lambda item: [item[0] + ':', item[1]], self.stats().items()))))
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+
     def answers_query(self, query:QueryInfo) -> bool:
         '''
         Determines whether the server should answer the specified query
@@ -89,49 +166,162 @@ class Server:
         If the server is a resolver (initialized with -r flag), it answers every query
         Otherwise, only queries about certain domains (DD in config file) are answered
         '''
-        return self.resolver or self.config.answers_query(query.name)
+        return self.resolver or self.snapshot.get().answers_query(query.name)
 
-    def query(self, address:str, query:QueryInfo, recursive:bool, sq, rq) -> Optional[QueryResponse]:
+    def __check_response__(self, ans:DNSMessage, address:str, query:QueryInfo) -> Optional[QueryResponse]:
         """
-        Queries the dns server in address with the given query
-        Returns the QueryResponse, or None if the request timed out or response failed to parse
+        Checks the message received from the dns server in address in response to the given query
+        Returns the QueryResponse, or None if the message isn't a response
+        """
+        if ans.is_query():
+            logger.put(LogMessage(LoggingEntryType.ER, address, ["The received DNSMessage isn't a response: ", ans],query.name))
+            return None
+        else:
+            logger.put(LogMessage(LoggingEntryType.RR, address, [ans], query.name))
+            return ans.response
+
+    def __query_tcp__(self, address:str, msg:DNSMessage) -> Optional[DNSMessage]:
+        """
+        Sends the given query again through TCP to the dns server in address, after a truncated response
+        Returns the response, or None if it fails
         """
         ip, port = utils.decompose_address(address)
-        udp = UDP(timeout=timeout)
-        msg = DNSMessage.from_query(query, recursive)
+        try:
+            return self.decode_msg(request(ip, port, self.encode_msg(msg), timeout))
+        except socket.timeout:
+            logger.put(LogMessage(LoggingEntryType.TO, address, ['DNS query through TCP timed out'], msg.query.name))
+        except Exception as e:
+            logger.put(LogMessage(LoggingEntryType.ER, address, ['DNS query through TCP failed:', e], msg.query.name))
+
+    def query(self, address:str, query:QueryInfo, recursive:bool, sq, rq, keys:Optional[list] = None, \
+              cancelled:Optional[Event] = None) -> Optional[QueryResponse]:
+        """
+        Queries the dns server in address with the given query, through the pool of upstream sockets
+        Returns the QueryResponse, or None if the request timed out, was cancelled or the response isn't valid
+        Responses that fail to parse or don't match the query are ignored (see UpstreamPool)
+        If a list of keys is given, the key of the query in the pool is appended to it before the query is sent, so that
+        it can be cancelled. If the given event is already set by then, the query is cancelled right away instead
+        If the response is truncated, the query is sent again through TCP
+        """
+        ip, port = utils.decompose_address(address)
+        msg = DNSMessage.from_query(query, recursive, compression=True)
+        key = self.upstream.register(msg, ip)
+        if keys != None:
+            keys.append(key)
+        if cancelled != None and cancelled.is_set():  #the caller may have cancelled the keys before this one was added
+            self.upstream.cancel(key)
         
         logger.put(LogMessage(LoggingEntryType.QE, address, [msg],query.name))
 
+        start = time.monotonic()
         try:
-            global tag
-            data = udp.send(self.encode_msg(msg), ip, port)#sq.put((self.encode_msg(msg), ip, port, tag))
-            bytes, _, _ = udp.receive()#rq.get()
+            ans = self.upstream.exchange(key, msg, ip, port, self.rtt.timeout(address))
         except socket.timeout:
+            self.rtt.record_timeout(address)
             logger.put(LogMessage(LoggingEntryType.TO, address, ['DNS query timed out'],query.name))
             return None
 
-        try:
-            ans = self.decode_msg(bytes)
-            if ans.is_query():
-                logger.put(LogMessage(LoggingEntryType.ER, address, ["The received DNSMessage isn't a response: ", ans],query.name))
+        if ans == None:     #cancelled
+            return None
+        self.rtt.record(address, time.monotonic() - start)
+
+        if ans.truncated:
+            ans = self.__query_tcp__(address, msg)
+            if ans == None:
                 return None
-            else:
-                logger.put(LogMessage(LoggingEntryType.RR, address, [ans], query.name))
-                return ans.response
-        except Exception as e:
-            logger.put(LogMessage(LoggingEntryType.ER, address, [e], query.name))
+        return self.__check_response__(ans, address, query)
+
+    async def query_async(self, address:str, query:QueryInfo, recursive:bool) -> Optional[QueryResponse]:
+        """
+        Same as query(), but waits for the response without blocking the event loop
+        """
+        ip, port = utils.decompose_address(address)
+        msg = DNSMessage.from_query(query, recursive, compression=True)
+        key = self.upstream.register(msg, ip)
+        
+        logger.put(LogMessage(LoggingEntryType.QE, address, [msg],query.name))
+
+        start = time.monotonic()
+        try:
+            ans = await self.upstream.exchange(key, msg, ip, port, self.rtt.timeout(address))
+        except socket.timeout:
+            self.rtt.record_timeout(address)
+            logger.put(LogMessage(LoggingEntryType.TO, address, ['DNS query timed out'],query.name))
             return None
 
+        self.rtt.record(address, time.monotonic() - start)
+
+        if ans.truncated:
+            ans = await asyncio.to_thread(self.__query_tcp__, address, msg)
+            if ans == None:
+                return None
+        return self.__check_response__(ans, address, query)
+
     def query_any(self, addresses, query:QueryInfo, recursive:bool, sq, rq) -> Optional[QueryResponse]:
         """
-        Queries the dns servers listed in addresses with the given query
+        Queries the dns servers listed in addresses with the given query, waiting for each the time given by the RTTTracker
         Returns the QueryResponse of the first answer, or None if none answered
-        """
-        for a in addresses:
-            ans = self.query(a, query, recursive, sq, rq)
 
+        The servers are queried in order, but without waiting for a server to time out: the next
+        server is queried after STAGGER_DELAY seconds without an answer, or as soon as a query fails.
+        When an answer arrives, the queries still waiting are cancelled
+        """
+        addresses = list(addresses)
+        results = queue.Queue()
+        keys = []   #keys of the sent queries in the upstream pool, to cancel the ones still waiting
+        cancelled = Event()     #set before the keys are cancelled, for the queries that add their key afterwards
+
+        def run(address):
+            ans = None
+            try:
+                ans = self.query(address, query, recursive, sq, rq, keys, cancelled)
+            finally:
+                results.put(ans)
+
+        started = 0
+        finished = 0
+        ans = None
+        while finished < len(addresses):
+            if started < len(addresses):
+                Thread(target = run, args=(addresses[started],)).start()
+                started += 1
+
+            try:
+                ans = results.get(timeout = STAGGER_DELAY if started < len(addresses) else None)
+            except queue.Empty:
+                continue
+
+            finished += 1
             if ans:
-                return ans
+                break
+
+        cancelled.set()
+        for key in list(keys):
+            self.upstream.cancel(key)
+        return ans
+
+    async def query_any_async(self, addresses, query:QueryInfo, recursive:bool) -> Optional[QueryResponse]:
+        """
+        Same as query_any(), but waits for the responses without blocking the event loop
+        """
+        addresses = list(addresses)
+        tasks = set()
+        started = 0
+
+        try:
+            while started < len(addresses) or tasks:
+                if started < len(addresses):
+                    tasks.add(asyncio.create_task(self.query_async(addresses[started], query, recursive)))
+                    started += 1
+
+                done, tasks = await asyncio.wait(tasks, timeout = STAGGER_DELAY if started < len(addresses) else None, \
+                                                 return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result():
+                        return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
 
     def resolve_address(self, hostname) -> Iterable[str]:
         """
@@ -141,111 +331,413 @@ class Server:
         ans = self.answer_query(QueryInfo(hostname, EntryType.A), True)
         return map(lambda e: e.value, ans.values) if ans else []
 
+    def __local_answer__(self, query:QueryInfo, recursive:bool) -> tuple[QueryResponse,bool]:
+        """
+        First step of answer_query(): answers the query using the zones, the cache and the first servers
+        Returns the QueryResponse and whether it is the definitive answer. If it isn't, the next
+        servers to contact are in its authorities and extra values
+        """
+        config = self.snapshot.get()  #same copy of the zones during the whole query
+
+        db_ans = config.answer_query(query)   #try database
+        if db_ans.isFinal():
+            return (db_ans, True)
+
+        cache_ans = self.cache.answer_query(query)    #try cache
+        if cache_ans.isFinal():
+            return (cache_ans, True)
+        
+        #Calculate first servers (servers from which the response can be searched from)
+        first_ans = config.get_first_servers(query.name)
+        prev_ans = QueryResponse.from_entries_strict(query, \
+            list(itertools.chain(db_ans.all_entries(), cache_ans.all_entries(), first_ans.all_entries())))
+        self.cache.add_response(prev_ans)
+        
+        return (prev_ans, not recursive)    #give up if not recursive :)
+
+    def __next_servers__(self, prev_ans:QueryResponse) -> list[str]:
+        """
+        Returns the addresses of the next dns servers in the hierarchy to contact, given the previous answer,
+        from the fastest to the slowest (see RTTTracker)
+        """
+        #Query wasn't successful yet, so the next step is to contact the next dns in the hierarchy
+        #First, order received authorities from least to most specific (assume all of them match)
+        prev_ans.authorities.sort(key=lambda e: len(utils.split_domain(e.parameter)))
+        auths:list[str] = [e.value for e in prev_ans.authorities]               #next, get the hostname of their dns
+        return self.rtt.order([e.value for e in prev_ans.extra_values])#utils.flat_map(lambda dns: self.resolve_address(dns), auths) #lazily fetch address for each one
+
+    def __recursion_step__(self, query:QueryInfo, prev_ans:QueryResponse, ans:Optional[QueryResponse]) -> tuple[QueryResponse,bool]:
+        """
+        Given the previous answer and the answer of the next servers (None if none answered),
+        returns the new answer and whether it is the definitive answer
+        """
+        if not ans:   
+            #can't contact anyone :(
+            return (prev_ans, True)
+
+        if ans.isFinal():  #success!
+            self.cache.add_response(ans, query)
+            return (ans, True)
+
+        return (ans, False)  #store previous answer
+
     #TODO: response code 2 when domain doesn't exist (flag A)
     def answer_query(self, query:QueryInfo, recursive:bool, sq, rq) -> Optional[QueryResponse]:
         """
         Given a query and whether to run recursively, returns an
         answering QueryResponse or None if it isn't possible to answer
         """
-
         try:
-            db_ans = self.config.answer_query(query)   #try database
-            if db_ans.isFinal():
-                return db_ans
-
-            cache_ans = self.cache.answer_query(query)    #try cache
-            if cache_ans.isFinal():
-                return cache_ans
-            
-            #Calculate first servers (servers from which the response can be searched from)
-            first_ans = self.config.get_first_servers(query.name)
-            prev_ans = QueryResponse.from_entries_strict(query, \
-                list(itertools.chain(db_ans.all_entries(), cache_ans.all_entries(), first_ans.all_entries())))
-            self.cache.add_response(prev_ans)
-            
-            if not recursive:#give up :)
-                return prev_ans
-            
-            while True:
-                #Query wasn't successful yet, so the next step is to contact the next dns in the hierarchy
-                #First, order received authorities from least to most specific (assume all of them match)
-                prev_ans.authorities.sort(key=lambda e: len(utils.split_domain(e.parameter)))
-                auths:list[str] = [e.value for e in prev_ans.authorities]               #next, get the hostname of their dns
-                next_dns = [e.value for e in prev_ans.extra_values]#utils.flat_map(lambda dns: self.resolve_address(dns), auths) #lazily fetch address for each one
-                ans:Optional[QueryResponse] = self.query_any(next_dns, query, recursive, sq, rq)
-                if not ans:   
-                    #can't contact anyone :(
-                    return prev_ans
-
-                if ans.isFinal():  #success!
-                    self.cache.add_response(ans, query)
-                    return ans
-
-                prev_ans = ans  #store previous answer
-
+            ans, done = self.__local_answer__(query, recursive)
+            return self.__recurse__(query, recursive, ans, done, sq, rq)
         except Exception as e:
             print(e)
             print(traceback.format_exc())
 
-    def process_message(self, message:bytes, ip:str, port:int, sq, rq) -> Optional[DNSMessage]:
+    def __recurse__(self, query:QueryInfo, recursive:bool, ans:QueryResponse, done:bool, sq, rq) -> QueryResponse:
+        """
+        Continues answer_query() from the given answer (see __local_answer__()),
+        contacting the next servers in the hierarchy until the answer is definitive
+
+        Identical lookups running at the same time are coalesced: only the first one contacts
+        other servers, and the others wait for its answer (see SingleFlight)
+        """
+        if done:
+            return ans
+        return self.inflight.do((query, recursive), self.__resolve__, query, recursive, ans, sq, rq)
+
+    def __resolve__(self, query:QueryInfo, recursive:bool, ans:QueryResponse, sq, rq) -> QueryResponse:
+        done = False
+        while not done:
+            next_ans = self.query_any(self.__next_servers__(ans), query, recursive, sq, rq)
+            ans, done = self.__recursion_step__(query, ans, next_ans)
+
+        return ans
+
+    async def __resolve_async__(self, query:QueryInfo, recursive:bool, ans:QueryResponse) -> QueryResponse:
+        done = False
+        while not done:
+            next_ans = await self.query_any_async(self.__next_servers__(ans), query, recursive)
+            ans, done = self.__recursion_step__(query, ans, next_ans)
+
+        return ans
+
+    def __receive_query__(self, message:bytes, address:str) -> tuple[Optional[DNSMessage],Optional[DNSMessage]]:
         '''
-        Processes the received message from the given address
-        Returns a response message, or None if the query shouldn't be answered (see answers_query())
+        Decodes and validates the message received from the given address
+        Returns a pair containing the query to answer, or None and the response to
+        send right away (None if the query shouldn't be answered, see answers_query())
         '''
-        address = f'{ip}:{port}'
-
         try:
             msg = self.decode_msg(message)
         except Exception as e:
             resp = DNSMessage.error_response(self.supports_recursive)
             logger.put(LogMessage(LoggingEntryType.ER, address, ["Error decoding DNSMessage:", e]))
             logger.put(LogMessage(LoggingEntryType.RP, address, [resp]))
-            return resp
+            return (None, resp)
         
         if not msg.is_query():
             logger.put(LogMessage(LoggingEntryType.ER, address, ["The received DNSMessage isn't a query:", msg]))
             resp = msg.generate_error_response(self.supports_recursive)
             logger.put(LogMessage(LoggingEntryType.RP, address, [resp]))
-            return resp
+            return (None, resp)
 
         if not self.answers_query(msg.query):
             logger.put(LogMessage(LoggingEntryType.ER, address, ["The received query shouldn't be answered:", msg]))
-            return None
+            return (None, None)
         
         logger.put(LogMessage(LoggingEntryType.QE, address, [msg], msg.query.name))
+        return (msg, None)
 
-        ans = self.answer_query(msg.query, msg.recursive and self.supports_recursive, sq, rq)
-
+    def __respond__(self, msg:DNSMessage, ans:Optional[QueryResponse], address:str) -> Optional[DNSMessage]:
+        '''
+        Generates the response message to the given query from its answer
+        Returns None if there is no answer
+        '''
         if ans:
             resp = msg.generate_response(ans, self.supports_recursive)
             logger.put(LogMessage(LoggingEntryType.RP, address, [resp], msg.query.name))
             return resp
 
-    def answer_client(self, msg, ip, p):
-        ans = self.process_message(msg, ip, p, None, None)
-        if ans:
-            udp = UDP(timeout=timeout)
-            udp.send(self.encode_msg(ans), ip, p)
+    def process_message(self, message:bytes, ip:str, port:int, sq, rq) -> Optional[DNSMessage]:
+        '''
+        Processes the received message from the given address
+        Returns a response message, or None if the query shouldn't be answered (see answers_query())
+        '''
+        address = f'{ip}:{port}'
+        msg, resp = self.__receive_query__(message, address)
+        if not msg:
+            return resp
+
+        ans = self.answer_query(msg.query, msg.recursive and self.supports_recursive, sq, rq)
+        return self.__respond__(msg, ans, address)
+
+    def answer_client(self, msg:DNSMessage, ans:QueryResponse, ip, p):
+        """
+        Finishes answering a query from a batch (see answer_batch()) that needs other servers to be contacted
+        Runs in a thread of the executor, so errors are printed here instead of being kept by the future
+        """
+        try:
+            ans = self.__recurse__(msg.query, msg.recursive and self.supports_recursive, ans, False, None, None)
+            resp = self.__respond__(msg, ans, f'{ip}:{p}')
+            if resp:
+                self.server.send(self.encode_datagram(resp), ip, p)   #reply from the listening socket
+        except Exception as e:
+            print(e)
+            print(traceback.format_exc())
+
+    def __answer_inline__(self, message:bytes, address:str) -> tuple[Optional[DNSMessage],Optional[QueryResponse],Optional[bytes]]:
+        """
+        Answers the message received from the given address without contacting other servers
+        Returns a triple with the query and the answer to continue from if other servers need to be
+        contacted (see answer_client()), or the encoded response to send right away (None if there is none)
+
+        Responses to queries answered from the zones are kept encoded (see ResponseCache), so that the
+        same query is answered again without decoding it or building the response
+        """
+        config = self.snapshot.get()    #fetched before the zones, so that a response is never stored with a newer version
+        if not utils.debug:
+            cached = self.responses.get(message, config)
+            if cached:
+                data = cached.reply(message)
+                logger.put(LogMessage(LoggingEntryType.QE, address, [EncodedMessage(message)], cached.name))
+                logger.put(LogMessage(LoggingEntryType.RP, address, [EncodedMessage(data)], cached.name))
+                return (None, None, data)
+
+        msg, resp = self.__receive_query__(message, address)
+        if not msg:
+            return (None, None, self.encode_msg(resp) if resp else None)
+
+        ans, done = self.__local_answer__(msg.query, msg.recursive and self.supports_recursive)
+        if not done:
+            return (msg, ans, None)
+
+        resp = self.__respond__(msg, ans, address)
+        if not resp:
+            return (None, None, None)
+
+        data = self.encode_datagram(resp)
+        if ans.authoritative and not utils.debug:   #answered from the zones
+            self.responses.put(message, config, msg.query.name, data)
+        return (None, None, data)
+
+    def answer_batch(self, batch:list[tuple[bytes,str,int]]) -> list[tuple[bytes,str,int]]:
+        """
+        Processes a batch of received messages (see UDP.receive_batch())
+        Queries that can be answered without contacting other servers are answered in the current thread,
+        and the others continue in a thread of the executor (see answer_client())
+        Returns the list of responses to send right away
+        """
+        replies = []
+
+        for message, ip, p in batch:
+            try:
+                msg, ans, data = self.__answer_inline__(bytes(message), f'{ip}:{p}')
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+                continue
+
+            if msg:
+                self.executor.submit(self.answer_client, msg, ans, ip, p)
+            elif data:
+                replies.append((data, ip, p))
+
+        return replies
+
+    async def answer_client_async(self, msg:DNSMessage, ans:QueryResponse, ip, p):
+        """
+        Same as answer_client(), but queries other servers without blocking the event loop
+        """
+        query = msg.query
+        recursive = msg.recursive and self.supports_recursive
+        try:
+            ans = await self.inflight.do((query, recursive), self.__resolve_async__, query, recursive, ans)
+        except Exception as e:
+            print(e)
+            print(traceback.format_exc())
+            return
+
+        resp = self.__respond__(msg, ans, f'{ip}:{p}')
+        if resp:
+            self.server.send(self.encode_datagram(resp), ip, p)   #reply from the listening socket
+
+    def answer_stream(self, message:bytes, ip:str, p:int) -> Optional[bytes]:
+        """
+        Answers the message received through TCP from the given address (see answer_connection())
+        Returns the encoded response, never truncated, or None if there is none
+        In the asyncio mode, the other servers are contacted from the event loop
+        """
+        address = f'{ip}:{p}'
+        msg, resp = self.__receive_query__(message, address)
+        if not msg:
+            return self.encode_msg(resp) if resp else None
+
+        query = msg.query
+        recursive = msg.recursive and self.supports_recursive
+        ans, done = self.__local_answer__(query, recursive)
+        if not done and self.loop:
+            ans = asyncio.run_coroutine_threadsafe(self.inflight.do((query, recursive), self.__resolve_async__, query, recursive, ans), \
+                                                   self.loop).result()
+        else:
+            ans = self.__recurse__(query, recursive, ans, done, None, None)
+
+        resp = self.__respond__(msg, ans, address)
+        return self.encode_msg(resp) if resp else None
+
+    async def answer_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        """
+        Answers the queries received in frames (see frame()) through the given TCP connection, until it is
+        closed or stays idle for TCP_IDLE_TIMEOUT seconds. Each query is answered in a thread of the default executor of the event loop
+        Connections that don't start with a frame are zone transfers, and are handed to the ZoneTransferServer
+        """
+        address = writer.get_extra_info('peername')
+        try:
+            first = await asyncio.wait_for(reader.read(1), TCP_IDLE_TIMEOUT)
+            if first != b'' and not is_frame(first):
+                await self.transfers.answer(reader, writer, first)
+                return
+
+            message = await asyncio.wait_for(read_frame(reader, first), TCP_IDLE_TIMEOUT) if first else b''
+            while message != b'':
+                data = await asyncio.to_thread(self.answer_stream, message, *address[:2])
+                if data:
+                    writer.write(frame(data))
+                    await writer.drain()
+                message = await asyncio.wait_for(read_frame(reader), TCP_IDLE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(e)
+            print(traceback.format_exc())
+        finally:
+            writer.close()
+
+    def serve_tcp(self, maxTransfers:int = 8) -> None:
+        """
+        Accepts TCP connections on the listening port forever, answering each one in a coroutine of an event loop
+        of its own (see answer_connection())
+        The port is shared by the queries with responses too large for a datagram and by the zone transfers,
+        with at most maxTransfers zone transfer requests answered at the same time (see ZoneTransferServer)
+        A single process of the server may call this method, as the limits of the zone transfers are kept in memory
+        """
+        tcpSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcpSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        tcpSocket.bind((utils.get_local_ip(), port))
+        tcpSocket.listen()
+
+        async def accept():
+            self.transfers = ZoneTransferServer(self.snapshot.get, logger, maxTransfers)
+            tcpServer = await asyncio.start_server(self.answer_connection, sock = tcpSocket)
+            async with tcpServer:
+                await tcpServer.serve_forever()
+
+        try:
+            asyncio.run(accept())
+        finally:
+            tcpSocket.close()
+
+    async def serve_async(self, reusePort:bool = False, maxTransfers:int = 8, acceptTCP:bool = True) -> None:
+        """
+        Receives and answers queries on a single event loop
+        Queries that need other servers to be contacted continue in a task each
+        TCP connections are only accepted if acceptTCP is set (see serve())
+        """
+        self.server = await AsyncUDP.open(utils.get_local_ip(), port, binding=True, reusePort=reusePort)
+        self.upstream = await AsyncUpstreamPool.open(self.encode_msg, self.decode_msg)
+        self.inflight = AsyncSingleFlight()
+        self.loop = asyncio.get_running_loop()
+        if acceptTCP:
+            Thread(target = self.serve_tcp, args=(maxTransfers,), daemon = True).start()
+        tasks = set()   #keep a reference to running tasks, so they aren't garbage collected
+
+        while(True):
+            message, ip, p = await self.server.receive()
+            try:
+                msg, ans, data = self.__answer_inline__(message, f'{ip}:{p}')
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+                continue
+
+            if msg:
+                task = asyncio.create_task(self.answer_client_async(msg, ans, ip, p))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif data:
+                self.server.send(data, ip, p)
             
-    def run(self) -> None:
-        procs = []
-        #Add the single SP zone transfer process to the list
-        procs.append(Process(target=zoneTransferSP, args=[self.config, logger, utils.get_local_ip(), port]))
+    def serve(self, useAsync:bool = False, reusePort:bool = False, batchSize:int = 32, maxTransfers:int = 8, \
+              acceptTCP:bool = True) -> None:
+        """
+        Answers queries on the listening port forever, in the current process
+        Queries are received in batches of up to batchSize datagrams, and the ones that need other
+        servers are answered by a pool of up to RECURSIVE_THREADS threads. If useAsync is set, each query is answered in a
+        task of a single event loop instead
+        If acceptTCP is set, TCP connections, for queries and zone transfers, are accepted in another thread
+        (see serve_tcp()), with at most maxTransfers zone transfer requests answered at the same time
+        The counters of the worker are logged periodically (see report_stats())
+        If reusePort is set, other processes can listen on the same port (see UDP)
+        """
+        self.snapshot.start()
+        self.cache.start()
+        Thread(target = self.report_stats, daemon = True).start()
+
+        if useAsync:
+            asyncio.run(self.serve_async(reusePort, maxTransfers, acceptTCP))
+            return
+
+        self.server = UDP(localPort=port,binding = True, reusePort = reusePort)
+        self.upstream = UpstreamPool(self.encode_msg, self.decode_msg)
+        self.executor = ThreadPoolExecutor(RECURSIVE_THREADS)
+        if acceptTCP:
+            Thread(target = self.serve_tcp, args=(maxTransfers,), daemon = True).start()
+
+        while(True):
+           batch = self.server.receive_batch(batchSize)
+           self.server.send_batch(self.answer_batch(batch))
 
-        for domain in self.config.get_secondary_domains():
-            procs.append(Process(target=zoneTransferSS, args=[self.config, logger, domain.name]))
+    def reload_databases(self) -> None:
+        """
+        Reads the database files of the primary domains again every RELOAD_INTERVAL seconds, if they were modified
+        The changes reach the SS's in their next zone transfer (see ZoneJournal)
+        """
+        while True:
+            time.sleep(RELOAD_INTERVAL)
+            try:
+                self.config.reload_databases()
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+
+    def run(self, useAsync:bool = False, workers:int = 1, batchSize:int = 32, maxTransfers:int = 8) -> None:
+        """
+        Starts the SS zone transfer process and answers queries forever
+        Zone transfers from this server are answered on the same TCP port as the queries (see serve_tcp())
+        If more than one worker is requested, each worker is a new process listening on the same
+        port, with its own copy of the zones (see ConfigSnapshot) and the kernel spreading the queries between them
+        Only the first worker accepts TCP connections, so that the limits of the zone transfers (see ZoneTransferServer)
+        apply to the whole server instead of to each worker
+        """
+        procs = []
+        if self.config.get_secondary_domains():
+            procs.append(Process(target=zoneTransferSS, args=[self.config, logger]))
 
         for proc in procs:
             proc.start()
+        Thread(target = self.reload_databases, daemon = True).start()
 
+        logger.put(LogMessage(LoggingEntryType.ST, utils.get_local_ip(), ['port:', port, 'timeout(ms):', timeout * 1000, 'debug:', utils.debug, 'workers:', workers]))
 
-        logger.put(LogMessage(LoggingEntryType.ST, utils.get_local_ip(), ['port:', port, 'timeout(ms):', timeout * 1000, 'debug:', utils.debug]))
-        self.server = UDP(localPort=port,binding = True)
+        if workers == 1:
+            self.serve(useAsync, False, batchSize, maxTransfers)
+            return
 
-        while(True):
-           msg, ip, p = self.server.receive()
-           t1 = Thread(target = self.answer_client, args=(msg,ip,p,))
-           t1.start()
+        procs = [Process(target=self.serve, args=[useAsync, True, batchSize, maxTransfers, i == 0]) for i in range(workers)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
       
     
 def extract_flag(flag:str) -> str:
@@ -274,8 +766,13 @@ def main() -> None:
     -c : The path to the configuration file
     -r : Whether this server is a resolver (SR) or not
     -d : If the server is in debug mode
+    -a : Whether to answer queries on an asyncio event loop instead of a thread per query
+    -w : The number of worker processes answering queries (optional, 1 by default)
+    -b : The maximum number of datagrams received at once (optional, 32 by default)
+    -x : The maximum number of zone transfer requests answered at the same time (optional, 8 by default)
     '''
     MyManager.register('ServerData', ServerData)
+    MyManager.register('Cache', LockedCache)
     utils.debug = "-d" in sys.argv
     resolver = "-r" in sys.argv
 
@@ -294,11 +791,26 @@ def main() -> None:
     p=Process(target=logger_process,args=(logger, utils.debug))
     p.start()
 
+    workers = int(extract_flag("-w")) if "-w" in sys.argv else 1
+    if workers < 1:
+        print("Invalid number of workers")
+        exit(1)
+
+    batchSize = int(extract_flag("-b")) if "-b" in sys.argv else 32
+    if batchSize < 1:
+        print("Invalid batch size")
+        exit(1)
+
+    maxTransfers = int(extract_flag("-x")) if "-x" in sys.argv else 8
+    if maxTransfers < 1:
+        print("Invalid number of zone transfers")
+        exit(1)
+
     #Config
     config_file = extract_flag("-c")
     global server
     server = Server(resolver, config_file)
-    server.run()
+    server.run("-a" in sys.argv, workers, batchSize, maxTransfers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
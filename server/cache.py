@@ -3,35 +3,175 @@ File implementing the cache
 The cache stores received answers from previously asked queries and can be
 queried to prevent redundant queries to dns servers
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 11:53
+Last Modification: Negative answers removed from the cache when they expire
+Date of Modification: 18/10/2026 19:05
 """
 
+import heapq
+import threading
 import traceback
-from typing import Optional
+from typing import Any, Hashable, Optional
 import time
 import itertools
 from common.dnsEntry import DNSEntry
 from common.query import QueryInfo
 from common.query import QueryResponse
+from server.evictionPolicy import EVICTION_POLICIES
+from server.zoneIndex import ZoneIndex
+
+"""
+Approximate number of bytes used by a cache line, besides the strings it contains
+"""
+LINE_OVERHEAD = 400
+
+"""
+Number of seconds a negative answer is kept in the cache
+"""
+NEGATIVE_TTL = 60
+
+def line_size(key:Hashable) -> int:
+    """
+    Returns the approximate number of bytes used by a cache line (a DNSEntry or a QueryInfo)
+    """
+    if isinstance(key, QueryInfo):
+        return LINE_OVERHEAD + len(key.name)
+    return LINE_OVERHEAD + len(key.parameter) + len(key.value)
 
 class Cache:
     """
     Stores DNSEntry's and answers queries using the still valid entries
+    Contains the following attributes:
+        lines       -> Dict[DNSEntry,float] (entry to the time it expires)
+        negative    -> Dict[QueryInfo,float] (queries known to have no answer to the time it expires)
+        index       -> ZoneIndex (the entries in lines indexed by name and type)
+        expirations -> List[(float,int,DNSEntry/QueryInfo)] (heap with the expiration times of the entries in lines
+                       and of the negative answers)
+        maxEntries  -> int/None (maximum number of lines, entries and negative answers. None if unlimited)
+        maxBytes    -> int/None (maximum approximate memory used by the lines, see line_size(). None if unlimited)
+        policy      -> EvictionPolicy (chooses the line to remove when a limit is exceeded)
+        policyName  -> str (the name of the policy, see EVICTION_POLICIES)
+        size        -> int (approximate memory used by the lines)
+        evictions   -> int (number of lines removed to respect the limits)
+
+    Expired entries and negative answers are only removed when the cache is queried, by popping the heap
+    until the first item still valid is found
     """
     
-    def __init__(self):
+    def __init__(self, maxEntries:Optional[int] = None, maxBytes:Optional[int] = None, policy:str = 'LRU'):
         """
-        Constructs an empty cache
+        Constructs an empty cache with the given limits and eviction policy (see EVICTION_POLICIES)
+        If the policy doesn't exist, a ValueError is raised
         """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy}")
+
         self.lines:dict[DNSEntry,float] = {}
         self.negative:dict[QueryInfo,float] = {}
+        self.index = ZoneIndex()
+        self.expirations:list[tuple[float,int,Hashable]] = []
+        self.counter = itertools.count()    #breaks ties in the heap, as DNSEntry's and QueryInfo's can't be compared
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.policy = EVICTION_POLICIES[policy]()
+        self.policyName = policy
+        self.size = 0
+        self.evictions = 0
         
-    def add_entry(self, dnsEntry:DNSEntry) -> None:
+    def add_entry(self, dnsEntry:DNSEntry, expires:Optional[float] = None) -> None:
         """
         Adds a DNSEntry to the cache
+        The entry expires at the given time, or after its TTL if no time is given
+        """
+        if expires == None:
+            expires = time.time() + dnsEntry.ttl
+        previous = self.lines.get(dnsEntry)
+
+        if previous == None:
+            self.index.add_entry(dnsEntry)
+            self.size += line_size(dnsEntry)
+
+        #every entry keeps an item in the heap that expires no later than the entry itself
+        if previous == None or expires < previous:
+            heapq.heappush(self.expirations, (expires, next(self.counter), dnsEntry))
+
+        self.lines[dnsEntry] = expires
+        self.policy.add(dnsEntry, expires)
+        self.__evict__()
+
+    def add_negative(self, query:QueryInfo, expires:Optional[float] = None) -> None:
         """
-        self.lines[dnsEntry] = time.time() + dnsEntry.ttl
+        Registers that the given query has no answer
+        The information expires at the given time, or after NEGATIVE_TTL seconds if no time is given
+        """
+        if expires == None:
+            expires = time.time() + NEGATIVE_TTL
+
+        previous = self.negative.get(query)
+
+        if previous == None:
+            self.size += line_size(query)
+
+        #like the entries, every negative answer keeps an item in the heap that expires no later than itself
+        if previous == None or expires < previous:
+            heapq.heappush(self.expirations, (expires, next(self.counter), query))
+
+        self.negative[query] = expires
+        self.policy.add(query, expires)
+        self.__evict__()
+
+    def __remove__(self, key:Hashable) -> None:
+        """
+        Removes a line (a DNSEntry or a QueryInfo) from the cache
+        """
+        if isinstance(key, QueryInfo):
+            del self.negative[key]
+        else:
+            del self.lines[key]
+            self.index.remove_entry(key)
+
+        self.policy.remove(key)
+        self.size -= line_size(key)
+
+    def __expires__(self, key:Hashable) -> Optional[float]:
+        """
+        Returns the time a line (a DNSEntry or a QueryInfo) expires, or None if it isn't in the cache
+        """
+        if isinstance(key, QueryInfo):
+            return self.negative.get(key)
+        return self.lines.get(key)
+
+    def __evict__(self) -> None:
+        """
+        Removes lines chosen by the eviction policy until the cache respects its limits
+        The heap of expirations is rebuilt if removed entries make up most of it
+        """
+        while (self.maxEntries != None and len(self.lines) + len(self.negative) > self.maxEntries) \
+                or (self.maxBytes != None and self.size > self.maxBytes):
+            key = self.policy.victim()
+            if key == None:
+                break
+            self.__remove__(key)
+            self.evictions += 1
+
+        if len(self.expirations) > 2 * (len(self.lines) + len(self.negative)) + 64:
+            self.expirations = [(v, next(self.counter), k) for k,v in itertools.chain(self.lines.items(), self.negative.items())]
+            heapq.heapify(self.expirations)
+
+    def __expire__(self, cur_time:float) -> None:
+        """
+        Removes all entries and negative answers that expired before the given time
+        Lines that were added again since their item was pushed go back to the heap with the new expiration time
+        """
+        while self.expirations and self.expirations[0][0] < cur_time:
+            _, _, key = heapq.heappop(self.expirations)
+            expires = self.__expires__(key)
+
+            if expires == None:
+                continue
+            elif expires < cur_time:
+                self.__remove__(key)
+            else:
+                heapq.heappush(self.expirations, (expires, next(self.counter), key))
         
     def answer_query(self, query:QueryInfo) -> QueryResponse:
         """
@@ -42,18 +182,29 @@ class Cache:
 
         if query in self.negative:
             if self.negative[query] >= cur_time:
+                self.policy.access(query)
                 return QueryResponse([],[],[],True)
             else:
-                del self.negative[query]
+                self.__remove__(query)
 
-        items = {}
-        for k,v in self.lines.items():
-            if v >= cur_time:
-                items[k] = v
-        
-        self.lines = items
+        self.__expire__(cur_time)
+
+        ans = self.index.answer_query(query)
+        for entry in ans.all_entries():
+            self.policy.access(entry)
+        return ans
+
+    def answer_query_expiring(self, query:QueryInfo) -> tuple[QueryResponse,list[float]]:
+        """
+        Same as answer_query(), but also returns the times at which the information expires:
+        the expiration time of each entry (in the order of QueryResponse.all_entries()),
+        or of the negative answer if the query is known to have no answer
+        """
+        ans = self.answer_query(query)
 
-        return QueryResponse.from_entries(query, self.lines)
+        if query in self.negative:
+            return (ans, [self.negative[query]])
+        return (ans, [self.lines[e] for e in ans.all_entries()])
     
     def add_response(self, response:QueryResponse, query:Optional[QueryInfo]=None) -> None:
         """
@@ -63,4 +214,66 @@ class Cache:
             self.add_entry(entry)
 
         if query != None and response.isFinal() and len(response.values) == 0:
-            self.negative[query] = time.time() + 60
\ No newline at end of file
+            self.add_negative(query)
+
+    def add_responses(self, responses:list[tuple[QueryResponse,Optional[QueryInfo]]]) -> None:
+        """
+        Adds all given responses to the cache (see add_response())
+        Allows a batch of responses to be added with a single call when the cache is shared through a manager
+        """
+        for response, query in responses:
+            self.add_response(response, query)
+
+    def stats(self) -> dict[str,Any]:
+        """
+        Returns counters describing the current state of the cache, and its limits and eviction policy
+        Reported periodically by each worker (see Server.report_stats())
+        """
+        return {
+            'entries': len(self.lines),
+            'negative': len(self.negative),
+            'bytes': self.size,
+            'evictions': self.evictions,
+            'max_entries': self.maxEntries,
+            'max_bytes': self.maxBytes,
+            'policy': self.policyName
+        }
+
+
+class LockedCache(Cache):
+    """
+    Cache shared by several processes through a manager (see SharedCache)
+    The manager answers each process in its own thread, so every public method holds a lock
+    """
+
+    def __init__(self, maxEntries:Optional[int] = None, maxBytes:Optional[int] = None, policy:str = 'LRU'):
+        super().__init__(maxEntries, maxBytes, policy)
+        self.lock = threading.RLock()   #reentrant, as the public methods call each other
+
+    def add_entry(self, dnsEntry:DNSEntry, expires:Optional[float] = None) -> None:
+        with self.lock:
+            super().add_entry(dnsEntry, expires)
+
+    def add_negative(self, query:QueryInfo, expires:Optional[float] = None) -> None:
+        with self.lock:
+            super().add_negative(query, expires)
+
+    def answer_query(self, query:QueryInfo) -> QueryResponse:
+        with self.lock:
+            return super().answer_query(query)
+
+    def answer_query_expiring(self, query:QueryInfo) -> tuple[QueryResponse,list[float]]:
+        with self.lock:
+            return super().answer_query_expiring(query)
+
+    def add_response(self, response:QueryResponse, query:Optional[QueryInfo]=None) -> None:
+        with self.lock:
+            super().add_response(response, query)
+
+    def add_responses(self, responses:list[tuple[QueryResponse,Optional[QueryInfo]]]) -> None:
+        with self.lock:
+            super().add_responses(responses)
+
+    def stats(self) -> dict[str,Any]:
+        with self.lock:
+            return super().stats()
@@ -0,0 +1,102 @@
+"""
+File implementing the class ConfigSnapshot
+A config snapshot keeps a local copy of the ServerData hosted by the server's manager,
+so that queries can be answered without a round-trip to the manager process
+
+Last Modification: Versions of the replaced domains kept in the local copy
+Date of Modification: 18/10/2026 19:10
+"""
+
+import copy
+import threading
+import time
+import traceback
+from collections import OrderedDict
+import common.utils as utils
+from server.domain import Domain, SecondaryDomain
+from server.serverData import ServerData
+
+
+class ConfigSnapshot:
+    """
+    Local, read-only copy of a ServerData shared through a manager
+    Contains the following attributes:
+        source   -> ServerData (the proxy to the shared instance)
+        data     -> ServerData (the local copy)
+        version  -> int (the version of the shared instance the local copy corresponds to)
+        interval -> float (number of seconds between checks for updated domains)
+
+    The local copy is never modified: when domains are replaced in the shared instance (after a
+    zone transfer), a new copy containing the updated domains is built and swapped in with a single
+    assignment. Callers should fetch the copy once (see get()) and use it for the whole query
+    The version of each domain in the copy (see ServerData.domainVersions) changes whenever it is replaced,
+    so that data derived from a single domain can be discarded with it (see ResponseCache)
+
+    Secondary domains arrive as a compact image of their entries, and are indexed before being swapped
+    in (see SecondaryDomain.load()), so that lookups never see a domain that isn't ready
+    """
+
+    def __init__(self, source, interval:float = 1):
+        """
+        Constructs a snapshot of the given ServerData (usually a proxy)
+        """
+        self.source = source
+        self.interval = interval
+        self.version, self.data = source.get_snapshot()
+        for domain in self.data.domains.values():
+            self.__load__(domain)
+
+    def __load__(self, domain:Domain) -> None:
+        if isinstance(domain, SecondaryDomain):
+            domain.load()
+
+    def get(self) -> ServerData:
+        """
+        Returns the current local copy
+        """
+        return self.data
+
+    def refresh(self) -> None:
+        """
+        Fetches the domains replaced in the shared instance since the current version
+        and swaps in a new local copy containing them
+        Only the version is transferred while no domain is replaced
+        """
+        if self.source.get_version() == self.version:
+            return
+
+        version, updated = self.source.get_updates(self.version)
+
+        data = copy.copy(self.data)
+        data.domains = OrderedDict(self.data.domains)
+        data.domainVersions = dict(self.data.domainVersions)
+        new_names = False
+        for name, domain in updated.items():
+            self.__load__(domain)
+            new_names = new_names or name not in data.domains
+            data.domains[name] = domain
+            data.domainVersions[name] = version     #may be newer than the version the domain was replaced in
+
+        if new_names:
+            data.domainTrie = utils.DomainTrie(data.domains)
+
+        self.data = data
+        self.version = version
+
+    def __run__(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except (EOFError, ConnectionError, FileNotFoundError):
+                pass    #the manager is unreachable during shutdown; keep the current copy
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+
+    def start(self) -> None:
+        """
+        Starts a daemon thread refreshing the local copy every interval seconds
+        Must be called in every process using the snapshot, as threads don't survive a fork
+        """
+        threading.Thread(target=self.__run__, daemon=True).start()
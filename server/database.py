@@ -1,16 +1,18 @@
 """
 File responsible for parsing and storing SP's databases
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 12:03
+Last Modification: Modification time of the database file
+Date of Modification: 18/10/2026 18:29
 """
 
+import os
 import re
 from common.query import QueryInfo
 from common.query import QueryResponse
 import common.utils as utils
 from common.dnsEntry import DNSEntry, ENTRY_TYPE, PARAMETER_CHAR, EntryType
 from server.exceptions import InvalidConfigFileException, InvalidDatabaseException
+from server.zoneIndex import ZoneIndex
 
 
 class Database:
@@ -20,6 +22,9 @@ class Database:
         macros  -> Dict[str,str]
         aliases -> Dict[str,str]
         entries -> List[DNSEntry]
+        index   -> ZoneIndex (the entries indexed by name and type)
+        path    -> str (the path to the database file)
+        mtime   -> float (the modification time of the file when it was read)
     """
     
     def __init__(self, path:str):
@@ -32,8 +37,10 @@ class Database:
         self.aliases = {}
         self.entries = []
         self.serial = 0
+        self.path = path
         
         try:
+            self.mtime = os.path.getmtime(path)
             with open(path,'r') as file:
                 lines = file.readlines()
         except:
@@ -43,8 +50,18 @@ class Database:
             self.__process_line__(line.rstrip('\n'))
                 
         self.get_origin()
+        self.index = ZoneIndex(self.entries)
             
             
+    def is_modified(self) -> bool:
+        """
+        Returns whether the database file was modified since it was read
+        """
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return False
+
     def get_origin(self) -> str:
         if '@' not in self.macros:
             raise InvalidDatabaseException('Origin (@) not found')
@@ -115,4 +132,4 @@ class Database:
         Returns a QueryResponse
         """
         hostname = self.__replace_aliases__(query.name)
-        return QueryResponse.from_entries(QueryInfo(hostname, query.type), self.entries, fullMatch, True)
\ No newline at end of file
+        return self.index.answer_query(QueryInfo(hostname, query.type), fullMatch, True)
\ No newline at end of file
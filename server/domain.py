@@ -5,18 +5,25 @@ A primary domain can parse its dns entries from a database file. A secondary dom
 other hand, doesn't contain its entries in the local machine and must therefore query a
 server which is primary to that domain through a zone transfer (see zoneTransfer.py)
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 12:38
+Secondary domains are copied between processes as a compact image of their entries (see
+SecondaryDomain.__getstate__()), and indexed again by the process answering queries with them
+
+Last Modification: Lock around the loading and replacement of the entries of secondary domains
+Date of Modification: 18/10/2026 19:13
 """
 
 from common.dnsEntry import DNSEntry, EntryType
 from common.query import QueryInfo
 from common.query import QueryResponse
 from common.logger import LogCreate,LogMessage,LoggingEntryType
-from server.exceptions import InvalidConfigFileException
+from server.exceptions import InvalidConfigFileException, InvalidDatabaseException
 import re
+import threading
+from collections import Counter
 import common.utils as utils
 from server.database import Database
+from server.zoneIndex import ZoneIndex
+from server.zoneJournal import ZoneJournal
 
 class Domain:
     """
@@ -31,6 +38,7 @@ class Domain:
 class PrimaryDomain(Domain):
     """
     Stores all information of an authoritative server relative to a single primary domain
+    The changes to its database are kept in a journal, for incremental zone transfers
     """
     
     def __init__(self, name:str):
@@ -40,6 +48,7 @@ class PrimaryDomain(Domain):
         super().__init__(name)
         self.authorizedSS = []
         self.database = None
+        self.journal = ZoneJournal()
         
     def is_authorized(self, ip:str) -> bool:
         return ip in self.authorizedSS  #TODO: authorizedSSs may contain port
@@ -59,6 +68,27 @@ class PrimaryDomain(Domain):
         if utils.normalize_domain(origin) != self.name:
             raise InvalidConfigFileException(f"DB's origin ({origin}) doesn't match domain name ({self.name})")
 
+    def reload(self) -> bool:
+        """
+        Reads the database file again if it was modified and its serial number increased,
+        registering the changes in the journal
+        Returns whether the database was replaced
+        If the parsing of the file fails, an InvalidDatabaseException is raised and the current database is kept
+        """
+        if not self.database.is_modified():
+            return False
+
+        database = Database(self.database.path)
+        if database.serial <= self.database.serial:
+            self.database.mtime = database.mtime    #wait for the serial number to change
+            return False
+        if utils.normalize_domain(database.get_origin()) != self.name:
+            raise InvalidDatabaseException(f"DB's origin ({database.get_origin()}) doesn't match domain name ({self.name})")
+
+        self.journal.record(self.database.serial, database.serial, self.database.entries, database.entries)
+        self.database = database
+        return True
+
     def add_authorizedSS(self, authorizedSS:str) -> None:
         """
         Adds the ip address of a SS to the list of authorized SS's
@@ -87,6 +117,12 @@ class PrimaryDomain(Domain):
 class SecondaryDomain(Domain):
     """
     Stores all information of an authoritative server relative to a single secondary domain
+    The entries, their index and the aliases are only present once loaded (see load()), and
+    image is the binary representation of the entries (None until it is first needed)
+
+    Loading and replacing the entries hold a lock, as the first queries answered with a copy received from
+    another process may arrive from several threads at once. The index is assigned last, so a loaded domain
+    is answered from without taking the lock
     """
     
     def __init__(self, name:str):
@@ -97,10 +133,14 @@ class SecondaryDomain(Domain):
         self.primaryServer = None
         self.aliases = {}
         self.dnsEntries = []
+        self.index = ZoneIndex()
         self.expire = 60
         self.retry = 60
         self.refresh = 60
         self.serial = None
+        self.expired = False
+        self.image = None
+        self.lock = threading.Lock()
     
     def set_primary_server(self, primary_server:str) -> None:
         """
@@ -138,25 +178,32 @@ class SecondaryDomain(Domain):
         if self.primaryServer == None:
             raise InvalidConfigFileException("No primary server specified for secondary domain " + self.name)
 
-    #TODO: Thread safety
+    def set_entries(self, new_entries:list[DNSEntry]) -> None:
         """
         Replaces all entries of a certain domain with the given new entries.
         Used to update the copy of the original database in an SS after a zone transfer.
 
-        This method WILL BE thread safe.
-
         More specifically, this method erases all entries for the domain in the copy of the database,
         and inserts the new ones in their place
 
         Arguments:
         new_entries : List (DNSEntry) -> A list with the new entries
         """
-    def set_entries(self, new_entries:list[DNSEntry]) -> None:
-        self.dnsEntries = new_entries
-        self.aliases = {}
-        for e in self.dnsEntries:
+        with self.lock:
+            self.__set_entries__(new_entries)
+            self.expired = False
+            self.image = None
+
+    def __set_entries__(self, new_entries:list[DNSEntry]) -> None:
+        """
+        Indexes the given entries and swaps them in, with the index last (see is_loaded())
+        Must be called with the lock held
+        """
+        index = ZoneIndex(new_entries)  #built before replacing anything
+        aliases = {}
+        for e in new_entries:
             if e.type == EntryType.CNAME:
-                self.aliases[e.parameter] = e.value
+                aliases[e.parameter] = e.value
             elif e.type == EntryType.SOAREFRESH:
                 self.refresh = int(e.value)
             elif e.type == EntryType.SOARETRY:
@@ -165,16 +212,92 @@ class SecondaryDomain(Domain):
                 self.expire = int(e.value)
             elif e.type == EntryType.SOASERIAL:
                 self.serial = int(e.value)
+
+        self.dnsEntries = new_entries
+        self.aliases = aliases
+        self.index = index
+
+    def is_loaded(self) -> bool:
+        """
+        Returns whether the entries are loaded (see load())
+        """
+        return self.index != None
+
+    def load(self) -> None:
+        """
+        Decodes and indexes the entries from the image received from another process, if not done yet
+        """
+        if self.is_loaded():
+            return
+
+        with self.lock:
+            if self.is_loaded():
+                return  #loaded by another thread while waiting for the lock
+
+            count = utils.bytes_to_int(self.image, 4)
+            pos = 4
+            entries = []
+            for _ in range(count):
+                entry, pos = DNSEntry.from_bytes(self.image, pos, True)    #validated before the image was made
+                entries.append(entry)
+
+            self.__set_entries__(entries)
+
+    def __getstate__(self) -> dict:
+        """
+        The entries are copied between processes as their binary representation, without the index
+        and the aliases, which are built again by load(). The image is only encoded once for each set of entries
+        """
+        with self.lock:
+            if self.image == None:
+                image = bytearray(utils.int_to_bytes(len(self.dnsEntries), 4))   #grown in place
+                for e in self.dnsEntries:
+                    e.write_bytes(image)
+                self.image = bytes(image)
+
+            state = self.__dict__.copy()
+        state['dnsEntries'] = None
+        state['index'] = None
+        state['aliases'] = None
+        del state['lock']   #locks can't be copied between processes
+        return state
+
+    def __setstate__(self, state:dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def apply_changes(self, removed:list[DNSEntry], added:list[DNSEntry]) -> None:
+        """
+        Removes and adds the given entries, received in an incremental zone transfer (see set_entries())
+        """
+        self.load()
+        toRemove = Counter(removed)
+        entries = []
+        for e in self.dnsEntries:
+            if toRemove[e] > 0:
+                toRemove[e] -= 1
+            else:
+                entries.append(e)
+        self.set_entries(entries + added)
     
-    #TODO: Thread safety
-    def answer_query(self, query:QueryInfo, fullMatch:bool = False) -> QueryResponse: #TODO: invalidate entries after SOAEXPIRE seconds
+    def set_expired(self) -> None:
+        """
+        Marks the entries as expired, after SOAEXPIRE seconds without a successful zone transfer
+        Expired domains don't answer queries until the next zone transfer (see set_entries())
+        """
+        self.expired = True
+
+    def answer_query(self, query:QueryInfo, fullMatch:bool = False) -> QueryResponse:
         """
         Answers the given query by searching the list of entries
-        Returns a QueryResponse
+        Returns a QueryResponse, empty if the entries expired
         """
+        if self.expired:
+            return QueryResponse([], [], [])
+        self.load()
         hostname = self.__replace_aliases__(query.name)
         query = QueryInfo(hostname, query.type)
-        return QueryResponse.from_entries(query, self.dnsEntries, fullMatch, False)
+        return self.index.answer_query(query, fullMatch, False)
     
     def __replace_aliases__(self, domain:str) -> str:
         for k,v in self.aliases.items():
@@ -0,0 +1,169 @@
+"""
+File implementing the eviction policies of the cache
+An eviction policy tracks the lines of the cache and chooses which one to discard
+when the cache goes over its size limits (see cache.py)
+
+Last Modification: Abstract base class of the policies
+Date of Modification: 18/10/2026 18:56
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import heapq
+import itertools
+from typing import Hashable, Optional
+
+
+class EvictionPolicy(ABC):
+    """
+    Abstract base class of the eviction policies
+    The lines of the cache are identified by a hashable key (a DNSEntry or a QueryInfo)
+    """
+
+    @abstractmethod
+    def add(self, key:Hashable, expires:float) -> None:
+        """
+        Registers a line added to the cache, or added again with the given expiration time
+        """
+
+    @abstractmethod
+    def access(self, key:Hashable) -> None:
+        """
+        Registers a line being used to answer a query
+        """
+
+    @abstractmethod
+    def remove(self, key:Hashable) -> None:
+        """
+        Stops tracking a line that was removed from the cache
+        """
+
+    @abstractmethod
+    def victim(self) -> Optional[Hashable]:
+        """
+        Returns the line that should be evicted next, or None if no line is being tracked
+        """
+
+
+class LRUPolicy(EvictionPolicy):
+    """
+    Evicts the least recently used line
+    """
+
+    def __init__(self):
+        self.lines = OrderedDict()
+
+    def add(self, key:Hashable, expires:float) -> None:
+        self.lines[key] = None
+        self.lines.move_to_end(key)
+
+    def access(self, key:Hashable) -> None:
+        if key in self.lines:
+            self.lines.move_to_end(key)
+
+    def remove(self, key:Hashable) -> None:
+        self.lines.pop(key, None)
+
+    def victim(self) -> Optional[Hashable]:
+        return next(iter(self.lines), None)
+
+
+class LFUPolicy(EvictionPolicy):
+    """
+    Evicts the least frequently used line. Ties are broken by evicting the least recently used one
+    Contains the following attributes:
+        counts  -> Dict[key,int] (number of uses of each line)
+        buckets -> Dict[int,OrderedDict[key,None]] (lines by number of uses, from least to most recently used)
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.buckets:dict[int,OrderedDict] = {}
+        self.minCount = 0
+
+    def __unlink__(self, key:Hashable) -> int:
+        count = self.counts.pop(key)
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+        return count
+
+    def __link__(self, key:Hashable, count:int) -> None:
+        self.counts[key] = count
+        self.buckets.setdefault(count, OrderedDict())[key] = None
+
+    def add(self, key:Hashable, expires:float) -> None:
+        if key in self.counts:
+            self.access(key)
+        else:
+            self.__link__(key, 1)
+            self.minCount = 1
+
+    def access(self, key:Hashable) -> None:
+        if key not in self.counts:
+            return
+
+        count = self.__unlink__(key)
+        self.__link__(key, count + 1)
+        if count == self.minCount and count not in self.buckets:
+            self.minCount = count + 1
+
+    def remove(self, key:Hashable) -> None:
+        if key in self.counts:
+            self.__unlink__(key)
+
+    def victim(self) -> Optional[Hashable]:
+        if not self.buckets:
+            return None
+
+        if self.minCount not in self.buckets:
+            self.minCount = min(self.buckets)   #only happens after removals
+        return next(iter(self.buckets[self.minCount]))
+
+
+class TTLPolicy(EvictionPolicy):
+    """
+    Evicts the line closest to expiring
+    Contains the following attributes:
+        lines -> Dict[key,float] (line to the time it expires)
+        heap  -> List[(float,int,key)] (heap with the expiration times, may contain outdated items)
+    """
+
+    def __init__(self):
+        self.lines = {}
+        self.heap = []
+        self.counter = itertools.count()    #breaks ties in the heap, as keys can't be compared
+
+    def add(self, key:Hashable, expires:float) -> None:
+        self.lines[key] = expires
+        heapq.heappush(self.heap, (expires, next(self.counter), key))
+
+        if len(self.heap) > 2 * len(self.lines) + 64:
+            self.heap = [(v, next(self.counter), k) for k,v in self.lines.items()]
+            heapq.heapify(self.heap)
+
+    def access(self, key:Hashable) -> None:
+        pass
+
+    def remove(self, key:Hashable) -> None:
+        self.lines.pop(key, None)
+
+    def victim(self) -> Optional[Hashable]:
+        while self.heap:
+            expires, _, key = self.heap[0]
+            if self.lines.get(key) == expires:
+                return key
+            heapq.heappop(self.heap)
+
+        return None
+
+
+"""
+The available eviction policies, by the name used in the configuration file
+"""
+EVICTION_POLICIES = {
+    'LRU': LRUPolicy,
+    'LFU': LFUPolicy,
+    'TTL': TTLPolicy
+}
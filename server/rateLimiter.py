@@ -0,0 +1,59 @@
+"""
+File implementing the rate limiter of the requests of each client
+Used by an SP to answer the zone transfer requests of each SS at a bounded rate (see ZoneTransferServer),
+so that a burst of requests from one SS is spread over time instead of delaying the others
+
+Last Modification: Least recently seen client forgotten first
+Date of Modification: 18/10/2026 19:06
+"""
+
+from collections import OrderedDict
+import time
+from typing import Optional
+
+
+"""
+Maximum number of clients tracked before the least recently seen one is forgotten
+"""
+MAX_CLIENTS = 1024
+
+
+class RateLimiter:
+    """
+    Token bucket per client address: each request takes a token, and tokens are added back at a
+    fixed rate, up to a maximum. Requests without a token wait for the next one
+    Contains the following attributes:
+        rate    -> float (number of tokens added per second)
+        burst   -> float (maximum number of tokens, the number of requests allowed at once)
+        buckets -> OrderedDict[str,(float,float)] (address to its tokens and the monotonic time they were counted,
+                   from the least to the most recently seen client)
+
+    A client may owe tokens, so that its waiting requests are answered in order at the given rate
+    """
+
+    def __init__(self, rate:float, burst:float):
+        self.rate = rate
+        self.burst = burst
+        self.buckets:OrderedDict[str,tuple[float,float]] = OrderedDict()
+
+    def __tokens__(self, address:str, now:float) -> float:
+        tokens, last = self.buckets.get(address, (self.burst, now))
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def reserve(self, address:str, maxDelay:float) -> Optional[float]:
+        """
+        Takes a token for a request of the given address
+        Returns the number of seconds to wait before answering the request, or None if it is over maxDelay,
+        in which case no token is taken and the request should be refused
+        """
+        now = time.monotonic()
+        tokens = self.__tokens__(address, now) - 1
+        delay = max(0, -tokens / self.rate)
+        if delay > maxDelay:
+            return None
+
+        self.buckets[address] = (tokens, now)
+        self.buckets.move_to_end(address)
+        if len(self.buckets) > MAX_CLIENTS:
+            self.buckets.popitem(last=False)
+        return delay
@@ -0,0 +1,116 @@
+"""
+File implementing the cache of encoded responses
+Queries answered from the zones of the server always get the same response until the zone that
+answered them changes, so the encoded response is kept and sent again with only the messageID replaced
+
+Last Modification: Responses discarded per zone, least recently used response evicted and log lines built lazily
+Date of Modification: 18/10/2026 19:10
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import common.utils as utils
+from common.dnsMessage import DNSMessage
+
+
+"""
+Default maximum number of responses kept by each worker (see the RC parameter of the configuration file)
+"""
+MAX_RESPONSES = 10000
+
+
+class EncodedMessage:
+    """
+    An encoded DNSMessage logged as its string representation (see DNSMessage.__str__())
+    The message is only decoded when the log line is written, by the logger process
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data:bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        (msg, _) = DNSMessage.from_bytes(self.data)
+        return str(msg)
+
+
+class CachedResponse:
+    """
+    An encoded response, stored without its messageID. Contains the following attributes:
+        name        -> str (the queried name, used to choose the log file)
+        zone        -> str (the name of the domain that answered the query, see ServerData.get_answering_domain())
+        zoneVersion -> int (the version of that domain the response was generated from, see ServerData.domainVersions)
+        response    -> bytes (the encoded response after the messageID)
+    """
+
+    __slots__ = ('name', 'zone', 'zoneVersion', 'response')
+
+    def __init__(self, name:str, zone:str, zoneVersion:int, response:bytes):
+        self.name = name
+        self.zone = zone
+        self.zoneVersion = zoneVersion
+        self.response = response
+
+    def reply(self, query:bytes) -> bytes:
+        """
+        Returns the encoded response with the messageID of the given encoded query
+        """
+        return query[:2] + self.response
+
+
+class ResponseCache:
+    """
+    Encoded responses to queries answered from the zones, keyed by the encoded query without its messageID
+    (its flags, with the recursive flag, and its QueryInfo)
+    Contains the following attributes:
+        responses  -> OrderedDict[bytes,CachedResponse] (from the least to the most recently used response)
+        domains    -> DomainTrie (the names of the domains the responses were generated with)
+        maxEntries -> int (maximum number of responses, the least recently used one is discarded when it is exceeded)
+
+    A response is discarded when the domain that answered it is replaced. All responses are discarded
+    when domains are added, as they may change the domain answering a query
+    """
+
+    def __init__(self, maxEntries:int = MAX_RESPONSES):
+        self.responses:OrderedDict[bytes,CachedResponse] = OrderedDict()
+        self.domains:Optional[utils.DomainTrie] = None
+        self.maxEntries = maxEntries
+
+    def get(self, query:bytes, config) -> Optional[CachedResponse]:
+        """
+        Returns the response to the given encoded query for the given copy of the configuration (see ConfigSnapshot),
+        or None if it isn't in the cache
+        """
+        if config.domainTrie is not self.domains:
+            self.responses.clear()
+            self.domains = config.domainTrie
+            return None
+
+        key = query[2:]
+        cached = self.responses.get(key)
+        if cached == None:
+            return None
+
+        if config.domainVersions.get(cached.zone) != cached.zoneVersion:
+            del self.responses[key]
+            return None
+
+        self.responses.move_to_end(key)
+        return cached
+
+    def put(self, query:bytes, config, name:str, response:bytes) -> None:
+        """
+        Stores the encoded response to the given encoded query, generated from the given copy of the configuration
+        The copy must be fetched before the query is answered, so that a response is never stored with a newer version of its zone
+        """
+        if config.domainTrie is not self.domains:
+            return  #the domains changed while the response was being generated
+
+        zone = config.get_answering_domain(name)
+        if zone == None:
+            return
+
+        self.responses[query[2:]] = CachedResponse(name, zone, config.domainVersions.get(zone), response[2:])
+        if len(self.responses) > self.maxEntries:
+            self.responses.popitem(last=False)
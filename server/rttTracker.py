@@ -0,0 +1,156 @@
+"""
+File implementing the round trip time estimator of the dns servers a server queries
+Used to choose which of the possible servers to query first and how long to wait for each
+
+Last Modification: Bounded number of servers tracked
+Date of Modification: 18/10/2026 18:56
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+
+"""
+Smoothing factors of the round trip time and of its variation (see RFC 6298)
+"""
+RTT_ALPHA = 1/8
+RTT_BETA = 1/4
+
+"""
+Estimated round trip time, in seconds, of a server that was never queried
+Low enough for new servers to be tried before the slow ones
+"""
+UNKNOWN_RTT = 0.376
+
+"""
+Factor applied to the estimate of the servers that weren't chosen, so that they are eventually tried again
+"""
+RTT_DECAY = 0.98
+
+"""
+Lowest timeout, in seconds, used for a server, and maximum number of times its timeout is doubled
+"""
+MIN_TIMEOUT = 0.05
+MAX_BACKOFF = 5
+
+"""
+Maximum number of servers tracked, the least recently used one is forgotten when it is exceeded
+"""
+MAX_SERVERS = 4096
+
+
+class ServerRTT:
+    """
+    Round trip time estimate of a single server. Contains the following attributes:
+        srtt     -> float (smoothed round trip time, in seconds)
+        rttvar   -> float (smoothed variation of the round trip time, in seconds)
+        backoff  -> int (number of timeouts since the last response)
+        answered -> int (number of responses received)
+        timeouts -> int (number of queries that timed out)
+    """
+
+    def __init__(self):
+        self.srtt = UNKNOWN_RTT
+        self.rttvar = UNKNOWN_RTT / 2
+        self.backoff = 0
+        self.answered = 0
+        self.timeouts = 0
+
+    def score(self) -> float:
+        """
+        The value used to order the servers, lower is better
+        """
+        return self.srtt * (2 ** self.backoff)
+
+
+class RTTTracker:
+    """
+    Keeps a ServerRTT for each address queried
+    Contains the following attributes:
+        servers    -> OrderedDict[str,ServerRTT] (from the least to the most recently used, at most maxServers)
+        maxTimeout -> float (the timeout of the server, used for servers without responses and as the upper limit)
+    """
+
+    def __init__(self, maxTimeout:float, maxServers:int = MAX_SERVERS):
+        self.maxTimeout = maxTimeout
+        self.maxServers = maxServers
+        self.servers:OrderedDict[str,ServerRTT] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __server__(self, address:str) -> ServerRTT:
+        server = self.servers.get(address)
+        if server == None:
+            server = ServerRTT()
+            self.servers[address] = server
+            if len(self.servers) > self.maxServers:
+                self.servers.popitem(last=False)
+        else:
+            self.servers.move_to_end(address)
+        return server
+
+    def record(self, address:str, rtt:float) -> None:
+        """
+        Registers a response received from the given address after rtt seconds
+        """
+        with self.lock:
+            server = self.__server__(address)
+            if server.answered == 0:
+                server.srtt = rtt
+                server.rttvar = rtt / 2
+            else:
+                server.rttvar += RTT_BETA * (abs(server.srtt - rtt) - server.rttvar)
+                server.srtt += RTT_ALPHA * (rtt - server.srtt)
+
+            server.answered += 1
+            server.backoff = 0
+
+    def record_timeout(self, address:str) -> None:
+        """
+        Registers a query to the given address that timed out
+        """
+        with self.lock:
+            server = self.__server__(address)
+            server.timeouts += 1
+            server.backoff = min(server.backoff + 1, MAX_BACKOFF)
+
+    def timeout(self, address:str) -> float:
+        """
+        Returns the number of seconds to wait for a response from the given address
+        """
+        with self.lock:
+            return self.__timeout__(self.servers.get(address))
+
+    def __timeout__(self, server:Optional[ServerRTT]) -> float:
+        if server == None or server.answered == 0:
+            return self.maxTimeout
+
+        rto = max(server.srtt + 4 * server.rttvar, MIN_TIMEOUT) * (2 ** server.backoff)
+        return min(rto, self.maxTimeout)
+
+    def order(self, addresses:Iterable[str]) -> list[str]:
+        """
+        Returns the given addresses from the best to the worst server (ties keep the given order)
+        The estimates of all but the best server decay, so that slower servers are tried again eventually
+        """
+        with self.lock:
+            addresses = list(addresses)
+            servers = {a: self.__server__(a) for a in addresses}
+            ans = sorted(addresses, key=lambda a: servers[a].score())
+            for a in ans[1:]:
+                servers[a].srtt *= RTT_DECAY
+        return ans
+
+    def stats(self) -> dict[str,dict[str,float]]:
+        """
+        Returns the estimates of each server, in milliseconds, and its counters
+        """
+        with self.lock:
+            return {a: {
+                'srtt_ms': round(s.srtt * 1000, 3),
+                'rttvar_ms': round(s.rttvar * 1000, 3),
+                'timeout_ms': round(self.__timeout__(s) * 1000, 3),
+                'backoff': s.backoff,
+                'answered': s.answered,
+                'timeouts': s.timeouts
+            } for a,s in self.servers.items()}
@@ -2,8 +2,8 @@
 File containing enum class ConfigType and class ServerData
 This file is reponsible for handling the interaction between the server and its stored data
 
-Last Modification: Added documentation
-Date of Modification: 14/11/2022 14:58
+Last Modification: Size of the cache of encoded responses and domain answering a query
+Date of Modification: 18/10/2026 19:10
 """
 
 from enum import Enum
@@ -19,6 +19,8 @@ from common.logger import LogCreate,LogMessage,LoggingEntryType
 from multiprocessing import Queue
 
 from .domain import Domain, PrimaryDomain, SecondaryDomain
+from .evictionPolicy import EVICTION_POLICIES
+from .responseCache import MAX_RESPONSES
 from collections import OrderedDict
 import re
 
@@ -34,6 +36,10 @@ class ConfigType(Enum):
     DD = 3
     ST = 4
     LG = 5
+    CE = 6
+    CB = 7
+    CP = 8
+    RC = 9
     
     @staticmethod
     def get_all() -> list[str]:
@@ -54,6 +60,14 @@ class ServerData:
         domains         -> OrderedDict[str,Domain] (stored by (full) domain name, ordered from higher to lower in the hierarchy)
         defaultServers  -> Dict[str,str] (full domain name to ip addresses)
         topServers      -> List[str] (ip adresses)
+        domainTrie      -> DomainTrie (names of the domains, to find the ones matching a query)
+        defaultTrie     -> DomainTrie (domain names of the default servers)
+        cacheEntries    -> int/None (maximum number of lines in the cache, None if unlimited)
+        cacheBytes      -> int/None (maximum approximate memory used by the cache in bytes, None if unlimited)
+        cachePolicy     -> str (name of the eviction policy of the cache, see server.evictionPolicy)
+        responseEntries -> int (maximum number of encoded responses kept by each worker, see ResponseCache)
+        version         -> int (incremented every time a domain is replaced)
+        domainVersions  -> Dict[str,int] (domain name to the version in which it was last replaced)
     """
     
     def __init__(self, filePath:str,logger:Queue):
@@ -65,7 +79,15 @@ class ServerData:
         self.domains = OrderedDict()        #name:domain            separar em primary e seconday?
         self.defaultServers = OrderedDict() #domain name:ip[:port]
         self.topServers = []                #ips
+        self.domainTrie = utils.DomainTrie()
+        self.defaultTrie = utils.DomainTrie()
         self.loggers = []                   #file paths
+        self.cacheEntries = None
+        self.cacheBytes = None
+        self.cachePolicy = 'LRU'
+        self.responseEntries = MAX_RESPONSES
+        self.version = 0
+        self.domainVersions = {}
         self.count = 0
 
         try:
@@ -90,7 +112,49 @@ class ServerData:
             raise NoConfigFileException("Could not open " + filePath)
     
     def set_domain(self, domain_name:str, domain:Domain) -> None:
+        if domain_name not in self.domains:
+            self.domainTrie.insert(domain_name)
         self.domains[domain_name] = domain
+        self.version += 1
+        self.domainVersions[domain_name] = self.version
+
+    def reload_databases(self) -> list[str]:
+        """
+        Reads the database files of the primary domains again if they were modified (see PrimaryDomain.reload())
+        Returns the names of the domains whose database was replaced
+        """
+        ans = []
+        for domain in list(self.get_primary_domains()):
+            try:
+                if domain.reload():
+                    self.set_domain(domain.name, domain)
+                    ans.append(domain.name)
+                    self.logger.put(LogMessage(LoggingEntryType.EV, utils.get_local_ip(), \
+                        ['Database reloaded, serial number:', domain.database.serial], domain.name))
+            except Exception as e:
+                self.logger.put(LogMessage(LoggingEntryType.FL, utils.get_local_ip(), ['Error reloading database:', e], domain.name))
+        return ans
+
+    def get_snapshot(self) -> tuple[int,'ServerData']:
+        """
+        Returns the current version and the current instance
+        When called through a manager, the instance is copied to the calling process (see ConfigSnapshot)
+        """
+        return (self.version, self)
+
+    def get_version(self) -> int:
+        """
+        Returns the current version, so that a ConfigSnapshot can check for replaced domains cheaply
+        """
+        return self.version
+
+    def get_updates(self, version:int) -> tuple[int,dict[str,Domain]]:
+        """
+        Returns the current version and the domains replaced after the given version
+        """
+        current = self.version
+        updated = [name for name, v in list(self.domainVersions.items()) if v > version]
+        return (current, {name: self.domains[name] for name in updated})
     
     def replaceDomainEntries(self, domain:str, new_entries:list[DNSEntry]) -> None:
         """
@@ -102,9 +166,24 @@ class ServerData:
             domain_name -> A valid domain name (matches DOMAIN or FULL_DOMAIN). Case and termination insensitive
             new_entries -> A list of dnsEntry's to replace the current entries
         """
-        self.get_domain(domain, False).set_entries(new_entries)
+        d = self.get_domain(domain, False)
+        d.set_entries(new_entries)
+        self.set_domain(d.name, d)
         
         
+    def get_cache_config(self) -> tuple[Optional[int],Optional[int],str]:
+        """
+        Returns the maximum number of lines, the maximum number of bytes and the
+        eviction policy of the cache, as set in the configuration file (see Cache)
+        """
+        return (self.cacheEntries, self.cacheBytes, self.cachePolicy)
+
+    def get_response_cache_size(self) -> int:
+        """
+        Returns the maximum number of encoded responses kept by each worker (see ResponseCache)
+        """
+        return self.responseEntries
+        
     def get_first_servers(self, domain_name:str) -> QueryResponse:
         """
         Determines the first servers to ask if a query can't be answered locally. This is
@@ -114,7 +193,7 @@ class ServerData:
         Arguments:
             domain_name -> A valid domain name (matches DOMAIN or FULL_DOMAIN). Case and termination insensitive
         """
-        matches = filter(lambda d: d != '127.0.0.1' and utils.is_subdomain(domain_name, d), self.defaultServers)
+        matches = filter(lambda d: d != '127.0.0.1', self.defaultTrie.matches(domain_name))
         domain = next(matches, None)
 
         if domain:
@@ -132,11 +211,7 @@ class ServerData:
         on the given domain. This is true if either no default servers were indicated,
         or if the given domain is a subdomain of one of the default servers
         """
-        for k in self.defaultServers:
-            if utils.is_subdomain(d, k):
-                return True
-
-        return len(self.defaultServers) == 0
+        return len(self.defaultServers) == 0 or self.defaultTrie.first(d) != None
         
     def answer_query(self, query:QueryInfo) -> QueryResponse:
         """
@@ -144,13 +219,20 @@ class ServerData:
         Returns a QueryResponse
         If no answer could be found, an empty QueryResponse is returned
         """
-        matches = filter(lambda d: utils.is_subdomain(query.name, d.name), self.domains.values())
-        
-        for d in matches:
-            final = utils.domain_depth(query.name) - 1 == utils.domain_depth(d.name)
-            return d.answer_query(query, final)
+        name = self.get_answering_domain(query.name)
+        if name == None:
+            return QueryResponse()
+
+        d = self.domains[name]
+        final = utils.domain_depth(query.name) - 1 == utils.domain_depth(d.name)
+        return d.answer_query(query, final)
 
-        return QueryResponse()
+    def get_answering_domain(self, name:str) -> Optional[str]:
+        """
+        Returns the name of the stored domain that answers queries about the given name (the highest one
+        the name is below), or None if there is none
+        """
+        return next(iter(self.domainTrie.matches(name)), None)
 
     def get_domain(self, domain_name:str, primary:Optional[bool] = None, create:bool = False) -> Domain:
         """
@@ -173,7 +255,7 @@ class ServerData:
             else:
                 d = SecondaryDomain(domain_name)
 
-            self.domains[domain_name] = d
+            self.set_domain(domain_name, d)
         else:
             d = self.domains[domain_name]
 
@@ -189,7 +271,7 @@ class ServerData:
         """
         Returns a list containing all primary domains (Domain) in the current instance
         """
-        return filter(lambda d: d.primary, self.domains.values())
+        return filter(lambda d: isinstance(d, PrimaryDomain), self.domains.values())
 
     def get_secondary_domains(self) -> Iterable[Domain]:
         """
@@ -224,6 +306,7 @@ class ServerData:
                 if not re.search(f'^{utils.IP_MAYBE_PORT}$', data):
                     raise InvalidConfigFileException(f"Invalid ip address {data}")
                 self.defaultServers[domain] = data
+                self.defaultTrie.insert(domain)
             elif lineType == ConfigType.ST:
                 if domain != 'root.':
                     raise InvalidConfigFileException(f"ST parameter was {domain} expected root")
@@ -242,6 +325,22 @@ class ServerData:
                     self.loggers.append(data)
                 else:
                     self.logger.put(LogCreate(data, domain))
+            elif lineType in [ConfigType.CE, ConfigType.CB, ConfigType.CP, ConfigType.RC]:
+                if domain != 'all.':
+                    raise InvalidConfigFileException(f"{valueType} parameter was {domain} expected all")
+                if lineType == ConfigType.CP:
+                    if data not in EVICTION_POLICIES:
+                        raise InvalidConfigFileException(f"Unknown eviction policy {data}")
+                    self.cachePolicy = data
+                else:
+                    if not re.search(r'^\d+$', data):
+                        raise InvalidConfigFileException(f"{data} isn't a valid cache size")
+                    if lineType == ConfigType.CE:
+                        self.cacheEntries = int(data)
+                    elif lineType == ConfigType.CB:
+                        self.cacheBytes = int(data)
+                    else:
+                        self.responseEntries = int(data)
                     
         except ValueError:
             raise InvalidConfigFileException(line + " has no valid type")
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+File implementing the shared cache
+A shared cache lets several processes of the same server use a single cache, hosted by
+the server's manager process, while keeping a local copy of the lines they use
+
+Last Modification: Misses of the shared cache remembered locally for a short time
+Date of Modification: 18/10/2026 19:12
+"""
+
+from collections import OrderedDict
+import threading
+import time
+import traceback
+from typing import Any, Optional
+from common.query import QueryInfo, QueryResponse
+from server.cache import Cache
+
+
+"""
+Number of seconds the shared cache isn't asked again about a query it couldn't answer
+"""
+MISS_TTL = 1
+
+"""
+Maximum number of misses remembered, the oldest one is forgotten when it is exceeded
+"""
+MAX_MISSES = 4096
+
+
+class SharedCache:
+    """
+    Two level cache: a local Cache in the current process in front of a Cache shared by all
+    processes (a proxy to a Cache registered in a multiprocessing manager)
+
+    Queries are answered locally when possible, and only ask the shared cache when the local one
+    can't give a final answer. Entries fetched from the shared cache keep their expiration time.
+    Queries the shared cache couldn't answer either aren't asked again for MISS_TTL seconds, so that
+    repeated misses stay in the current process. They can't be stored as negative answers, as the
+    query may still have an answer
+    Added responses are stored locally right away and sent to the shared cache in batches, so
+    that the processes don't pay a round-trip to the manager per response
+    """
+
+    def __init__(self, shared, maxEntries:Optional[int] = None, maxBytes:Optional[int] = None, policy:str = 'LRU', \
+                 batchSize:int = 32, flushInterval:float = 1):
+        """
+        Constructs a shared cache
+
+        Arguments:
+
+        shared        : Cache      -> the cache shared between processes (usually a proxy)
+        maxEntries, maxBytes, policy -> the limits and eviction policy of the local cache (see Cache)
+        batchSize     : int        -> number of responses to accumulate before sending them to the shared cache
+        flushInterval : float      -> maximum number of seconds a response waits before being sent to the shared cache
+        """
+        self.local = Cache(maxEntries, maxBytes, policy)
+        self.shared = shared
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.pending:list[tuple[QueryResponse,Optional[QueryInfo]]] = []
+        self.lastFlush = time.time()
+        self.misses:OrderedDict[QueryInfo,float] = OrderedDict()   #query to the time the shared cache may be asked again
+        self.lock = threading.Lock()
+
+    def answer_query(self, query:QueryInfo) -> QueryResponse:
+        """
+        Searches the local cache and, if it can't answer definitively, the shared cache
+        Returns a QueryResponse
+        """
+        with self.lock:
+            ans = self.local.answer_query(query)
+            if ans.isFinal() or self.__missed__(query):
+                return ans
+
+        shared_ans, expirations = self.shared.answer_query_expiring(query)
+        if not shared_ans.isFinal():
+            with self.lock:
+                self.misses[query] = time.time() + MISS_TTL
+                self.misses.move_to_end(query)
+                if len(self.misses) > MAX_MISSES:
+                    self.misses.popitem(last=False)
+            return ans
+
+        with self.lock:
+            if len(shared_ans.values) == 0:
+                self.local.add_negative(query, expirations[0])
+            else:
+                for entry, expires in zip(shared_ans.all_entries(), expirations):
+                    self.local.add_entry(entry, expires)
+        return shared_ans
+
+    def __missed__(self, query:QueryInfo) -> bool:
+        """
+        Returns whether the shared cache couldn't answer the query less than MISS_TTL seconds ago
+        The expired misses are forgotten, oldest first
+        """
+        cur_time = time.time()
+        while self.misses:
+            oldest, expires = next(iter(self.misses.items()))
+            if expires >= cur_time:
+                break
+            del self.misses[oldest]
+
+        return query in self.misses
+
+    def add_response(self, response:QueryResponse, query:Optional[QueryInfo]=None) -> None:
+        """
+        Adds all DNSEntry's in the given response to the local cache, and queues them to be
+        added to the shared cache
+        """
+        with self.lock:
+            self.local.add_response(response, query)
+            self.pending.append((response, query))
+            if query != None:
+                self.misses.pop(query, None)
+
+            if len(self.pending) < self.batchSize and time.time() - self.lastFlush < self.flushInterval:
+                return
+
+            batch = self.pending
+            self.pending = []
+            self.lastFlush = time.time()
+
+        self.shared.add_responses(batch)
+
+    def flush(self) -> None:
+        """
+        Sends all queued responses to the shared cache
+        """
+        with self.lock:
+            batch = self.pending
+            self.pending = []
+            self.lastFlush = time.time()
+
+        if batch:
+            self.shared.add_responses(batch)
+
+    def __run__(self) -> None:
+        while True:
+            time.sleep(self.flushInterval)
+            try:
+                self.flush()
+            except (EOFError, ConnectionError, FileNotFoundError):
+                pass    #the manager is unreachable during shutdown; the responses are sent with the next batch
+            except Exception as e:
+                print(e)
+                print(traceback.format_exc())
+
+    def start(self) -> None:
+        """
+        Starts a daemon thread sending the queued responses to the shared cache every flushInterval seconds,
+        so that they don't wait for the next added response
+        Must be called in every process using the cache, as threads don't survive a fork
+        """
+        threading.Thread(target=self.__run__, daemon=True).start()
+
+    def stats(self) -> dict[str,Any]:
+        """
+        Returns the counters of the local cache, and those of the shared cache prefixed by 'shared_'
+        """
+        with self.lock:
+            ans = self.local.stats()
+        for k,v in self.shared.stats().items():
+            ans['shared_' + k] = v
+        return ans
@@ -0,0 +1,91 @@
+"""
+File implementing the coalescing of identical lookups
+While a lookup is running, identical lookups wait for its result instead of repeating it,
+so that many clients asking the same uncached name only cause one resolution
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 18:08
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Hashable
+
+
+class Call:
+    """
+    A lookup running in a SingleFlight, waited on by the identical lookups
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error:Exception = None
+
+
+class SingleFlight:
+    """
+    Runs a function once for all the concurrent calls with the same key. Contains the following attributes:
+        calls     -> Dict[key,Call] (the running calls)
+        coalesced -> int (number of calls that waited for another one instead of running the function)
+    """
+
+    def __init__(self):
+        self.calls:dict[Hashable,Call] = {}
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def do(self, key:Hashable, function:Callable, *args) -> Any:
+        """
+        Returns function(*args), unless a call with the same key is already running,
+        in which case waits for it and returns its result (or raises its exception)
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call == None
+            if leader:
+                call = Call()
+                self.calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    def stats(self) -> dict[str,int]:
+        """
+        Returns the number of running calls and of coalesced calls
+        """
+        with self.lock:
+            return {'running': len(self.calls), 'coalesced': self.coalesced}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    Same as SingleFlight, but for coroutine functions: do() must be awaited
+    The function runs in its own task, so cancelling one of the waiting calls doesn't cancel the others
+    """
+
+    async def do(self, key:Hashable, function:Callable, *args) -> Any:
+        task = self.calls.get(key)
+        if task == None:
+            task = asyncio.create_task(function(*args))
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
@@ -0,0 +1,205 @@
+"""
+File implementing the pools of sockets used to query other dns servers
+
+Instead of creating a socket per query, all queries a server sends go through a few long-lived
+sockets. Each query gets a messageID not in use by another pending query with the same QueryInfo,
+and the responses are handed to the waiting query by (messageID, QueryInfo), as long as they come
+from the ip address the query was sent to. Responses that don't match any pending query are dropped
+
+Last Modification: Queries cancelled before being sent are not sent
+Date of Modification: 18/10/2026 18:57
+"""
+
+import asyncio
+import itertools
+import random
+import socket
+import threading
+from typing import Any, Callable, Optional
+from common.asyncUDP import AsyncUDP
+from common.dnsMessage import DNSMessage
+from common.query import QueryInfo
+from common.udp import UDP
+
+
+class PendingQuery:
+    """
+    A query waiting for its response in an UpstreamPool
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.response:Optional[DNSMessage] = None
+
+    def set_response(self, response:DNSMessage) -> None:
+        self.response = response
+        self.event.set()
+
+
+class UpstreamPool:
+    """
+    Pool of UDP sockets shared by all threads of the server to query other dns servers
+    Contains the following attributes:
+        sockets -> List[UDP]
+        pending -> Dict[(int,QueryInfo),(str,PendingQuery)] (the queries waiting for a response, with the ip they were sent to)
+        encode  -> Function (DNSMessage to bytes)
+        decode  -> Function (bytes to DNSMessage)
+
+    A thread per socket receives the responses. The pool must therefore be created in the
+    process using it (threads don't survive a fork)
+    """
+
+    def __init__(self, encode:Callable, decode:Callable, size:int = 4):
+        """
+        Creates a pool with the given number of sockets, using the given functions to
+        encode queries and decode responses (see Server.encode_msg() and Server.decode_msg())
+        """
+        self.encode = encode
+        self.decode = decode
+        self.pending:dict[tuple[int,QueryInfo],tuple[str,Any]] = {}
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.sockets = []
+
+        for _ in range(size):
+            udp = UDP()
+            self.sockets.append(udp)
+            threading.Thread(target=self.__receive__, args=(udp,), daemon=True).start()
+
+    def register(self, msg:DNSMessage, ip:str) -> tuple[int,QueryInfo]:
+        """
+        Registers the given query, to be sent to the given ip address, as pending
+        Sets its messageID to one not in use by a pending query with the same QueryInfo
+        Returns the key identifying the pending query, to pass to exchange()
+        """
+        with self.lock:
+            key = None
+            while key == None or key in self.pending:
+                msg.messageID = random.randrange(1, 65357)
+                key = (msg.messageID, msg.query)
+
+            self.pending[key] = (ip, self.__new_pending__())
+        return key
+
+    def __new_pending__(self) -> Any:
+        return PendingQuery()
+
+    def __next_socket__(self):
+        return self.sockets[next(self.counter) % len(self.sockets)]
+
+    def __match__(self, data:bytes, ip:str) -> Optional[tuple[Any,DNSMessage]]:
+        """
+        Decodes the given datagram and returns the pending query it answers together with
+        the decoded message, or None if it doesn't answer any
+        """
+        try:
+            ans = self.decode(data)
+        except Exception:
+            return None
+
+        with self.lock:
+            pending = self.pending.get((ans.messageID, ans.query))
+
+        if pending == None or pending[0] != ip:
+            return None
+        return (pending[1], ans)
+
+    def __receive__(self, udp:UDP) -> None:
+        while True:
+            try:
+                data, ip, _ = udp.receive()
+            except OSError:
+                continue    #e.g. ICMP port unreachable from a previous query
+
+            match = self.__match__(data, ip)
+            if match:
+                pending, ans = match
+                pending.set_response(ans)
+
+    def cancel(self, key:tuple[int,QueryInfo]) -> None:
+        """
+        Stops waiting for the response to the query registered with the given key, if it is still pending
+        The call to exchange() waiting for it returns None
+        """
+        with self.lock:
+            pending = self.pending.get(key)
+
+        if pending != None:
+            pending[1].set_response(None)
+
+    def exchange(self, key:tuple[int,QueryInfo], msg:DNSMessage, ip:str, port:int, timeout:Optional[float]) -> Optional[DNSMessage]:
+        """
+        Sends the query registered with the given key (see register()) and waits for its response
+        If no response arrives before the timeout, raises socket.timeout
+        Returns None if the query is cancelled (see cancel()), without sending it if it was cancelled before
+        """
+        try:
+            _, pending = self.pending[key]
+            if pending.event.is_set():  #cancelled before being sent
+                return pending.response
+            self.__next_socket__().send(self.encode(msg), ip, port)
+
+            if not pending.event.wait(timeout):
+                raise socket.timeout()
+            return pending.response
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+
+class AsyncUpstreamPool(UpstreamPool):
+    """
+    Same as UpstreamPool, but for the asyncio mode: the sockets are AsyncUDP's on the
+    running event loop and exchange() must be awaited
+
+    Instances should be created with AsyncUpstreamPool.open()
+    """
+
+    @staticmethod
+    async def open(encode:Callable, decode:Callable, size:int = 4) -> 'AsyncUpstreamPool':
+        """
+        Creates a pool on the running event loop (see UpstreamPool())
+        """
+        pool = AsyncUpstreamPool(encode, decode, 0)
+        pool.tasks = []
+        for _ in range(size):
+            udp = await AsyncUDP.open()
+            pool.sockets.append(udp)
+            pool.tasks.append(asyncio.create_task(pool.__receive_async__(udp)))
+        return pool
+
+    def __new_pending__(self) -> Any:
+        return asyncio.get_running_loop().create_future()
+
+    async def __receive_async__(self, udp:AsyncUDP) -> None:
+        while True:
+            data, ip, _ = await udp.receive()
+
+            match = self.__match__(data, ip)
+            if match and not match[0].done():
+                pending, ans = match
+                pending.set_result(ans)
+
+    def cancel(self, key:tuple[int,QueryInfo]) -> None:
+        """
+        Same as UpstreamPool.cancel(), but the call to exchange() raises asyncio.CancelledError
+        Cancelling the task running exchange() has the same effect
+        """
+        with self.lock:
+            pending = self.pending.get(key)
+
+        if pending != None:
+            pending[1].cancel()
+
+    async def exchange(self, key:tuple[int,QueryInfo], msg:DNSMessage, ip:str, port:int, timeout:Optional[float]) -> DNSMessage:
+        """
+        Same as UpstreamPool.exchange(), but waits for the response without blocking the event loop
+        """
+        try:
+            _, pending = self.pending[key]
+            self.__next_socket__().send(self.encode(msg), ip, port)
+            return await asyncio.wait_for(pending, timeout)
+        except asyncio.TimeoutError:
+            raise socket.timeout()
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
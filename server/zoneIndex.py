@@ -0,0 +1,96 @@
+"""
+File implementing the class ZoneIndex
+A zone index stores the DNSEntry's of a zone (or of the cache) indexed by owner name and type,
+so that queries can be answered without scanning every entry
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 10:12
+"""
+
+from typing import Iterable
+from common.dnsEntry import DNSEntry, EntryType
+from common.query import QueryInfo, QueryResponse, __get_relevant_domains__
+import common.utils as utils
+
+
+class ZoneIndex:
+    """
+    Index over a collection of DNSEntry's. Contains the following attributes:
+        records     -> Dict[(str,EntryType),List[DNSEntry]] (entries by parameter and type, in insertion order)
+        delegations -> Dict[tuple[str],List[DNSEntry]] (NS entries by the labels of their parameter, see utils.split_domain())
+        order       -> Dict[tuple[str],int] (the order in which each delegation was first added)
+
+    Answering a query only looks at the entries of the queried name, the delegations above it
+    and the glue A entries, so the cost doesn't depend on the number of indexed entries
+    """
+
+    def __init__(self, entries:Iterable[DNSEntry] = []):
+        """
+        Constructs an index containing the given entries
+        """
+        self.records:dict[tuple[str,EntryType],list[DNSEntry]] = {}
+        self.delegations:dict[tuple[str],list[DNSEntry]] = {}
+        self.order:dict[tuple[str],int] = {}
+        self.count = 0
+
+        for e in entries:
+            self.add_entry(e)
+
+    def add_entry(self, entry:DNSEntry) -> None:
+        """
+        Adds a DNSEntry to the index
+        """
+        self.records.setdefault((entry.parameter, entry.type), []).append(entry)
+
+        if entry.type == EntryType.NS:
+            labels = tuple(utils.split_domain(entry.parameter))
+            if labels not in self.delegations:
+                self.delegations[labels] = []
+                self.order[labels] = self.count
+                self.count += 1
+            self.delegations[labels].append(entry)
+
+    def remove_entry(self, entry:DNSEntry) -> None:
+        """
+        Removes a DNSEntry from the index
+        If the entry isn't indexed, nothing happens
+        """
+        key = (entry.parameter, entry.type)
+        if entry not in self.records.get(key, []):
+            return
+
+        self.records[key].remove(entry)
+        if not self.records[key]:
+            del self.records[key]
+
+        if entry.type == EntryType.NS:
+            labels = tuple(utils.split_domain(entry.parameter))
+            self.delegations[labels].remove(entry)
+            if not self.delegations[labels]:
+                del self.delegations[labels]
+                del self.order[labels]
+
+    def __glue__(self, domain:str) -> list[DNSEntry]:
+        """
+        Returns the A entries for the given domain name
+        """
+        return self.records.get((domain, EntryType.A), [])
+
+    def answer_query(self, query:QueryInfo, final:bool = False, authoritative:bool = False) -> QueryResponse:
+        """
+        Searches the index for a response to the given query and constructs a QueryResponse
+        with the relevant values, authorities and extra_values and the specified authoritative flag
+        Equivalent to QueryResponse.from_entries() over all indexed entries
+        """
+        vals = self.records.get((query.name, query.type), [])
+        vals = [min(vals, key=lambda e: e.priority)] if vals else []
+
+        labels = utils.split_domain(query.name)
+        matches = [tuple(labels[:i]) for i in range(len(labels) + 1)]
+        matches = sorted(filter(lambda l: l in self.delegations, matches), key=lambda l: self.order[l])
+        auths = [min(self.delegations[l], key=lambda e: e.priority) for l in matches]
+
+        extra_dom = set(__get_relevant_domains__(vals) + [e.value for e in auths]) #dump in set to remove duplicates
+        extras = list(set(utils.flat_map(self.__glue__, extra_dom)))
+
+        return QueryResponse(vals, auths, extras, final, authoritative)
@@ -0,0 +1,81 @@
+"""
+File implementing the journal of the changes to the database of a primary domain
+An SS whose copy of the domain has a serial number still covered by the journal only needs the
+entries removed and added since then, instead of a full zone transfer (see zoneTransfer.py)
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 18:29
+"""
+
+from collections import Counter
+from typing import Optional
+from common.dnsEntry import DNSEntry
+
+
+"""
+Maximum number of changes (one per serial number) kept in a journal
+"""
+JOURNAL_SIZE = 32
+
+
+class ZoneChange:
+    """
+    The entries removed and added when the serial number of a domain went from oldSerial to newSerial
+    """
+
+    __slots__ = ('oldSerial', 'newSerial', 'removed', 'added')
+
+    def __init__(self, oldSerial:int, newSerial:int, removed:list[DNSEntry], added:list[DNSEntry]):
+        self.oldSerial = oldSerial
+        self.newSerial = newSerial
+        self.removed = removed
+        self.added = added
+
+    def size(self) -> int:
+        return len(self.removed) + len(self.added)
+
+
+class ZoneJournal:
+    """
+    Bounded list of the latest changes to the database of a domain, from the oldest to the newest
+    Contains the following attributes:
+        changes -> List[ZoneChange]
+        maxSize -> int (maximum number of changes, the oldest one is discarded when it is exceeded)
+
+    Changes are also discarded while they hold more entries than the domain, as a full zone transfer
+    is cheaper then
+    """
+
+    def __init__(self, maxSize:int = JOURNAL_SIZE):
+        self.changes:list[ZoneChange] = []
+        self.maxSize = maxSize
+
+    def record(self, oldSerial:int, newSerial:int, oldEntries:list[DNSEntry], newEntries:list[DNSEntry]) -> None:
+        """
+        Registers the change from the given old entries to the given new entries of the domain
+        """
+        old = Counter(oldEntries)
+        new = Counter(newEntries)
+        self.changes.append(ZoneChange(oldSerial, newSerial, list((old - new).elements()), list((new - old).elements())))
+
+        total = sum(c.size() for c in self.changes)
+        while self.changes and (len(self.changes) > self.maxSize or total > len(newEntries)):
+            total -= self.changes.pop(0).size()
+
+    def changes_since(self, serial:int) -> Optional[tuple[list[DNSEntry],list[DNSEntry]]]:
+        """
+        Returns the entries removed and the entries added since the given serial number,
+        or None if the journal doesn't go back to it
+        """
+        start = next((i for i, c in enumerate(self.changes) if c.oldSerial == serial), None)
+        if start == None:
+            return None
+
+        net = Counter()
+        for change in self.changes[start:]:
+            net.subtract(change.removed)
+            net.update(change.added)
+
+        removed = [e for e, n in net.items() for _ in range(-n)]
+        added = [e for e, n in net.items() for _ in range(n)]
+        return (removed, added)
@@ -0,0 +1,123 @@
+"""
+File implementing the scheduler of the zone transfers of the secondary domains of a server
+A single thread keeps the time of the next zone transfer of every secondary domain in a heap, and
+hands the transfers that are due to a small pool of threads
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 18:31
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from server.domain import SecondaryDomain
+
+
+"""
+Fraction of the SOAREFRESH and SOARETRY intervals taken at random from each wait, so that domains
+loaded at the same time don't all contact their SP's at the same time
+"""
+JITTER = 0.1
+
+"""
+Maximum number of zone transfers running at the same time
+"""
+MAX_TRANSFERS = 8
+
+
+class ZoneTimers:
+    """
+    Scheduling state of a secondary domain. Contains the following attributes:
+        domain    -> SecondaryDomain (the local copy, updated by each zone transfer)
+        expiresAt -> float/None (monotonic time after which the entries expire, None if there are no entries)
+    """
+
+    __slots__ = ('domain', 'expiresAt')
+
+    def __init__(self, domain:SecondaryDomain):
+        self.domain = domain
+        self.expiresAt:Optional[float] = None
+
+
+class ZoneScheduler:
+    """
+    Runs the zone transfers of secondary domains: each domain is transferred right away, then again
+    every SOAREFRESH seconds, or SOARETRY seconds after a failed transfer. When the last successful transfer
+    of a domain is more than SOAEXPIRE seconds old, the domain is expired
+    Contains the following attributes:
+        zones    -> Dict[str,ZoneTimers]
+        timers   -> List[(float,int,str)] (heap of the monotonic time of the next transfer of each domain)
+        transfer -> Function (SecondaryDomain to None, performs a zone transfer and raises an error if it fails)
+        expire   -> Function (SecondaryDomain to None, called once when the domain expires)
+    """
+
+    def __init__(self, transfer:Callable, expire:Callable, maxTransfers:int = MAX_TRANSFERS):
+        self.transfer = transfer
+        self.expire = expire
+        self.zones:dict[str,ZoneTimers] = {}
+        self.timers:list[tuple[float,int,str]] = []
+        self.counter = itertools.count()    #breaks ties in the heap
+        self.condition = threading.Condition()
+        self.pool = ThreadPoolExecutor(maxTransfers)
+
+    def add(self, domain:SecondaryDomain) -> None:
+        """
+        Schedules the first zone transfer of the given domain, as soon as possible
+        """
+        self.zones[domain.name] = ZoneTimers(domain)
+        self.schedule(domain.name, 0)
+
+    def schedule(self, name:str, delay:float) -> None:
+        """
+        Schedules the next zone transfer of the given domain after delay seconds
+        """
+        with self.condition:
+            heapq.heappush(self.timers, (time.monotonic() + delay, next(self.counter), name))
+            self.condition.notify()
+
+    def __jitter__(self, delay:float) -> float:
+        return delay - random.uniform(0, JITTER * delay)
+
+    def __run_transfer__(self, name:str) -> None:
+        """
+        Transfers the given domain and schedules its next zone transfer
+        If the transfer fails, the next one happens after SOARETRY seconds, or when the domain expires if sooner
+        """
+        zone = self.zones[name]
+        domain = zone.domain
+        try:
+            self.transfer(domain)
+            zone.expiresAt = time.monotonic() + domain.get_expire()
+            delay = self.__jitter__(domain.get_refresh())
+        except Exception:
+            delay = self.__jitter__(domain.get_retry())
+            now = time.monotonic()
+            if zone.expiresAt != None and now >= zone.expiresAt:
+                try:
+                    self.expire(domain)
+                    zone.expiresAt = None
+                except Exception:
+                    pass    #tried again after the next failed transfer
+            elif zone.expiresAt != None:
+                delay = min(delay, zone.expiresAt - now)
+
+        self.schedule(name, delay)
+
+    def run(self) -> None:
+        """
+        Hands the zone transfers to the pool as they become due, forever
+        The thread sleeps until the next one is due or a new one is scheduled
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if not self.timers or self.timers[0][0] > now:
+                    self.condition.wait(self.timers[0][0] - now if self.timers else None)
+                    continue
+
+                _, _, name = heapq.heappop(self.timers)
+                self.pool.submit(self.__run_transfer__, name)
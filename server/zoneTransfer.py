@@ -7,25 +7,40 @@ refers to a single domain.
 When the zone transfer begins, the SS will ask the SP for the version number of the database for
 that domain. If the version is greater than the one the SS has in memory, it will begin the transfer
 by asking how many entries the database has. The SP answers, the SS acknowledges the number of entries.
-Then, the SP will send one segment per entry. When all segments are received by the SS, it will confirm 
-having received everything. The SP will acknowledge this, terminating the zone transfer.
+Then, the SP will send one segment per entry, and the zone transfer ends when the SS has received all of them.
 
-Last Modification: Added support to binary
-Date of modification: 27/12/2022 18:10
+In a streamed zone transfer, used by the SS, the SS asks for the entries right away, and the SP sends
+them in batches of up to batchSize entries, encoded as they are sent, followed by an empty batch. The SP
+still answers the transfer described above
+
+An SS that already has a version of the database asks for the changes since that version instead. If the
+journal of the SP still covers it (see ZoneJournal), the SP sends the batches of removed entries followed by
+an empty one, and then the added entries like in a streamed zone transfer. Otherwise, it sends all entries
+in a streamed zone transfer
+
+All secondary domains of a server are transferred from a single process, as scheduled by a ZoneScheduler
+
+The SP answers the zone transfers of all SS's from coroutines of a single event loop, in a single process of the
+server, with a limit on the requests answered at the same time and on the rate of the requests of each SS
+(see ZoneTransferServer)
+
+Last Modification: Limits of the zone transfers kept by a single process of the server
+Date of modification: 18/10/2026 19:06
 """
 
 
+import asyncio
 from queue import Queue
-import threading
 import time
 import socket
-import traceback
-from typing import Optional
+from typing import Callable, Iterator, Optional
 from common.tcpWrapper import TCPWrapper
 import common.utils as utils
 from common.logger import LogMessage, LoggingEntryType
-from server.domain import Domain
+from server.domain import Domain, SecondaryDomain
+from server.rateLimiter import RateLimiter
 from server.serverData import ServerData
+from server.zoneScheduler import ZoneScheduler
 #TODO: Handle errors (wrong status etc)
 #TODO: Proper timeout
 #TODO: Domain verification on acknowledgement
@@ -36,6 +51,33 @@ Max zone transfer packet size in bytes
 """
 maxSize = 1024
 
+"""
+Number of seconds an SS waits for the SP while connecting or during a zone transfer
+"""
+transferTimeout = 30
+
+"""
+Number of entries sent in each packet of a streamed zone transfer, and initial size of the buffer
+the SS receives them into (see TCPWrapper)
+"""
+batchSize = 512
+streamBufferSize = 65536
+
+"""
+Default maximum number of zone transfer requests an SP answers at the same time, and default number of requests
+per second (and at once) answered for each SS. Requests that would wait for their turn for more than maxRateDelay
+seconds are refused (see ZoneTransferServer)
+"""
+maxConcurrentTransfers = 8
+transferRate = 20
+transferBurst = 50
+maxRateDelay = 10
+
+"""
+Number of bytes an SP lets wait in the socket of a zone transfer before encoding the next packet
+"""
+writeBufferSize = 262144
+
 def encode_packet(packet:ZoneTransferPacket) -> bytes:
     return str(packet).encode() if utils.debug else packet.to_bytes()
 
@@ -46,20 +88,47 @@ def decode_packet(packet:bytes) -> ZoneTransferPacket:
         (msg, _) = ZoneTransferPacket.from_bytes(packet)
         return msg
 
+def streamEntries(domain:Domain, entries:list) -> Iterator[ZoneTransferPacket]:
+    """
+    Generates the packets of a streamed zone transfer of the given entries of the domain: batches of
+    up to batchSize entries, followed by an empty one. Auxiliary function for processPacket
+    """
+    return streamBatches(SequenceNumber.SP_ENTRY_BATCH, domain, entries)
+
+def streamBatches(sequenceNumber:SequenceNumber, domain:Domain, entries:list) -> Iterator[ZoneTransferPacket]:
+    """
+    Generates the batches of up to batchSize of the given entries with the given sequence number, followed by an empty one
+    """
+    for start in range(0, len(entries), batchSize):
+        yield ZoneTransferPacket(sequenceNumber, ZoneStatus.SUCCESS, domain, entries[start:start+batchSize])
+    yield ZoneTransferPacket(sequenceNumber, ZoneStatus.SUCCESS, domain, [])
+
+def streamChanges(domain:Domain, removed:list, added:list) -> Iterator[ZoneTransferPacket]:
+    """
+    Generates the packets of an incremental zone transfer of the given removed and added entries of the domain:
+    the batches of removed entries and the batches of added entries, each followed by an empty one.
+    Auxiliary function for processPacket
+    """
+    yield from streamBatches(SequenceNumber.SP_REMOVED_BATCH, domain, removed)
+    yield from streamBatches(SequenceNumber.SP_ENTRY_BATCH, domain, added)
+
 #TODO: Validate request
 def processPacket(serverData:ServerData, packet:ZoneTransferPacket, ip:str, domain:Optional[Domain] = None) \
-        -> tuple[Domain, ZoneTransferPacket]:
+        -> tuple[Domain, Iterator[ZoneTransferPacket]]:
     """
     Given a packet an SP received from an SS, computes the packet(s) to send back
-    in response. Auxiliary function for zoneTransferSP
+    in response. Auxiliary function for ZoneTransferServer
 
     Arguments:
 
     serverData : ServerData -> the configuration of the server
     packet : ZoneTransferPacket -> the packet received
+
+    The packets of a streamed zone transfer are generated as they are sent (see streamEntries and streamChanges)
     """
 
-    if domain is None and packet.sequenceNumber == SequenceNumber(0):
+    if domain is None and packet.sequenceNumber in (SequenceNumber.SS_VERSION_NUMBER, SequenceNumber.SS_STREAM, \
+                                                    SequenceNumber.SS_CHANGES):
         domain = serverData.get_domain(packet.get_domain(), True) if packet.get_domain() else None
     entries = domain.database.entries if domain else None
     
@@ -69,7 +138,7 @@ def processPacket(serverData:ServerData, packet:ZoneTransferPacket, ip:str, doma
     result = None
     if domain != None and not domain.is_authorized(ip):
         status = ZoneStatus.UNAUTHORIZED
-    elif domain == None and packet.sequenceNumber.value in [0,2,4]:
+    elif domain == None and packet.sequenceNumber.value in [0,2,4,6,8]:
         status = ZoneStatus.NO_SUCH_DOMAIN
 
     if packet.sequenceNumber == SequenceNumber(0):
@@ -98,67 +167,104 @@ def processPacket(serverData:ServerData, packet:ZoneTransferPacket, ip:str, doma
                                           (index, entry)))
         return (domain, res)
 
+    if packet.sequenceNumber == SequenceNumber.SS_STREAM:
+        if status != ZoneStatus.SUCCESS:
+            return (domain, [ZoneTransferPacket(SequenceNumber.SP_ENTRY_BATCH, status, domain, [])])
+        return (domain, streamEntries(domain, entries))
+
+    if packet.sequenceNumber == SequenceNumber.SS_CHANGES:
+        if status != ZoneStatus.SUCCESS:
+            return (domain, [ZoneTransferPacket(SequenceNumber.SP_ENTRY_BATCH, status, domain, [])])
+        changes = domain.journal.changes_since(packet.data[0])
+        if changes == None:     #not covered by the journal, send everything
+            return (domain, streamEntries(domain, entries))
+        return (domain, streamChanges(domain, *changes))
+
     return (domain, \
             [ZoneTransferPacket(SequenceNumber(0), ZoneStatus.BAD_REQUEST, domain, "")])
 
-def zoneTransferSPClient(serverData:ServerData, logger:Queue, conn:socket, address:tuple[str,int]) -> None:
-    """
-    Handles the zone transfer process from the point of view of the SP,
-    for a single SS client. Is called as a new thread by zoneTransferSP
+class ZoneTransferServer:
     """
-    domain:Optional[Domain] = None
-    try:
-        clientConnected = TCPWrapper(conn, ZoneTransferPacket.split_messages, \
-                                        maxSize, address)
-        lock = threading.Lock()
-        data = clientConnected.read()
-
-        while data != b'':
-            packet = decode_packet(data)
-
-            with lock:
-                (d, response_packets) = processPacket(serverData, packet, address[0], domain)
-                if domain == None:
-                    domain = d
-            for response_packet in response_packets:
-                clientConnected.write(encode_packet(response_packet))
-
-            data = clientConnected.read()
-        logger.put(LogMessage(LoggingEntryType.ZT, f"{address[0]}:{address[1]}", \
-            ["SP"], domain.name if domain else None))
-    except Exception as e:
-        logger.put(LogMessage(LoggingEntryType.EZ, f"{address[0]}:{address[1]}", \
-            ["SP:", e], domain.name if domain else None))
-    finally:
-        clientConnected.shutdown(socket.SHUT_WR)
-        clientConnected.close()
-
-def zoneTransferSP(serverData:ServerData, logger:Queue, localIP:str, port:int) -> None:
+    Answers the zone transfers requested to an SP, each connection in a coroutine of the event loop
+    accepting the TCP connections of the server (see Server.serve_tcp())
+    Contains the following attributes:
+        source  -> Function (no arguments to ServerData, the current configuration of the server, see ConfigSnapshot)
+        logger  -> Queue
+        slots   -> asyncio.Semaphore (limits the number of requests being answered at the same time to maxTransfers)
+        limiter -> RateLimiter (limits the rate of the requests of each SS)
+
+    The packets are encoded as they are sent, and the next one is only encoded when the socket
+    has room for it, so that a slow SS doesn't make the SP buffer the whole domain
+
+    The limits are kept in memory, so a server must answer all zone transfers from one instance
+    (see Server.run())
     """
-    Function implementing the zone transfer protocol from the point of view of an
-    SP.
 
-    Arguments:
-
-    serverData : ServerData -> the configuration of the server
-    localIP      : String       -> The IP where the TCP socket will be bound
-    port         : int          -> The port to listen on
-    """
-    #Setup socket
-    tcpSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    tcpSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    tcpSocket.bind((localIP, port))
-    tcpSocket.listen()
-
-    try:
-        #Run forever
+    def __init__(self, source:Callable, logger:Queue, maxTransfers:int = maxConcurrentTransfers, \
+                 rate:float = transferRate, burst:float = transferBurst):
+        self.source = source
+        self.logger = logger
+        self.slots = asyncio.Semaphore(maxTransfers)
+        self.limiter = RateLimiter(rate, burst)
+
+    async def __read_packet__(self, reader:asyncio.StreamReader, buffer:bytes) -> tuple[Optional[bytes],bytes]:
+        """
+        Returns the next packet received from the SS (None if the connection was closed) and the remaining buffer
+        """
         while True:
-            (conn, address) = tcpSocket.accept()
-            t = threading.Thread(target=zoneTransferSPClient, \
-                                 args=(serverData, logger, conn, address))
-            t.start()
-    finally:
-        tcpSocket.close()
+            found = ZoneTransferPacket.probe_message(buffer, 0, len(buffer))
+            if found != None:
+                (start, stop, end) = found
+                return (buffer[start:stop], buffer[end:])
+
+            data = await asyncio.wait_for(reader.read(maxSize), transferTimeout)
+            if data == b'':
+                return (None, buffer)
+            buffer += data
+
+    async def answer(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter, buffer:bytes = b'') -> None:
+        """
+        Answers the requests of a single SS, received through the given connection, until it is closed
+        buffer holds the bytes already read from the connection
+
+        Requests over the rate of the SS wait for their turn, or close the connection if they would
+        wait more than maxRateDelay seconds. The zone transfer is logged with the number of bytes sent and
+        the time it took
+        """
+        address = writer.get_extra_info('peername')
+        writer.transport.set_write_buffer_limits(writeBufferSize)
+        domain:Optional[Domain] = None
+        start = time.monotonic()
+        sent = 0
+        try:
+            (data, buffer) = await self.__read_packet__(reader, buffer)
+            while data != None:
+                delay = self.limiter.reserve(address[0], maxRateDelay)
+                if delay == None:
+                    raise ConnectionRefusedError("Too many zone transfer requests")
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                async with self.slots:
+                    packet = decode_packet(data)
+                    (d, response_packets) = processPacket(self.source(), packet, address[0], domain)
+                    if domain == None:
+                        domain = d
+                    for response_packet in response_packets:
+                        encoded = encode_packet(response_packet)
+                        writer.write(encoded)
+                        sent += len(encoded)
+                        await writer.drain()
+                        await asyncio.sleep(0)  #let the other connections run between packets
+
+                (data, buffer) = await self.__read_packet__(reader, buffer)
+            self.logger.put(LogMessage(LoggingEntryType.ZT, f"{address[0]}:{address[1]}", \
+                ["SP", "bytes:", sent, "time(ms):", round((time.monotonic() - start) * 1000)], domain.name if domain else None))
+        except Exception as e:
+            self.logger.put(LogMessage(LoggingEntryType.EZ, f"{address[0]}:{address[1]}", \
+                ["SP:", e], domain.name if domain else None))
+        finally:
+            writer.close()
 
 
 def getServerVersionNumber(tcpSocket:TCPWrapper, domain:str) -> int:
@@ -238,75 +344,148 @@ def getAllEntries(tcpSocket:socket, domain:Domain, entries:int) -> None:
     domain.set_entries(newEntries)
 
 
-def confirmEntries(tcpSocket:socket) -> None:
+def getStreamedEntries(tcpSocket:TCPWrapper, domain:Domain) -> None:
     """
-    Confirms to the SP that it has received the expected number of entries. 
+    Asks the SP for all entries for the given domain in a streamed zone transfer, and receives them.
     Auxiliary function to zoneTransferSS
 
     Arguments:
-    
-    tcpSocket -> the socket used to communicate with the SP
+
+    tcpSocket        -> the socket used to communicate with the SP
+    domain  : Domain -> the domain to get entries for
     """
-    sentPacket = ZoneTransferPacket(SequenceNumber(6), ZoneStatus.SUCCESS, "")
+    sentPacket = ZoneTransferPacket(SequenceNumber.SS_STREAM, ZoneStatus.SUCCESS, domain.name, domain.name)
     tcpSocket.write(encode_packet(sentPacket))
+    domain.set_entries(receiveBatches(tcpSocket, SequenceNumber.SP_ENTRY_BATCH))
 
 
-def receiveEndOfTransfer(tcpSocket:socket) -> None:
+def getChanges(tcpSocket:TCPWrapper, domain:Domain) -> bool:
     """
-    Receives the end of transfer packet from the SP. Auxiliary function to zoneTransferSS
+    Asks the SP for the changes to the given domain since its current version, and applies them.
+    Auxiliary function to zoneTransferSS
 
     Arguments:
 
-    tcpSocket -> the socket used to communicate with the SP
+    tcpSocket        -> the socket used to communicate with the SP
+    domain  : Domain -> the domain to get changes for
+
+    Returns:
+
+    bool : Whether only the changes were received. If not, all entries were received instead
     """
-    tcpSocket.recv(maxSize)
+    sentPacket = ZoneTransferPacket(SequenceNumber.SS_CHANGES, ZoneStatus.SUCCESS, domain.name, \
+                                    (domain.get_serial(), domain.name))
+    tcpSocket.write(encode_packet(sentPacket))
+
+    first = receiveBatch(tcpSocket)
+    if first.sequenceNumber == SequenceNumber.SP_ENTRY_BATCH:
+        domain.set_entries(receiveBatches(tcpSocket, SequenceNumber.SP_ENTRY_BATCH, first))
+        return False
+
+    removed = receiveBatches(tcpSocket, SequenceNumber.SP_REMOVED_BATCH, first)
+    added = receiveBatches(tcpSocket, SequenceNumber.SP_ENTRY_BATCH)
+    domain.apply_changes(removed, added)
+    return True
 
-def zoneTransferSS(serverData:ServerData, logger:Queue, domain_name:str) -> None:
+
+def receiveBatch(tcpSocket:TCPWrapper) -> ZoneTransferPacket:
+    """
+    Receives a batch of entries from the SP. Auxiliary function to zoneTransferSS
+    If the connection is closed, the packet isn't a batch or the SP refused the transfer, an error is raised
+    """
+    data = tcpSocket.read()
+    if data == b'':
+        raise ConnectionError("SP closed the connection during the zone transfer")
+
+    receivedPacket = decode_packet(data)
+    if receivedPacket.sequenceNumber not in (SequenceNumber.SP_ENTRY_BATCH, SequenceNumber.SP_REMOVED_BATCH):
+        raise ValueError(f"Unexpected packet from the SP: {receivedPacket.sequenceNumber.name}")
+    if receivedPacket.status != ZoneStatus.SUCCESS:
+        raise ValueError(f"SP refused the zone transfer: {receivedPacket.status.name}")
+    return receivedPacket
+
+
+def receiveBatches(tcpSocket:TCPWrapper, sequenceNumber:SequenceNumber, first:Optional[ZoneTransferPacket] = None) -> list:
+    """
+    Receives batches of entries with the given sequence number from the SP until an empty one, starting
+    with the given one if already received. Returns all entries received. Auxiliary function to zoneTransferSS
+    """
+    entries = []
+    receivedPacket = first if first else receiveBatch(tcpSocket)
+    while receivedPacket.data:
+        if receivedPacket.sequenceNumber != sequenceNumber:
+            raise ValueError(f"Unexpected packet from the SP: {receivedPacket.sequenceNumber.name}")
+        entries.extend(receivedPacket.data)
+        receivedPacket = receiveBatch(tcpSocket)
+    return entries
+
+
+def transferZone(serverData:ServerData, logger:Queue, domain:SecondaryDomain) -> None:
     """
     Function implementing the zone transfer protocol from the point of view of an
-    SS.
+    SS, for a single zone transfer of the given domain. The entries are only transferred if
+    the SP has a different version of the database, and the domain is then replaced in serverData.
+    If the zone transfer fails, an error is raised
 
     Arguments:
 
-    serverData : ServerData -> The configuration of the server
+    serverData : ServerData       -> The configuration of the server
+    domain     : SecondaryDomain  -> The local copy of the domain, updated with the transferred entries
     """
-    domain = serverData.get_domain(domain_name, False)
-    
-    while True:
-        tcpSocket = None
+    tcpSocket = None
+    start = time.monotonic()
+    try:
+        tcp = socket.create_connection(utils.decompose_address(domain.primaryServer), transferTimeout)
+        tcpSocket = TCPWrapper(tcp, ZoneTransferPacket.probe_message, streamBufferSize)
+        
+        versionNumber = getServerVersionNumber(tcpSocket, domain.name)
+
+        #There is no new version of the database available
+        if versionNumber == domain.get_serial() and not domain.expired:
+            return
+
+        if domain.get_serial() == None or domain.expired:
+            getStreamedEntries(tcpSocket, domain)
+        else:
+            getChanges(tcpSocket, domain)
+
+        logger.put(LogMessage(LoggingEntryType.ZT, domain.primaryServer, \
+            ["SS", "serial:", domain.get_serial(), "bytes:", tcpSocket.received, \
+             "time(ms):", round((time.monotonic() - start) * 1000)], domain.name))
+        serverData.set_domain(domain.name, domain)
+    except Exception as e:
+        logger.put(LogMessage(LoggingEntryType.EZ, domain.primaryServer, \
+            ["SS:", e], domain.name))
+        raise
+    finally:
         try:
-            tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            tcp.connect(utils.decompose_address(domain.primaryServer))
-            tcpSocket = TCPWrapper(tcp, ZoneTransferPacket.split_messages, maxSize)
-            
-            versionNumber = getServerVersionNumber(tcpSocket, domain.name)
-
-            #There is no new version of the database available
-            if versionNumber != domain.get_serial():
-                numberEntries = getDomainNumberEntries(tcpSocket, domain.name)
-                acknowledgeNumberEntries(tcpSocket, domain.name, numberEntries)
-                getAllEntries(tcpSocket, domain, numberEntries)
-
-            #TODO: Add bytes transferred and time elapsed/serial number
-            logger.put(LogMessage(LoggingEntryType.ZT, domain.primaryServer, \
-                ["SS"], domain_name))
-            serverData.set_domain(domain.name, domain)
-        except Exception as e:
-            logger.put(LogMessage(LoggingEntryType.EZ, domain.primaryServer, \
-                ["SS:", e], domain_name))
-            # If zone transfer fails, retry after SOARETRY
-            # seconds
-            time.sleep(domain.get_retry())
-            continue
-        finally:
-            try:
-                tcpSocket.shutdown(socket.SHUT_WR)
-            except:
-                pass
-            
-            if tcpSocket:
-                tcpSocket.close()
+            tcpSocket.shutdown(socket.SHUT_WR)
+        except:
+            pass
+        
+        if tcpSocket:
+            tcpSocket.close()
+
+def expireZone(serverData:ServerData, logger:Queue, domain:SecondaryDomain) -> None:
+    """
+    Stops answering queries with the entries of the given domain, after SOAEXPIRE seconds
+    without a successful zone transfer
+    """
+    logger.put(LogMessage(LoggingEntryType.EZ, domain.primaryServer, \
+        ["SS: entries expired after", domain.get_expire(), "seconds without a zone transfer"], domain.name))
+    domain.set_expired()
+    serverData.set_domain(domain.name, domain)
 
-        # Wait SOAREFRESH seconds before refreshing
-        # database
-        time.sleep(domain.get_refresh())
\ No newline at end of file
+def zoneTransferSS(serverData:ServerData, logger:Queue) -> None:
+    """
+    Runs the zone transfers of all secondary domains of the server forever, each one every
+    SOAREFRESH seconds (see ZoneScheduler)
+
+    Arguments:
+
+    serverData : ServerData -> The configuration of the server
+    """
+    scheduler = ZoneScheduler(lambda d: transferZone(serverData, logger, d), lambda d: expireZone(serverData, logger, d))
+    for domain in serverData.get_secondary_domains():
+        scheduler.add(domain)
+    scheduler.run()
\ No newline at end of file
@@ -14,13 +14,14 @@ documentation for more details)
 Details regarding the zone transfer protocol can be found in the documentation for
 zoneTransfer.py
 
-Last modification: Added support to binary
-Date of modification: 27/12/2022 18:10
+Last modification: Packets found in a buffer without decoding them
+Date of modification: 18/10/2026 18:48
 '''
 
 from enum import Enum
 import re
 import traceback
+from typing import Optional
 from common.dnsEntry import DNSEntry
 import common.utils as utils
 
@@ -37,7 +38,13 @@ class SequenceNumber(Enum):     #TODO: trocar SequenceNumber(x) por SequenceNumb
     SP_NUMBER_ENTRIES = 3, 'SP sends the number of entries in the database for the domain'
     SS_NUMBER_ENTRIES = 4, 'SS acknowledges the number of entries'
     SP_DNS_ENTRY = 5, 'SP is sending an entry of the database for the domain'
-     
+    SS_STREAM = 6, 'SS wants to do a streamed zone transfer for a given domain'
+    SP_ENTRY_BATCH = 7, 'SP is sending a batch of entries of the database for the domain (an empty batch ends the transfer)'
+    SS_CHANGES = 8, 'SS wants the changes to the database for a given domain since a given version number'
+    SP_REMOVED_BATCH = 9, 'SP is sending a batch of entries removed from the database for the domain (an empty batch ends them)'
+
+    In binary, the sequence number takes bits 2 to 6 of the header, as the highest bit
+    marks dns messages sent through TCP (see tcpWrapper.frame())
     '''
     SS_VERSION_NUMBER = 0
     SP_VERSION_NUMBER = 1
@@ -45,6 +52,34 @@ class SequenceNumber(Enum):     #TODO: trocar SequenceNumber(x) por SequenceNumb
     SP_NUMBER_ENTRIES = 3
     SS_NUMBER_ENTRIES = 4
     SP_DNS_ENTRY = 5
+    SS_STREAM = 6
+    SP_ENTRY_BATCH = 7
+    SS_CHANGES = 8
+    SP_REMOVED_BATCH = 9
+
+"""
+Bits of the header with the sequence number and with the status
+"""
+SEQUENCE_MASK = 0b1111100
+STATUS_MASK = 0b11
+
+"""
+Sequence numbers of the packets with a batch of entries
+"""
+BATCH_SEQUENCES = (7, 9)
+
+"""
+Size of the header of a batch packet (SP_ENTRY_BATCH or SP_REMOVED_BATCH) in binary: the header byte, the number of entries (2 bytes)
+and the number of bytes of the entries (4 bytes), so that the packet can be split without decoding it
+"""
+BATCH_HEADER_SIZE = 7
+
+"""
+Position of the null-terminated string that ends each packet with one (by sequence number), and size of each packet
+with a fixed size, in binary, so that they can be split without decoding them (see ZoneTransferPacket.probe_message())
+"""
+STRING_OFFSETS = {0: 1, 2: 1, 6: 1, 8: 5}
+FIXED_SIZES = {1: 5, 3: 3, 4: 1}
 
 class ZoneStatus(Enum):     #TODO: same provavelmente
     '''
@@ -82,8 +117,9 @@ class ZoneTransferPacket:
         - sequenceNumber: SequenceNumber
         - status : ZoneStatus
         - data : can be either a string (domain name), integer (number of entries in
-        database, database version), or a tuple (order, dns_entry), with order being
-        an integer from 0-65535 and dns_entry a DNSEntry object
+        database, database version), a tuple (order, dns_entry), with order being
+        an integer from 0-65535 and dns_entry a DNSEntry object, a tuple (version, domain name),
+        or a list of DNSEntry objects (batch of entries)
         '''
         self.sequenceNumber = sequenceNumber
         self.status = status
@@ -92,40 +128,55 @@ class ZoneTransferPacket:
         pass
     
     def get_domain(self):
-        if self.sequenceNumber == SequenceNumber(0):
+        if self.sequenceNumber in (SequenceNumber.SS_VERSION_NUMBER, SequenceNumber.SS_STREAM):
             return self.data
+        elif self.sequenceNumber == SequenceNumber.SS_CHANGES:
+            return self.data[1]
         else:
             return self.domain
 
     @staticmethod
-    def split_messages(buffer:bytes) -> tuple[bytes,bytes]:
+    def probe_message(buffer:bytes, start:int, end:int) -> Optional[tuple[int,int,int]]:
         """
-        Splits the content of the buffer in the first message in it and
-        the remaining of the buffer. Works like splitting a list in Haskell by 
-        head and tail, only that each element of the list is a ZoneTransferPacket.
-        
+        Finds the first message in the received bytes buffer[start:end], for a TCPWrapper (see tcpWrapper.probe_frame())
+        Only the header, and the strings, of the message are read, so the packet isn't decoded
+
         This has no side effects.
 
         Args:
-            buffer (bytes): the buffer to split
+            buffer (bytes): the buffer with the received bytes
+            start (int), end (int): the position of the received bytes in the buffer
 
         Returns:
-            (bytes | None, bytes): (The first message (None if not exists), the
-            remaining buffer)
+            (int, int, int) | None: The start and the end of the first message and the end of
+            the bytes it takes (including the final line break in debug mode), or None if it isn't complete
         """
         if utils.debug:
-            split = buffer.decode().split("\n", 1)
+            stop = buffer.find(b"\n", start, end)
+            return (start, stop, stop + 1) if stop != -1 else None
 
-            if len(split) == 1:
-                return (None, buffer)
-            
-            return (split[0].encode(), split[1].encode())
-        else:
+        if start == end:
+            return None
+
+        sequence = (buffer[start] & SEQUENCE_MASK) >> 2
+        if sequence in BATCH_SEQUENCES:
+            if end - start < BATCH_HEADER_SIZE:
+                return None
+            stop = start + BATCH_HEADER_SIZE + utils.bytes_to_int(buffer, 4, start + 3)
+        elif sequence in STRING_OFFSETS:
+            stop = buffer.find(b"\x00", start + STRING_OFFSETS[sequence], end) + 1
+            if stop == 0:
+                return None
+        elif sequence in FIXED_SIZES:
+            stop = start + FIXED_SIZES[sequence]
+        else:   #entries must be decoded to know their size
             try:
-                (obj, length) = ZoneTransferPacket.from_bytes(buffer)
-                return (buffer[:length], buffer[length:])
+                (_, length) = ZoneTransferPacket.from_bytes(bytes(buffer[start:end]))
+                stop = start + length
             except InvalidZoneTransferPacketException:
-                return (None, buffer)
+                return None
+
+        return (start, stop, stop) if stop <= end else None
     
     @staticmethod
     def from_str(string:str) -> 'ZoneTransferPacket':
@@ -141,8 +192,10 @@ class ZoneTransferPacket:
         - a string (in quotes, e.g. (2,0,"example.com"))
         - a tuple in the format "(<order>,<dns_entry>)" with order being
         an integer from 0-65535 and dns_entry a DNSEntry in string form
+        - a list in the format "[<dns_entry>;<dns_entry>;...]" of DNSEntry in string form
+        - a tuple in the format "(<version>,<domain>)"
         '''
-        search = re.search("(\(([01234567])\,([012])\,(.*)\))", string)
+        search = re.search("(\(([0-9]{1,2})\,([012])\,(.*)\))", string)
         if search is None:
             raise InvalidZoneTransferPacketException(f'String "{string}" does not follow format')
 
@@ -154,7 +207,7 @@ class ZoneTransferPacket:
         data = None
         #TODO: Validate input
         domain = None
-        if sequenceNumber.value in [0]:
+        if sequenceNumber.value in [0,6]:
             data = search.group(4)
             domain = data
         elif sequenceNumber.value in [1,3]:
@@ -164,6 +217,17 @@ class ZoneTransferPacket:
             if data_search is None:
                 raise InvalidZoneTransferPacketException("No order for dns entry given")
             data = (int(data_search.group(2)), DNSEntry.from_str(data_search.group(3)))
+        elif sequenceNumber.value in [8]:
+            data_search = re.search("^\\(([0-9]+),(.*)\\)$", search.group(4))
+            if data_search is None:
+                raise InvalidZoneTransferPacketException("No version number and domain given")
+            data = (int(data_search.group(1)), data_search.group(2))
+            domain = data[1]
+        elif sequenceNumber.value in [7,9]:
+            data_search = re.search("^\\[(.*)\\]$", search.group(4))
+            if data_search is None:
+                raise InvalidZoneTransferPacketException("No list of dns entries given")
+            data = [DNSEntry.from_str(e) for e in data_search.group(1).split(';')] if data_search.group(1) else []
         elif sequenceNumber.value in [4]:
             #data_search = re.search("\\((([0-9]{1,5}|65535),(.*))\\)", search.group(4))
             #if data_search is None:
@@ -184,10 +248,19 @@ class ZoneTransferPacket:
         - a string (in quotes, e.g. (2,0,"example.com"))
         - a tuple in the format "(<order>,<dns_entry>)" with order being
         an integer from 0-65535 and dns_entry a DNSEntry in string form
+        - a list in the format "[<dns_entry>;<dns_entry>;...]" of DNSEntry in string form
+        - a tuple in the format "(<version>,<domain>)"
         '''
+        if self.sequenceNumber.value in BATCH_SEQUENCES:
+            data = f"[{';'.join(map(str, self.data))}]"
+        elif self.sequenceNumber in (SequenceNumber.SP_DNS_ENTRY, SequenceNumber.SS_CHANGES):
+            data = f"({str(self.data[0])},{str(self.data[1])})"
+        else:
+            data = str(self.data)
+
         return "({sequenceNumber},{status},{data})\n".format(
             sequenceNumber = self.sequenceNumber.value,
-            status = self.status.value, data = str(self.data) if self.sequenceNumber.value != 5 else f"({str(self.data[0])},{str(self.data[1])})")
+            status = self.status.value, data = data)
         
         
     def to_bytes(self) -> bytes:
@@ -203,6 +276,15 @@ class ZoneTransferPacket:
                 data = utils.int_to_bytes(self.data, 2)
             case SequenceNumber.SP_DNS_ENTRY:
                 data = utils.int_to_bytes(self.data[0], 2) + self.data[1].to_bytes()
+            case SequenceNumber.SS_STREAM:
+                data = utils.string_to_bytes(self.data)
+            case SequenceNumber.SS_CHANGES:
+                data = utils.int_to_bytes(self.data[0], 4) + utils.string_to_bytes(self.data[1])
+            case SequenceNumber.SP_ENTRY_BATCH | SequenceNumber.SP_REMOVED_BATCH:
+                entries = bytearray()    #grown in place
+                for entry in self.data:
+                    entry.write_bytes(entries)
+                data = utils.int_to_bytes(len(self.data), 2) + utils.int_to_bytes(len(entries), 4) + entries
             case _:
                 data = b''
                 
@@ -213,8 +295,8 @@ class ZoneTransferPacket:
         try:
             header = utils.bytes_to_int(bytes, 1, pos)
             pos += 1
-            sequenceNumber = SequenceNumber((header & 0b11100) >> 2)
-            status = ZoneStatus(header & 0b11)
+            sequenceNumber = SequenceNumber((header & SEQUENCE_MASK) >> 2)
+            status = ZoneStatus(header & STATUS_MASK)
 
             domain = None
             data = None
@@ -235,8 +317,23 @@ class ZoneTransferPacket:
                     a = utils.bytes_to_int(bytes, 2, pos)
                     pos += 2
                     
-                    b, pos = DNSEntry.from_bytes(bytes, pos)
+                    b, pos = DNSEntry.from_bytes(bytes, pos, True)  #sent by the SP, where it was validated
                     data = (a, b)
+                case SequenceNumber.SS_STREAM:
+                    data, pos = utils.bytes_to_string(bytes, pos)
+                    domain = data
+                case SequenceNumber.SS_CHANGES:
+                    version = utils.bytes_to_int(bytes, 4, pos)
+                    name, pos = utils.bytes_to_string(bytes, pos + 4)
+                    data = (version, name)
+                    domain = name
+                case SequenceNumber.SP_ENTRY_BATCH | SequenceNumber.SP_REMOVED_BATCH:
+                    count = utils.bytes_to_int(bytes, 2, pos)
+                    pos += 6
+                    data = []
+                    for _ in range(count):
+                        entry, pos = DNSEntry.from_bytes(bytes, pos, True)
+                        data.append(entry)
 
             return ZoneTransferPacket(sequenceNumber, status, domain, data), pos
         except:
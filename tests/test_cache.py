@@ -0,0 +1,191 @@
+"""
+Tests of the class Cache: expiration of entries and negative answers, and eviction under each policy
+
+Last Modification: Tests of the eviction policies
+Date of Modification: 18/10/2026 19:24
+"""
+
+import time
+import unittest
+from common.dnsEntry import DNSEntry, EntryType
+from common.query import QueryInfo
+from server.cache import Cache, line_size
+from server.evictionPolicy import EVICTION_POLICIES
+
+
+def entry(i:int) -> DNSEntry:
+    """
+    Returns a distinct A entry for each given number
+    """
+    return DNSEntry.from_str(f'host{i}.example.com. A 10.0.{i // 256}.{i % 256} 100')
+
+def query(i:int) -> QueryInfo:
+    """
+    Returns the query for the entry with the given number (see entry())
+    """
+    return QueryInfo(f'host{i}.example.com.', EntryType.A)
+
+
+class CacheExpirationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = time.time()
+        self.cache = Cache()
+
+    def test_valid_entry_answers(self):
+        self.cache.add_entry(entry(0), self.now + 100)
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+
+    def test_expired_entries_removed(self):
+        for i in range(100):
+            self.cache.add_entry(entry(i), self.now - 1 if i % 2 else self.now + 100)
+
+        self.assertEqual(self.cache.answer_query(query(1)).values, [])
+        self.assertEqual(set(self.cache.lines), {entry(i) for i in range(0, 100, 2)})
+        self.assertEqual(set(self.cache.index.records), {(f'host{i}.example.com.', EntryType.A) for i in range(0, 100, 2)})
+        self.assertEqual(self.cache.size, sum(map(line_size, self.cache.lines)))
+
+    def test_entry_added_again_kept(self):
+        self.cache.add_entry(entry(0), self.now - 1)
+        self.cache.add_entry(entry(0), self.now + 100)
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+
+        self.cache.add_entry(entry(1), self.now + 100)
+        self.cache.add_entry(entry(1), self.now - 1)
+        self.assertEqual(self.cache.answer_query(query(1)).values, [])
+        self.assertNotIn(entry(1), self.cache.lines)
+
+    def test_negative_answers(self):
+        self.cache.add_negative(query(0), self.now + 100)
+        response = self.cache.answer_query(query(0))
+        self.assertTrue(response.isFinal())
+        self.assertEqual(response.values, [])
+
+        self.cache.add_negative(query(1), self.now - 1)
+        self.assertFalse(self.cache.answer_query(query(1)).isFinal())
+        self.assertNotIn(query(1), self.cache.negative)
+
+    def test_expired_negative_answers_removed(self):
+        for i in range(1000):
+            self.cache.add_negative(query(i), self.now - 1 if i % 10 else self.now + 100)
+
+        self.cache.answer_query(query(1000))
+        self.assertEqual(set(self.cache.negative), {query(i) for i in range(0, 1000, 10)})
+        self.assertEqual(self.cache.size, sum(map(line_size, self.cache.negative)))
+        self.assertLessEqual(len(self.cache.expirations), 2 * len(self.cache.negative) + 64)
+
+    def test_answer_query_expiring(self):
+        self.cache.add_entry(entry(0), self.now + 100)
+        self.cache.add_negative(query(1), self.now + 50)
+        self.assertEqual(self.cache.answer_query_expiring(query(0))[1], [self.now + 100])
+        self.assertEqual(self.cache.answer_query_expiring(query(1))[1], [self.now + 50])
+
+    def test_add_response(self):
+        other = Cache()
+        other.add_entry(entry(0), self.now + 100)
+        self.cache.add_response(other.answer_query(query(0)), query(0))
+        self.cache.add_response(other.answer_query(query(1)), query(1))
+
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+        self.assertNotIn(query(1), self.cache.negative)   #not final, so it isn't a negative answer
+
+
+class CacheEvictionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = time.time()
+
+    def fill(self, cache:Cache, count:int) -> None:
+        for i in range(count):
+            cache.add_entry(entry(i), self.now + 100)
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, Cache, 10, None, 'FIFO')
+
+    def test_lru(self):
+        cache = Cache(maxEntries=3, policy='LRU')
+        self.fill(cache, 3)
+        cache.answer_query(query(0))
+        cache.add_entry(entry(3), self.now + 100)
+
+        self.assertEqual(set(cache.lines), {entry(0), entry(2), entry(3)})
+        self.assertEqual(cache.answer_query(query(1)).values, [])
+        self.assertEqual(cache.evictions, 1)
+
+    def test_lfu(self):
+        cache = Cache(maxEntries=3, policy='LFU')
+        self.fill(cache, 3)
+        cache.answer_query(query(0))
+        cache.answer_query(query(0))
+        cache.answer_query(query(2))
+        cache.add_entry(entry(3), self.now + 100)
+        self.assertEqual(set(cache.lines), {entry(0), entry(2), entry(3)})
+
+        cache.add_entry(entry(4), self.now + 100)   #ties broken by recency
+        self.assertEqual(set(cache.lines), {entry(0), entry(2), entry(4)})
+
+    def test_ttl(self):
+        cache = Cache(maxEntries=3, policy='TTL')
+        for i, ttl in enumerate([30, 10, 20]):
+            cache.add_entry(entry(i), self.now + ttl)
+        cache.answer_query(query(1))
+        cache.add_entry(entry(3), self.now + 40)
+        self.assertEqual(set(cache.lines), {entry(0), entry(2), entry(3)})
+
+        cache.add_entry(entry(2), self.now + 50)    #added again, so it is no longer the closest to expiring
+        cache.add_entry(entry(4), self.now + 40)
+        self.assertEqual(set(cache.lines), {entry(2), entry(3), entry(4)})
+
+    def test_negative_answers_counted(self):
+        for policy in EVICTION_POLICIES:
+            with self.subTest(policy=policy):
+                cache = Cache(maxEntries=2, policy=policy)
+                cache.add_negative(query(10), self.now + 10)
+                self.fill(cache, 2)
+
+                self.assertEqual(len(cache.lines) + len(cache.negative), 2)
+                self.assertNotIn(query(10), cache.negative)
+                self.assertFalse(cache.answer_query(query(10)).isFinal())
+
+    def test_max_bytes(self):
+        for policy in EVICTION_POLICIES:
+            with self.subTest(policy=policy):
+                cache = Cache(maxBytes=3 * line_size(entry(0)), policy=policy)
+                self.fill(cache, 10)
+
+                self.assertEqual(len(cache.lines), 3)
+                self.assertLessEqual(cache.size, cache.maxBytes)
+                self.assertEqual(cache.size, sum(map(line_size, cache.lines)))
+                self.assertEqual(len(cache.index.records), 3)
+                self.assertEqual(cache.evictions, 7)
+
+    def test_policy_forgets_expired_lines(self):
+        for policy in EVICTION_POLICIES:
+            with self.subTest(policy=policy):
+                cache = Cache(maxEntries=3, policy=policy)
+                cache.add_entry(entry(0), self.now - 1)
+                cache.add_entry(entry(1), self.now + 100)
+                cache.answer_query(query(1))    #removes the expired entry
+                self.fill(cache, 4)
+
+                self.assertEqual(len(cache.lines), 3)
+                self.assertIsNone(EVICTION_POLICIES[policy]().victim())
+
+    def test_stats(self):
+        cache = Cache(maxEntries=2, maxBytes=None, policy='LFU')
+        self.fill(cache, 3)
+        cache.add_negative(query(5), self.now + 10)
+
+        self.assertEqual(cache.stats(), {
+            'entries': 1,
+            'negative': 1,
+            'bytes': line_size(entry(2)) + line_size(query(5)),
+            'evictions': 2,
+            'max_entries': 2,
+            'max_bytes': None,
+            'policy': 'LFU'
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
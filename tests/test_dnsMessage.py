@@ -0,0 +1,130 @@
+"""
+Tests of the binary representation of DNSMessage
+
+Last Modification: Tests of truncated responses and counts above 255
+Date of Modification: 18/10/2026 19:44
+"""
+
+import unittest
+from common.dnsEntry import DNSEntry, EntryType
+from common.dnsMessage import DNSMessage, FLAG_COMPRESSION, FLAG_TRUNCATED, FLAG_WIDE_COUNTS, HEADER_STRUCT, HEADER_WIDE_STRUCT
+from common.query import QueryInfo, QueryResponse
+
+
+def entries(count:int) -> list[DNSEntry]:
+    """
+    Returns the given number of A entries of hosts of example.com.
+    """
+    return [DNSEntry.from_str(f'host{i}.example.com. A 10.0.{i // 256}.{i % 256} 100 {i % 256}') for i in range(count)]
+
+def response(values:int, authorities:int = 0, extra_values:int = 0, compression:bool = False) -> DNSMessage:
+    """
+    Returns a response to a query for example.com. with the given number of entries in each section
+    """
+    query = DNSMessage.from_query(QueryInfo('example.com.', EntryType.A), True, 1234, compression)
+    auths = [DNSEntry.from_str(f'example.com. NS ns{i}.example.com. 100') for i in range(authorities)]
+    return query.generate_response(QueryResponse(entries(values), auths, entries(extra_values), False, True), True)
+
+def round_trip(msg:DNSMessage) -> DNSMessage:
+    data = msg.to_bytes()
+    ans, pos = DNSMessage.from_bytes(data)
+    assert pos == len(data)
+    return ans
+
+
+class CompressionTests(unittest.TestCase):
+
+    def assertSameMessage(self, first:DNSMessage, second:DNSMessage):
+        self.assertEqual(str(first), str(second))
+        self.assertEqual(first.compression, second.compression)
+        if not first.is_query():
+            for a, b in zip(first.response.all_entries(), second.response.all_entries()):
+                self.assertEqual((a, a.ttl, a.priority), (b, b.ttl, b.priority))
+
+    def test_query_not_compressed(self):
+        query = DNSMessage.from_query(QueryInfo('example.com.', EntryType.MX), False, 10, True)
+        self.assertTrue(query.to_bytes()[2] & FLAG_COMPRESSION)
+        self.assertSameMessage(round_trip(query), query)
+
+    def test_compressed_response(self):
+        for count in [0, 1, 50, 200]:
+            with self.subTest(count=count):
+                compressed = response(count, 3, count, True)
+                plain = response(count, 3, count, False)
+                self.assertSameMessage(round_trip(compressed), compressed)
+                self.assertSameMessage(round_trip(plain), plain)
+                self.assertEqual(str(round_trip(compressed)), str(plain))
+                if count:
+                    self.assertLess(len(compressed.to_bytes()), len(plain.to_bytes()))
+
+    def test_compressed_response_beyond_pointer_range(self):
+        msg = response(4000, 0, 0, True)    #later names are past the positions a pointer can reach
+        self.assertGreater(len(msg.to_bytes()), 0xFFFF)
+        self.assertSameMessage(round_trip(msg), msg)
+
+    def test_mx_values(self):
+        query = DNSMessage.from_query(QueryInfo('example.com.', EntryType.MX), False, 10, True)
+        values = [DNSEntry.from_str(f'example.com. MX mx{i}.example.com 100 {i}') for i in range(3)]
+        extras = [DNSEntry.from_str(f'mx{i}.example.com. A 10.0.0.{i} 100') for i in range(3)]
+        msg = query.generate_response(QueryResponse(values, [], extras), False)
+        self.assertSameMessage(round_trip(msg), msg)
+
+
+class TruncationTests(unittest.TestCase):
+
+    def test_truncate(self):
+        for compression in [False, True]:
+            with self.subTest(compression=compression):
+                msg = response(10, 2, 3, compression)
+                truncated = msg.truncate()
+                data = truncated.to_bytes()
+                self.assertTrue(data[2] & FLAG_TRUNCATED)
+                self.assertEqual(HEADER_STRUCT.unpack_from(data)[2:], (0, 0, 0))
+
+                ans = round_trip(truncated)
+                self.assertTrue(ans.truncated)
+                self.assertEqual((ans.messageID, ans.query, ans.responseCode), (msg.messageID, msg.query, msg.responseCode))
+                self.assertEqual(ans.compression, compression)
+                self.assertTrue(ans.response.authoritative)
+                self.assertTrue(ans.supports_recursive)
+                self.assertEqual(list(ans.response.all_entries()), [])
+                self.assertFalse(msg.truncated)
+
+    def test_truncate_negative_response(self):
+        query = DNSMessage.from_query(QueryInfo('example.com.', EntryType.A), False, 7)
+        msg = query.generate_response(QueryResponse([], [], [], True), False)
+        ans = round_trip(msg.truncate())
+        self.assertEqual(ans.responseCode, 2)
+        self.assertTrue(ans.response.isFinal())
+
+    def test_truncated_string(self):
+        truncated = response(10).truncate()
+        ans = DNSMessage.from_string(str(truncated))
+        self.assertTrue(ans.truncated)
+        self.assertEqual(str(ans), str(truncated))
+        self.assertFalse(DNSMessage.from_string(str(response(10))).truncated)
+
+
+class WideCountsTests(unittest.TestCase):
+
+    def test_narrow_counts(self):
+        data = response(255, 0, 255).to_bytes()
+        self.assertFalse(data[2] & FLAG_WIDE_COUNTS)
+        self.assertEqual(HEADER_STRUCT.unpack_from(data)[2:], (255, 0, 255))
+
+    def test_wide_counts(self):
+        for counts in [(256, 0, 0), (0, 300, 1), (1, 2, 1000)]:
+            for compression in [False, True]:
+                with self.subTest(counts=counts, compression=compression):
+                    msg = response(*counts, compression)
+                    data = msg.to_bytes()
+                    self.assertTrue(data[2] & FLAG_WIDE_COUNTS)
+                    self.assertEqual(HEADER_WIDE_STRUCT.unpack_from(data)[2:], counts)
+
+                    ans = round_trip(msg)
+                    self.assertEqual(str(ans), str(msg))
+                    self.assertEqual(tuple(map(len, (ans.response.values, ans.response.authorities, ans.response.extra_values))), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests of the class RateLimiter, with a fake clock
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 20:02
+"""
+
+import unittest
+from unittest import mock
+import server.rateLimiter as rateLimiter
+from server.rateLimiter import RateLimiter
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        clock = mock.patch('server.rateLimiter.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.now = 1000.0
+        self.limiter = RateLimiter(rate=2, burst=3)
+
+    def test_burst(self):
+        self.assertEqual([self.limiter.reserve('10.0.0.1', 10) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.limiter.reserve('10.0.0.2', 10), 0)    #each client has its own bucket
+
+    def test_delay_of_waiting_requests(self):
+        for _ in range(3):
+            self.limiter.reserve('10.0.0.1', 10)
+        self.assertEqual([self.limiter.reserve('10.0.0.1', 10) for _ in range(4)], [0.5, 1, 1.5, 2])
+
+    def test_refill(self):
+        for _ in range(3):
+            self.limiter.reserve('10.0.0.1', 10)
+
+        self.now += 0.5     #one token added back
+        self.assertEqual(self.limiter.reserve('10.0.0.1', 10), 0)
+        self.assertEqual(self.limiter.reserve('10.0.0.1', 10), 0.5)
+
+        self.now += 100     #never more than burst tokens
+        self.assertEqual([self.limiter.reserve('10.0.0.1', 10) for _ in range(4)], [0, 0, 0, 0.5])
+
+    def test_refused_without_taking_token(self):
+        for _ in range(3):
+            self.limiter.reserve('10.0.0.1', 1)
+        self.assertEqual(self.limiter.reserve('10.0.0.1', 1), 0.5)
+        self.assertEqual(self.limiter.reserve('10.0.0.1', 1), 1)
+        self.assertIsNone(self.limiter.reserve('10.0.0.1', 1))
+        self.assertIsNone(self.limiter.reserve('10.0.0.1', 1))
+
+        self.now += 0.5
+        self.assertEqual(self.limiter.reserve('10.0.0.1', 1), 1)
+
+    def test_least_recently_seen_forgotten(self):
+        with mock.patch.object(rateLimiter, 'MAX_CLIENTS', 2):
+            for address in ['10.0.0.1', '10.0.0.2', '10.0.0.1', '10.0.0.3']:
+                self.limiter.reserve(address, 10)
+        self.assertEqual(list(self.limiter.buckets), ['10.0.0.1', '10.0.0.3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
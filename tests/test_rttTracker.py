@@ -0,0 +1,83 @@
+"""
+Tests of the class RTTTracker
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:33
+"""
+
+import unittest
+from server.rttTracker import RTTTracker, RTT_ALPHA, RTT_BETA, UNKNOWN_RTT, MIN_TIMEOUT, MAX_BACKOFF
+
+
+class RTTTrackerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = RTTTracker(5)
+
+    def test_unknown_server(self):
+        self.assertEqual(self.tracker.timeout('10.0.0.1'), 5)
+        self.assertEqual(self.tracker.servers, {})
+
+    def test_record(self):
+        self.tracker.record('10.0.0.1', 0.1)
+        server = self.tracker.servers['10.0.0.1']
+        self.assertAlmostEqual(server.srtt, 0.1)
+        self.assertAlmostEqual(server.rttvar, 0.05)
+        self.assertAlmostEqual(self.tracker.timeout('10.0.0.1'), 0.3)
+
+        self.tracker.record('10.0.0.1', 0.2)
+        self.assertAlmostEqual(server.rttvar, 0.05 + RTT_BETA * (0.1 - 0.05))
+        self.assertAlmostEqual(server.srtt, 0.1 + RTT_ALPHA * 0.1)
+        self.assertEqual(server.answered, 2)
+
+    def test_minimum_timeout(self):
+        self.tracker.record('10.0.0.1', 0.001)
+        self.assertAlmostEqual(self.tracker.timeout('10.0.0.1'), MIN_TIMEOUT)
+
+    def test_backoff(self):
+        self.tracker.record('10.0.0.1', 0.1)
+        self.tracker.record_timeout('10.0.0.1')
+        self.assertAlmostEqual(self.tracker.timeout('10.0.0.1'), 0.6)
+
+        for _ in range(2 * MAX_BACKOFF):
+            self.tracker.record_timeout('10.0.0.1')
+        server = self.tracker.servers['10.0.0.1']
+        self.assertEqual(server.backoff, MAX_BACKOFF)
+        self.assertEqual(server.timeouts, 2 * MAX_BACKOFF + 1)
+        self.assertEqual(self.tracker.timeout('10.0.0.1'), 5)
+
+        self.tracker.record('10.0.0.1', 0.1)
+        self.assertEqual(server.backoff, 0)
+
+    def test_order(self):
+        self.tracker.record('10.0.0.1', 0.3)
+        self.tracker.record('10.0.0.2', 0.1)
+        self.tracker.record('10.0.0.3', 0.1)
+        self.tracker.record_timeout('10.0.0.3')
+
+        self.assertEqual(self.tracker.order(['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4']),
+                         ['10.0.0.2', '10.0.0.3', '10.0.0.1', '10.0.0.4'])  #10.0.0.4 was never queried (UNKNOWN_RTT)
+        self.assertAlmostEqual(self.tracker.servers['10.0.0.2'].srtt, 0.1)
+        self.assertLess(self.tracker.servers['10.0.0.4'].srtt, UNKNOWN_RTT)
+
+    def test_slow_server_tried_again(self):
+        self.tracker.record('10.0.0.1', 0.1)
+        self.tracker.record('10.0.0.2', 0.2)
+
+        orders = [self.tracker.order(['10.0.0.1', '10.0.0.2'])[0] for _ in range(100)]
+        self.assertEqual(orders[0], '10.0.0.1')
+        self.assertIn('10.0.0.2', orders)
+
+    def test_max_servers(self):
+        tracker = RTTTracker(5, 3)
+        for i in range(3):
+            tracker.record(f'10.0.0.{i}', 0.1)
+        tracker.order(['10.0.0.0'])
+        tracker.record('10.0.0.3', 0.1)
+
+        self.assertEqual(list(tracker.servers), ['10.0.0.2', '10.0.0.0', '10.0.0.3'])
+        self.assertEqual(set(tracker.stats()), set(tracker.servers))
+
+
+if __name__ == '__main__':
+    unittest.main()
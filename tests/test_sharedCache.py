@@ -0,0 +1,114 @@
+"""
+Tests of the class SharedCache, with a Cache in the current process as the shared cache
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:27
+"""
+
+import time
+import unittest
+from unittest import mock
+from common.dnsEntry import DNSEntry, EntryType
+from common.query import QueryInfo, QueryResponse
+import server.sharedCache as sharedCache
+from server.cache import Cache
+from server.sharedCache import SharedCache
+
+
+class CountingCache(Cache):
+    """
+    Cache counting the calls made by a SharedCache
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+        self.batches = []
+
+    def answer_query_expiring(self, query:QueryInfo) -> tuple[QueryResponse,list[float]]:
+        self.queries += 1
+        return super().answer_query_expiring(query)
+
+    def add_responses(self, responses:list[tuple[QueryResponse,QueryInfo]]) -> None:
+        self.batches.append(len(responses))
+        super().add_responses(responses)
+
+
+def entry(i:int) -> DNSEntry:
+    return DNSEntry.from_str(f'host{i}.example.com. A 10.0.0.{i} 100')
+
+def query(i:int) -> QueryInfo:
+    return QueryInfo(f'host{i}.example.com.', EntryType.A)
+
+
+class SharedCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = time.time()
+        self.shared = CountingCache()
+        self.cache = SharedCache(self.shared, batchSize=3, flushInterval=3600)
+
+    def test_local_answer(self):
+        self.cache.add_response(QueryResponse([entry(0)]), query(0))
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+        self.assertEqual(self.shared.queries, 0)
+
+    def test_shared_answer_copied(self):
+        self.shared.add_entry(entry(0), self.now + 50)
+        self.shared.add_negative(query(1), self.now + 20)
+
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+        self.assertTrue(self.cache.answer_query(query(1)).isFinal())
+        self.assertEqual(self.cache.local.lines, {entry(0): self.now + 50})
+        self.assertEqual(self.cache.local.negative, {query(1): self.now + 20})
+
+        self.cache.answer_query(query(0))
+        self.cache.answer_query(query(1))
+        self.assertEqual(self.shared.queries, 2)
+
+    def test_misses_kept_locally(self):
+        for _ in range(100):
+            self.assertFalse(self.cache.answer_query(query(0)).isFinal())
+        self.assertEqual(self.shared.queries, 1)
+
+        self.shared.add_entry(entry(0), self.now + 50)
+        self.cache.misses[query(0)] = time.time() - 1   #the miss expired
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+        self.assertEqual(self.shared.queries, 2)
+        self.assertNotIn(query(0), self.cache.misses)
+
+    def test_added_response_forgets_miss(self):
+        self.cache.answer_query(query(0))
+        self.cache.add_response(QueryResponse([entry(0)]), query(0))
+        self.assertNotIn(query(0), self.cache.misses)
+        self.assertEqual(self.cache.answer_query(query(0)).values, [entry(0)])
+
+    def test_misses_bounded(self):
+        with mock.patch.object(sharedCache, 'MAX_MISSES', 2):
+            for i in range(3):
+                self.cache.answer_query(query(i))
+        self.assertEqual(list(self.cache.misses), [query(1), query(2)])
+
+    def test_batches(self):
+        for i in range(2):
+            self.cache.add_response(QueryResponse([entry(i)]), query(i))
+        self.assertEqual(self.shared.batches, [])
+
+        self.cache.add_response(QueryResponse([entry(2)]), query(2))
+        self.assertEqual(self.shared.batches, [3])
+
+        self.cache.add_response(QueryResponse([entry(3)]), query(3))
+        self.cache.flush()
+        self.cache.flush()
+        self.assertEqual(self.shared.batches, [3, 1])
+        self.assertEqual(set(self.shared.lines), {entry(i) for i in range(4)})
+
+    def test_stats(self):
+        self.cache.add_response(QueryResponse([entry(0)]), query(0))
+        stats = self.cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['shared_entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests of the classes SingleFlight and AsyncSingleFlight
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:35
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from server.singleFlight import SingleFlight, AsyncSingleFlight
+
+
+"""
+Number of concurrent calls made by each test
+"""
+CALLS = 8
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def lookup(self, value):
+        self.runs += 1
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def call_concurrently(self, key, value) -> list:
+        """
+        Makes CALLS concurrent calls with the same key, released once all of them wait for the first one
+        Returns the result or exception of each call
+        """
+        results = [None] * CALLS
+        def run(i):
+            try:
+                results[i] = self.flight.do(key, self.lookup, value)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(CALLS)]
+        for t in threads:
+            t.start()
+
+        deadline = time.monotonic() + 5
+        while self.flight.stats()['coalesced'] < CALLS - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.release.set()
+        for t in threads:
+            t.join(5)
+
+        return results
+
+    def test_function_runs_once(self):
+        results = self.call_concurrently('key', 42)
+        self.assertEqual(results, [42] * CALLS)
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(self.flight.stats(), {'running': 0, 'coalesced': CALLS - 1})
+
+    def test_error_shared(self):
+        error = ValueError('lookup failed')
+        results = self.call_concurrently('key', error)
+        self.assertTrue(all(r is error for r in results))
+        self.assertEqual(self.runs, 1)
+        self.assertEqual(self.flight.stats()['running'], 0)
+
+    def test_sequential_calls_not_coalesced(self):
+        self.release.set()
+        self.assertEqual(self.flight.do('key', self.lookup, 1), 1)
+        self.assertEqual(self.flight.do('key', self.lookup, 2), 2)
+        self.assertEqual(self.flight.do('other', self.lookup, 3), 3)
+        self.assertEqual(self.runs, 3)
+        self.assertEqual(self.flight.stats()['coalesced'], 0)
+
+
+class AsyncSingleFlightTests(unittest.TestCase):
+
+    def test_function_runs_once(self):
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def lookup(value):
+            runs.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def main():
+            calls = [flight.do('key', lookup, i) for i in range(CALLS)] + [flight.do('other', lookup, -1)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual(asyncio.run(main()), [0] * CALLS + [-1])
+        self.assertEqual(runs, [0, -1])
+        self.assertEqual(flight.stats(), {'running': 0, 'coalesced': CALLS - 1})
+
+    def test_cancelled_caller(self):
+        flight = AsyncSingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        async def main():
+            first = asyncio.create_task(flight.do('key', lookup))
+            second = asyncio.create_task(flight.do('key', lookup))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), 'done')
+
+
+if __name__ == '__main__':
+    unittest.main()
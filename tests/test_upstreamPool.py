@@ -0,0 +1,128 @@
+"""
+Tests of the class UpstreamPool: responses handed to the waiting query when messageIDs collide
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:31
+"""
+
+import socket
+import threading
+import unittest
+from unittest import mock
+from common.dnsEntry import DNSEntry, EntryType
+from common.dnsMessage import DNSMessage
+from common.query import QueryInfo, QueryResponse
+from server.upstreamPool import UpstreamPool
+
+
+def encode(msg:DNSMessage) -> bytes:
+    return msg.to_bytes()
+
+def decode(data:bytes) -> DNSMessage:
+    return DNSMessage.from_bytes(data)[0]
+
+def new_query(i:int) -> DNSMessage:
+    return DNSMessage.from_query(QueryInfo(f'host{i}.example.com.', EntryType.A), False)
+
+def response_to(msg:DNSMessage) -> DNSMessage:
+    """
+    Returns a response to the given query, with an A entry whose value identifies the queried name
+    """
+    i = int(msg.query.name.split('.')[0][4:])
+    entry = DNSEntry.from_str(f'{msg.query.name} A 10.0.0.{i} 100')
+    return msg.generate_response(QueryResponse([entry]), False)
+
+
+class UpstreamPoolMatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = UpstreamPool(encode, decode, 0)
+
+    def test_same_id_different_queries(self):
+        with mock.patch('server.upstreamPool.random.randrange', return_value=7):
+            queries = [new_query(i) for i in range(3)]
+            keys = [self.pool.register(q, '10.0.0.1') for q in queries]
+
+        self.assertEqual([q.messageID for q in queries], [7, 7, 7])
+        self.assertEqual(len(set(keys)), 3)
+
+        for q in reversed(queries):
+            pending, ans = self.pool.__match__(encode(response_to(q)), '10.0.0.1')
+            self.assertIs(pending, self.pool.pending[(7, q.query)][1])
+            self.assertEqual(ans.query, q.query)
+
+    def test_same_query_gets_other_id(self):
+        with mock.patch('server.upstreamPool.random.randrange', side_effect=[7, 7, 7, 9]):
+            first, second = new_query(0), new_query(0)
+            self.pool.register(first, '10.0.0.1')
+            self.pool.register(second, '10.0.0.2')
+
+        self.assertEqual((first.messageID, second.messageID), (7, 9))
+        self.assertIs(self.pool.__match__(encode(response_to(second)), '10.0.0.2')[0], self.pool.pending[(9, second.query)][1])
+
+    def test_rejected_responses(self):
+        q = new_query(0)
+        self.pool.register(q, '10.0.0.1')
+
+        self.assertIsNone(self.pool.__match__(encode(response_to(q)), '10.0.0.2'))   #another server
+        self.assertIsNone(self.pool.__match__(b'\x00\x01garbage', '10.0.0.1'))
+        other = new_query(1)
+        other.messageID = q.messageID
+        self.assertIsNone(self.pool.__match__(encode(response_to(other)), '10.0.0.1'))
+
+
+class UpstreamPoolExchangeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.settimeout(5)
+        self.port = self.server.getsockname()[1]
+        self.pool = UpstreamPool(encode, decode, 1)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_responses_in_reverse_order(self):
+        count = 4
+        with mock.patch('server.upstreamPool.random.randrange', return_value=42):
+            queries = [new_query(i) for i in range(count)]
+            keys = [self.pool.register(q, '127.0.0.1') for q in queries]
+
+        results = [None] * count
+        def run(i):
+            results[i] = self.pool.exchange(keys[i], queries[i], '127.0.0.1', self.port, 5)
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+
+        received = [self.server.recvfrom(1024) for _ in range(count)]
+        for data, address in reversed(received):
+            self.server.sendto(encode(response_to(decode(data))), address)
+        for t in threads:
+            t.join(5)
+
+        for i, ans in enumerate(results):
+            self.assertEqual(ans.messageID, 42)
+            self.assertEqual(ans.query, queries[i].query)
+            self.assertEqual(ans.response.values[0].value, f'10.0.0.{i}')
+        self.assertEqual(self.pool.pending, {})
+
+    def test_timeout(self):
+        q = new_query(0)
+        key = self.pool.register(q, '127.0.0.1')
+        self.assertRaises(socket.timeout, self.pool.exchange, key, q, '127.0.0.1', self.port, 0.05)
+        self.assertEqual(self.pool.pending, {})
+
+    def test_cancelled_before_sent(self):
+        q = new_query(0)
+        key = self.pool.register(q, '127.0.0.1')
+        self.pool.cancel(key)
+        self.assertIsNone(self.pool.exchange(key, q, '127.0.0.1', self.port, 5))
+
+        self.server.settimeout(0.05)
+        self.assertRaises(socket.timeout, self.server.recvfrom, 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Tests of the domain name and string encoding utilities of common.utils
+
+Last Modification: Tests of the compressed strings
+Date of Modification: 18/10/2026 19:38
+"""
+
+import itertools
+import unittest
+import common.utils as utils
+
+
+"""
+Domain names stored in the tries of the tests (includes equivalent names with different case and without the final dot)
+"""
+DOMAINS = ['.', 'com.', 'example.com.', 'Example.COM', 'www.example.com.', 'org.', 'example.org.', 'a.b.c.example.org.', 'exam.com.']
+
+"""
+Domain names looked up in the tries of the tests
+"""
+NAMES = ['.', 'com.', 'example.com.', 'www.example.com.', 'a.www.example.com.', 'ple.com.', 'xexample.com.', 'org.',
+         'b.c.example.org.', 'a.b.c.example.org.', 'z.a.b.c.example.org.', 'net.', 'EXAMPLE.com.']
+
+
+class DomainTrieTests(unittest.TestCase):
+
+    def test_matches_same_as_is_subdomain(self):
+        for n in range(len(DOMAINS) + 1):
+            domains = DOMAINS[:n]
+            trie = utils.DomainTrie(domains)
+            for name in NAMES:
+                with self.subTest(domains=domains, name=name):
+                    expected = {utils.normalize_domain(d) for d in domains if utils.is_subdomain(name, d)}
+                    matches = trie.matches(name)
+                    self.assertEqual({utils.normalize_domain(d) for d in matches}, expected)
+                    self.assertEqual(len(matches), len(expected))
+                    self.assertEqual(list(map(utils.domain_depth, matches)), sorted(map(utils.domain_depth, matches)))
+
+    def test_closest_same_as_best_match(self):
+        for domains in itertools.permutations(DOMAINS[1:6]):
+            trie = utils.DomainTrie(domains)
+            for name in NAMES:
+                with self.subTest(domains=domains, name=name):
+                    expected = utils.best_match(name, list(domains))
+                    closest = trie.closest(name)
+                    if expected == None:
+                        self.assertIsNone(closest)
+                    else:
+                        self.assertEqual(utils.normalize_domain(closest), utils.normalize_domain(expected))
+
+    def test_first(self):
+        trie = utils.DomainTrie(['example.com.', 'www.example.com.'])
+        self.assertEqual(trie.first('a.www.example.com.'), 'example.com.')
+        self.assertEqual(trie.closest('a.www.example.com.'), 'www.example.com.')
+        self.assertIsNone(trie.first('com.'))
+        self.assertIsNone(trie.closest('example.org.'))
+
+    def test_first_equivalent_domain_kept(self):
+        trie = utils.DomainTrie(['Example.com.', 'example.com.'])
+        self.assertEqual(trie.matches('www.example.com.'), ['Example.com.'])
+
+
+class CompressedStringTests(unittest.TestCase):
+
+    def write_at(self, position:int, strings:list[str]) -> tuple[bytearray,list[int]]:
+        """
+        Writes the given strings compressed, the first one at the given position of the buffer
+        Returns the buffer and the position of each string
+        """
+        buffer = bytearray(b'\x01' * position)
+        names = {}
+        positions = []
+        for s in strings:
+            positions.append(len(buffer))
+            utils.write_string(buffer, s, names)
+        return (buffer, positions)
+
+    def assertRoundTrip(self, buffer:bytearray, positions:list[int], strings:list[str]):
+        ends = positions[1:] + [len(buffer)]
+        for pos, end, s in zip(positions, ends, strings):
+            self.assertEqual(utils.bytes_to_compressed_string(bytes(buffer), pos), (s, end))
+
+    def test_uncompressed(self):
+        buffer = bytearray()
+        utils.write_string(buffer, 'www.example.com.')
+        self.assertEqual(buffer, utils.string_to_bytes('www.example.com.'))
+        self.assertEqual(utils.bytes_to_compressed_string(bytes(buffer)), ('www.example.com.', len(buffer)))
+
+    def test_pointers(self):
+        strings = ['www.example.com.', 'mail.example.com.', 'www.example.com.', 'com.', 'a.b.mail.example.com.', 'other.org.', 'x']
+        buffer, positions = self.write_at(0, strings)
+        self.assertRoundTrip(buffer, positions, strings)
+        self.assertEqual(buffer.count(utils.STRING_POINTER), 4)
+        self.assertEqual(positions[3] + 3, positions[4])  #only a pointer
+
+    def test_offsets_with_special_bytes(self):
+        strings = ['www.example.com.', 'mail.example.com.', 'www.example.com.']
+        for offset in [0xC0, 0x100, 0xC000, 0xC0C0, 0xFF00, 0xFFFF]:
+            with self.subTest(offset=hex(offset)):
+                buffer, positions = self.write_at(offset - len('www.'), strings)
+                self.assertIn(offset.to_bytes(2, 'little'), bytes(buffer[positions[1]:]))
+                self.assertRoundTrip(buffer, positions, strings)
+
+    def test_offsets_too_large(self):
+        strings = ['www.example.com.', 'mail.example.com.']
+        buffer, positions = self.write_at(0x10000, strings)
+        self.assertNotIn(utils.STRING_POINTER, buffer)
+        self.assertRoundTrip(buffer, positions, strings)
+
+    def test_invalid_pointers(self):
+        forward = b'www.' + bytes([utils.STRING_POINTER]) + (10).to_bytes(2, 'little') + b'example.com.\x00'
+        self.assertRaises(ValueError, utils.bytes_to_compressed_string, forward)
+        self.assertRaises(ValueError, utils.bytes_to_compressed_string, b'abc\x00www.' + bytes([utils.STRING_POINTER]) + b'\x00', 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
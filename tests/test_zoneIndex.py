@@ -0,0 +1,106 @@
+"""
+Tests of the class ZoneIndex
+The responses of an index must be the same as the ones of QueryResponse.from_entries() over the same entries
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:16
+"""
+
+import glob
+import os
+import unittest
+from common.dnsEntry import DNSEntry, EntryType
+from common.query import QueryInfo, QueryResponse
+from server.database import Database
+from server.zoneIndex import ZoneIndex
+
+
+"""
+Directory of the database files used by the tests
+"""
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_databases() -> list[list[DNSEntry]]:
+    """
+    Returns the entries of every database file that can be parsed in the tests directory
+    """
+    paths = [os.path.join(TESTS_DIR, 'server.db')] + sorted(glob.glob(os.path.join(TESTS_DIR, 'core_tests', 'databases', '*.db')))
+    databases = []
+    for path in paths:
+        try:
+            databases.append(Database(path).entries)
+        except Exception:
+            pass #files with syntax errors on purpose
+
+    return databases
+
+def queried_names(entries:list[DNSEntry]) -> set[str]:
+    """
+    Returns the names present in the given entries, some names below them and a name outside of them
+    """
+    names = {'.', 'nonexistent.tld.'}
+    for e in entries:
+        names.add(e.parameter)
+        names.add('below.' + e.parameter if e.parameter != '.' else 'below.')
+        if e.type in [EntryType.NS, EntryType.CNAME, EntryType.SOASP]:
+            names.add(e.value)
+
+    return names
+
+def as_tuple(response:QueryResponse) -> tuple:
+    """
+    Returns a comparable representation of a QueryResponse (extra_values don't have a defined order)
+    """
+    return (list(map(str, response.values)), list(map(str, response.authorities)),
+            sorted(map(str, response.extra_values)), response.final, response.authoritative)
+
+
+class ZoneIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.databases = load_databases()
+        self.assertTrue(self.databases)
+
+    def assertSameResponses(self, index:ZoneIndex, entries:list[DNSEntry]):
+        for name in queried_names(entries):
+            for type in EntryType:
+                query = QueryInfo(name, type)
+                with self.subTest(query=str(query)):
+                    self.assertEqual(as_tuple(index.answer_query(query, authoritative=True)),
+                                     as_tuple(QueryResponse.from_entries(query, entries, authoritative=True)))
+
+    def test_same_responses_as_from_entries(self):
+        for entries in self.databases:
+            self.assertSameResponses(ZoneIndex(entries), entries)
+
+    def test_lowest_priority_chosen(self):
+        entries = [DNSEntry.from_str(s) for s in ['a.example. NS ns2.a.example. 100 20', 'a.example. NS ns1.a.example. 100 10',
+                                                  'ns1.a.example. A 10.0.0.1 100', 'ns2.a.example. A 10.0.0.2 100',
+                                                  'www.a.example. A 10.0.0.3 100 5', 'www.a.example. A 10.0.0.4 100 1']]
+        index = ZoneIndex(entries)
+        self.assertSameResponses(index, entries)
+
+        response = index.answer_query(QueryInfo('www.a.example.', EntryType.A))
+        self.assertEqual(response.values[0].value, '10.0.0.4')
+        self.assertEqual(response.authorities[0].value, 'ns1.a.example.')
+
+    def test_remove_entry(self):
+        for entries in self.databases:
+            index = ZoneIndex(entries)
+            remaining = list(entries)
+            for e in entries[::2]:
+                index.remove_entry(e)
+                remaining.remove(e)
+
+            index.remove_entry(entries[0]) #no longer indexed
+            self.assertSameResponses(index, remaining)
+
+            for e in entries[::2]:
+                index.add_entry(e)
+                remaining.append(e)
+            self.assertSameResponses(index, remaining)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Tests of the class ZoneJournal
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:53
+"""
+
+import unittest
+from collections import Counter
+from common.dnsEntry import DNSEntry
+from server.zoneJournal import ZoneJournal
+
+
+def hosts(numbers) -> list[DNSEntry]:
+    return [DNSEntry.from_str(f'host{i}.example.com. A 10.0.0.{i} 100') for i in numbers]
+
+
+class ZoneJournalTests(unittest.TestCase):
+
+    def setUp(self):
+        self.versions = {1: hosts(range(0, 20)), 2: hosts(range(2, 21)), 3: hosts(range(0, 19)), 4: hosts(range(0, 19)) + hosts([5])}
+        self.journal = ZoneJournal()
+        for serial in range(1, 4):
+            self.journal.record(serial, serial + 1, self.versions[serial], self.versions[serial + 1])
+
+    def apply(self, entries:list[DNSEntry], serial:int) -> Counter:
+        removed, added = self.journal.changes_since(serial)
+        return Counter(entries) - Counter(removed) + Counter(added)
+
+    def test_net_changes(self):
+        for serial in range(1, 4):
+            with self.subTest(serial=serial):
+                self.assertEqual(self.apply(self.versions[serial], serial), Counter(self.versions[4]))
+
+    def test_changes_cancel_out(self):
+        removed, added = self.journal.changes_since(1)
+        self.assertEqual(Counter(removed), Counter(hosts([19])))
+        self.assertEqual(Counter(added), Counter(hosts([5])))
+
+    def test_serial_not_covered(self):
+        self.assertIsNone(self.journal.changes_since(4))
+        self.assertIsNone(self.journal.changes_since(0))
+
+    def test_max_size(self):
+        journal = ZoneJournal(2)
+        for serial in range(1, 4):
+            journal.record(serial, serial + 1, self.versions[serial], self.versions[serial + 1])
+        self.assertIsNone(journal.changes_since(1))
+        self.assertIsNotNone(journal.changes_since(2))
+
+    def test_changes_larger_than_domain(self):
+        journal = ZoneJournal()
+        journal.record(1, 2, hosts(range(10)), hosts(range(10, 13)))
+        self.assertIsNone(journal.changes_since(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
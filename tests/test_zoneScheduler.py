@@ -0,0 +1,117 @@
+"""
+Tests of the class ZoneScheduler, with a fake clock and fake zone transfers
+
+Last Modification: Creation
+Date of Modification: 18/10/2026 19:59
+"""
+
+import heapq
+import threading
+import unittest
+from unittest import mock
+from server.domain import SecondaryDomain
+from server.zoneScheduler import ZoneScheduler, JITTER
+
+
+class ZoneSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        clock = mock.patch('server.zoneScheduler.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.now = 1000.0
+
+        self.domain = SecondaryDomain('example.com.')
+        self.domain.refresh, self.domain.retry, self.domain.expire = 100, 10, 1000
+        self.fail = False
+        self.transfers = 0
+        self.expired = 0
+        self.scheduler = ZoneScheduler(self.transfer, self.expire, 1)
+        self.scheduler.add(self.domain)
+
+    def tearDown(self):
+        self.scheduler.pool.shutdown()
+
+    def transfer(self, domain:SecondaryDomain) -> None:
+        self.transfers += 1
+        if self.fail:
+            raise ConnectionError("SP unreachable")
+
+    def expire(self, domain:SecondaryDomain) -> None:
+        self.expired += 1
+
+    def next_transfer(self) -> float:
+        """
+        Runs the zone transfer that is due and returns the delay until the next one
+        """
+        due, _, name = heapq.heappop(self.scheduler.timers)
+        self.assertLessEqual(due, self.now)
+        self.scheduler.__run_transfer__(name)
+        return self.scheduler.timers[0][0] - self.now
+
+    def assertDelay(self, delay:float, interval:float):
+        self.assertLessEqual(delay, interval)
+        self.assertGreaterEqual(delay, interval * (1 - JITTER))
+
+    def test_first_transfer_right_away(self):
+        self.assertEqual(self.scheduler.timers[0][0], self.now)
+
+    def test_refresh(self):
+        self.assertDelay(self.next_transfer(), 100)
+        self.assertEqual(self.scheduler.zones['example.com.'].expiresAt, self.now + 1000)
+
+        self.now += 100
+        self.assertDelay(self.next_transfer(), 100)
+        self.assertEqual(self.scheduler.zones['example.com.'].expiresAt, self.now + 1000)
+        self.assertEqual(self.transfers, 2)
+
+    def test_retry(self):
+        self.fail = True
+        self.assertDelay(self.next_transfer(), 10)
+        self.assertIsNone(self.scheduler.zones['example.com.'].expiresAt)
+
+    def test_retry_until_expired(self):
+        self.next_transfer()
+        self.fail = True
+        self.now += 995
+        self.assertAlmostEqual(self.next_transfer(), 5)    #the domain expires before the retry
+        self.assertEqual(self.expired, 0)
+
+        self.now += 5
+        self.assertDelay(self.next_transfer(), 10)
+        self.assertEqual(self.expired, 1)
+        self.assertIsNone(self.scheduler.zones['example.com.'].expiresAt)
+
+        self.now += 10
+        self.next_transfer()
+        self.assertEqual(self.expired, 1)
+
+        self.fail = False
+        self.now += 10
+        self.assertDelay(self.next_transfer(), 100)
+        self.assertEqual(self.scheduler.zones['example.com.'].expiresAt, self.now + 1000)
+
+
+class ZoneSchedulerRunTests(unittest.TestCase):
+
+    def test_run(self):
+        done = threading.Event()
+        domains = [SecondaryDomain(f'example{i}.com.') for i in range(3)]
+        transferred = []
+
+        def transfer(domain):
+            transferred.append(domain.name)
+            if len(transferred) == len(domains):
+                done.set()
+
+        scheduler = ZoneScheduler(transfer, lambda d: None)
+        for d in domains:
+            scheduler.add(d)
+        threading.Thread(target=scheduler.run, daemon=True).start()
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(sorted(transferred), [d.name for d in domains])
+
+
+if __name__ == '__main__':
+    unittest.main()
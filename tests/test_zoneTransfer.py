@@ -0,0 +1,182 @@
+"""
+Tests of the zone transfers, with the SS functions talking directly to processPacket() through a fake connection
+
+Last Modification: Tests of the incremental zone transfer
+Date of Modification: 18/10/2026 19:55
+"""
+
+import os
+import tempfile
+import unittest
+from collections import Counter, deque
+from typing import Optional
+from unittest import mock
+import common.utils as utils
+from common.dnsEntry import EntryType
+from common.query import QueryInfo
+import server.zoneTransfer as zoneTransfer
+from server.domain import PrimaryDomain, SecondaryDomain
+from server.zoneJournal import ZoneJournal
+from server.zoneTransferPacket import SequenceNumber, ZoneStatus
+
+
+def database_text(serial:int, hosts:range, extra:list[str] = []) -> str:
+    """
+    Returns the contents of a database file of example.com. with the given serial number, an A entry for
+    each of the given hosts and the given extra lines
+    """
+    lines = ['@ DEFAULT example.com.', 'TTL DEFAULT 3600',
+             '@ SOASP ns1.example.com. TTL', '@ SOAADMIN dns\\.admin.example.com. TTL', f'@ SOASERIAL {serial} TTL',
+             '@ SOAREFRESH 100 TTL', '@ SOARETRY 10 TTL', '@ SOAEXPIRE 1000 TTL',
+             '@ NS ns1.example.com. TTL', 'ns1 A 10.0.0.1 TTL', 'www CNAME ns1 TTL']
+    lines += [f'host{i} A 10.1.{i // 256}.{i % 256} TTL' for i in hosts]
+    return '\n'.join(lines + extra) + '\n'
+
+
+class ServerDataStub:
+    """
+    The only method of ServerData used by processPacket()
+    """
+    def __init__(self, domain:PrimaryDomain):
+        self.domain = domain
+
+    def get_domain(self, name:str, primary:bool) -> Optional[PrimaryDomain]:
+        return self.domain if primary and name == self.domain.name else None
+
+
+class Loopback:
+    """
+    Fake connection of an SS to an SP: each written packet is answered right away by processPacket(),
+    and its responses are read one by one. Reads after the last response return b'' (closed connection)
+    """
+    def __init__(self, serverData:ServerDataStub, ip:str = '127.0.0.1'):
+        self.serverData = serverData
+        self.ip = ip
+        self.domain = None
+        self.responses = deque()
+        self.sent = []
+
+    def write(self, data:bytes) -> None:
+        packet = zoneTransfer.decode_packet(data)
+        (domain, packets) = zoneTransfer.processPacket(self.serverData, packet, self.ip, self.domain)
+        if self.domain == None:
+            self.domain = domain
+        for p in packets:
+            self.sent.append(p)
+            self.responses.append(zoneTransfer.encode_packet(p))
+
+    def read(self) -> bytes:
+        return self.responses.popleft() if self.responses else b''
+
+
+class ZoneTransferTestCase(unittest.TestCase):
+    """
+    An SP with a primary domain example.com. whose entries take several batches, and an SS without its entries
+    """
+
+    def setUp(self):
+        debug = mock.patch.object(utils, 'debug', False, create=True)    #set from the command line by the server
+        debug.start()
+        self.addCleanup(debug.stop)
+
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'example.com.db')
+        self.write_database(database_text(5, range(2 * zoneTransfer.batchSize + 10)))
+
+        self.primary = PrimaryDomain('example.com.')
+        self.primary.set_database(self.path)
+        self.primary.add_authorizedSS('127.0.0.1')
+        self.connection = Loopback(ServerDataStub(self.primary))
+        self.secondary = SecondaryDomain('example.com.')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_database(self, text:str) -> None:
+        with open(self.path, 'w') as file:
+            file.write(text)
+
+    def update_database(self, text:str) -> None:
+        """
+        Replaces the database file of the SP and reloads it, with a modification time different from the previous one
+        """
+        mtime = self.primary.database.mtime
+        self.write_database(text)
+        os.utime(self.path, (mtime + 1, mtime + 1))
+        self.assertTrue(self.primary.reload())
+
+
+class ZoneTransferTests(ZoneTransferTestCase):
+
+    def test_version_number(self):
+        self.assertEqual(zoneTransfer.getServerVersionNumber(self.connection, 'example.com.'), 5)
+
+    def test_streamed_entries(self):
+        zoneTransfer.getStreamedEntries(self.connection, self.secondary)
+
+        self.assertEqual(self.secondary.dnsEntries, self.primary.database.entries)
+        self.assertEqual(self.secondary.get_serial(), 5)
+        self.assertEqual((self.secondary.get_refresh(), self.secondary.get_retry(), self.secondary.get_expire()), (100, 10, 1000))
+        self.assertEqual(self.connection.read(), b'')
+
+        sizes = [len(p.data) for p in self.connection.sent]
+        self.assertEqual(sizes, [zoneTransfer.batchSize, zoneTransfer.batchSize, len(self.primary.database.entries) - 2 * zoneTransfer.batchSize, 0])
+        self.assertTrue(all(p.sequenceNumber == SequenceNumber.SP_ENTRY_BATCH for p in self.connection.sent))
+
+    def test_streamed_answers_queries(self):
+        zoneTransfer.getStreamedEntries(self.connection, self.secondary)
+        for name in ['www.example.com.', 'host3.example.com.', 'missing.example.com.']:
+            with self.subTest(name=name):
+                query = QueryInfo(name, EntryType.A)
+                self.assertEqual(list(map(str, self.secondary.answer_query(query).values)),
+                                 list(map(str, self.primary.answer_query(query).values)))
+
+    def test_unauthorized(self):
+        connection = Loopback(ServerDataStub(self.primary), '10.0.0.9')
+        self.assertRaises(ValueError, zoneTransfer.getStreamedEntries, connection, self.secondary)
+        self.assertEqual(connection.sent[0].status, ZoneStatus.UNAUTHORIZED)
+        self.assertEqual(self.secondary.dnsEntries, [])
+
+    def test_unknown_domain(self):
+        self.assertRaises(ValueError, zoneTransfer.getStreamedEntries, self.connection, SecondaryDomain('example.org.'))
+        self.assertEqual(self.connection.sent[0].status, ZoneStatus.NO_SUCH_DOMAIN)
+
+    def test_closed_connection(self):
+        self.connection.write = lambda data: None
+        self.assertRaises(ConnectionError, zoneTransfer.getStreamedEntries, self.connection, self.secondary)
+
+
+class IncrementalZoneTransferTests(ZoneTransferTestCase):
+
+    def setUp(self):
+        super().setUp()
+        zoneTransfer.getStreamedEntries(self.connection, self.secondary)
+        self.connection = Loopback(self.connection.serverData)
+
+    def test_changes_applied(self):
+        self.update_database(database_text(6, range(10, 2 * zoneTransfer.batchSize + 10)))
+        self.update_database(database_text(7, range(5, 2 * zoneTransfer.batchSize + 5), ['new A 10.2.0.1 TTL', 'ns1 A 10.0.0.2 TTL']))
+
+        self.assertTrue(zoneTransfer.getChanges(self.connection, self.secondary))
+        self.assertEqual(Counter(self.secondary.dnsEntries), Counter(self.primary.database.entries))
+        self.assertEqual(self.secondary.get_serial(), 7)
+        self.assertEqual(self.secondary.answer_query(QueryInfo('new.example.com.', EntryType.A)).values[0].value, '10.2.0.1')
+
+        removed = [p for p in self.connection.sent if p.sequenceNumber == SequenceNumber.SP_REMOVED_BATCH]
+        added = [p for p in self.connection.sent if p.sequenceNumber == SequenceNumber.SP_ENTRY_BATCH]
+        self.assertEqual(sum(len(p.data) for p in removed), 10 + 1)   #hosts 0 to 4 and 1029 to 1033, and the SOASERIAL
+        self.assertEqual(sum(len(p.data) for p in added), 3)          #the SOASERIAL and the new entries (hosts 5 to 9 are back)
+        self.assertEqual(self.connection.sent, removed + added)
+
+    def test_serial_not_covered(self):
+        self.primary.journal = ZoneJournal(1)
+        self.update_database(database_text(6, range(1, 100)))
+        self.update_database(database_text(7, range(2, 100)))
+
+        self.assertFalse(zoneTransfer.getChanges(self.connection, self.secondary))
+        self.assertEqual(self.secondary.dnsEntries, self.primary.database.entries)
+        self.assertTrue(all(p.sequenceNumber == SequenceNumber.SP_ENTRY_BATCH for p in self.connection.sent))
+
+
+if __name__ == '__main__':
+    unittest.main()